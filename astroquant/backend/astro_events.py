@@ -2,7 +2,11 @@
 astro_events.py
 - Uses Swiss Ephemeris (pyswisseph) to compute precise aspect times using a root-finder around coarse hits.
 - Computes Vedic elements (nakshatra, pada, tithi, yoga, karana), zodiac sign (Telugu + EN), element, modality.
-- Writes data to data/astro_events.json (UTF-8, bilingual)
+- Each planet's longitude is sampled once per scan; pairs are searched on the cached
+  samples (spread over a process pool) and only bracketed roots hit the ephemeris again.
+- Writes data to data/astro_events.json (UTF-8, bilingual, compact) from the append-only
+  data/astro_events.jsonl store; by default only the part of the window outside each pair's
+  scanned span is scanned (--full rescans everything). See event_store.py.
 - Produces a simple predictions file data/astro_predictions.json using heuristic rules.
 
 Note: requires pyswisseph (pip install pyswisseph)
@@ -15,7 +19,17 @@ except Exception:
     swe = None
     SWE_AVAILABLE = False
 
+try:
+    from scipy.optimize import brentq, minimize_scalar
+    SCIPY_AVAILABLE = True
+except Exception:
+    brentq = minimize_scalar = None
+    SCIPY_AVAILABLE = False
+
 import datetime, json, math, os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 if SWE_AVAILABLE and hasattr(swe, 'set_ephe_path'):
     # set to where swe.wasm or ephemeris files live if needed
@@ -51,13 +65,30 @@ ELEMENTS = ["Fire","Earth","Air","Water","Fire","Earth","Air","Water","Fire","Ea
 MODALITIES = ["Cardinal","Fixed","Mutable","Cardinal","Fixed","Mutable","Cardinal","Fixed","Mutable","Cardinal","Fixed","Mutable"]
 EXALTATION = {"Sun":"Aries","Moon":"Taurus","Mercury":"Virgo","Venus":"Pisces","Mars":"Capricorn","Jupiter":"Cancer","Saturn":"Libra"}
 
+# Coarse scan step in days and root tolerance in seconds
+SCAN_STEP = 0.5
+ROOT_TOL_SECONDS = 1.0
+# Incremental scans restart this many days before a pair's checkpoint so edge roots are not missed
+CHECKPOINT_OVERLAP_DAYS = 1.0
+
+
 def norm(x):
     return x % 360.0
 
 
+def wrap180(x):
+    """Signed angle in [-180, 180)."""
+    return (x + 180.0) % 360.0 - 180.0
+
+
+def planet_longitude(jd, pconst):
+    """Ecliptic longitude from swe.calc_ut (handles both the flat and (xx, flags) return shapes)."""
+    xx = swe.calc_ut(jd, pconst)[0]
+    return norm(xx[0] if isinstance(xx, (tuple, list)) else xx)
+
+
 def jd_to_datetime(jd):
-    y, m, d, frac = swe.revjul(jd, swe.GREG_CAL)
-    hours = frac * 24.0
+    y, m, d, hours = swe.revjul(jd, swe.GREG_CAL)
     h = int(hours)
     minutes = int((hours - h) * 60)
     seconds = int((((hours - h) * 60) - minutes) * 60)
@@ -65,8 +96,8 @@ def jd_to_datetime(jd):
 
 
 def compute_vedic(jd):
-    lon_sun = norm(swe.calc_ut(jd, swe.SUN)[0])
-    lon_moon = norm(swe.calc_ut(jd, swe.MOON)[0])
+    lon_sun = planet_longitude(jd, swe.SUN)
+    lon_moon = planet_longitude(jd, swe.MOON)
     tithi_angle = norm(lon_moon - lon_sun)
     tithi_num = int(tithi_angle // 12) + 1
     yoga_angle = norm(lon_sun + lon_moon)
@@ -84,8 +115,8 @@ def compute_vedic(jd):
 
 
 def planet_info_at_jd(jd, pconst):
-    lon = norm(swe.calc_ut(jd, pconst)[0])
-    lon_next = norm(swe.calc_ut(jd + 0.5/24.0, pconst)[0])
+    lon = planet_longitude(jd, pconst)
+    lon_next = planet_longitude(jd + 0.5/24.0, pconst)
     speed = (lon_next - lon) * 24.0
     if speed > 180: speed -= 360
     if speed < -180: speed += 360
@@ -122,86 +153,184 @@ def planet_info_at_jd(jd, pconst):
     }
 
 
-def refine_aspect(p1, p2, target_arc, jd_start, jd_end, tol_seconds=1):
+def _aspect_error(p1, p2, target_arc):
+    """f(jd) = signed distance of the p1-p2 arc from the target, in [-180, 180)."""
     def f(jd):
-        a = norm(swe.calc_ut(jd, p1)[0])
-        b = norm(swe.calc_ut(jd, p2)[0])
-        diff = (a - b + 180.0) % 360.0 - 180.0
-        return diff - target_arc
-    a = jd_start
-    b = jd_end
-    fa = f(a)
-    fb = f(b)
+        return wrap180(planet_longitude(jd, p1) - planet_longitude(jd, p2) - target_arc)
+    return f
+
+
+def _secant_root(f, a, b, fa, fb, xtol):
+    """Illinois false-position on a sign-changing bracket (fallback when scipy is missing)."""
+    for _ in range(100):
+        c = b - fb * (b - a) / (fb - fa)
+        fc = f(c)
+        if fc == 0:
+            return c
+        if fc * fb < 0:
+            a, fa = b, fb
+        else:
+            fa /= 2.0
+        b, fb = c, fc
+        if abs(b - a) < xtol:
+            return b
+    return b
+
+
+def _golden_min(f, a, b, xtol):
+    """Golden-section minimum of f on [a, b] (fallback when scipy is missing)."""
+    g = (math.sqrt(5.0) - 1.0) / 2.0
+    c, d = b - g * (b - a), a + g * (b - a)
+    fc, fd = f(c), f(d)
+    while b - a > xtol:
+        if fc < fd:
+            b, d, fd = d, c, fc
+            c = b - g * (b - a)
+            fc = f(c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + g * (b - a)
+            fd = f(d)
+    return (a + b) / 2.0
+
+
+def refine_aspect(p1, p2, target_arc, jd_start, jd_end, tol_seconds=ROOT_TOL_SECONDS, f_start=None, f_end=None):
+    """Exact time the p1-p2 arc crosses `target_arc` inside a sign-changing bracket.
+
+    `f_start`/`f_end` may carry the already sampled errors at the bracket ends so they are
+    not recomputed. Uses Brent's method (scipy) or an Illinois secant fallback.
+    """
+    f = _aspect_error(p1, p2, target_arc)
+    fa = f(jd_start) if f_start is None else f_start
+    fb = f(jd_end) if f_end is None else f_end
     if fa == 0:
-        return a
+        return jd_start
     if fb == 0:
-        return b
-    for _ in range(60):
-        mid = (a + b) / 2.0
-        fm = f(mid)
-        if abs(fm) < 1e-8:
-            return mid
-        if fa * fm <= 0:
-            b = mid
-            fb = fm
-        else:
-            a = mid
-            fa = fm
-        if (b - a) * 86400.0 < tol_seconds:
-            return (a+b)/2.0
-    return (a+b)/2.0
+        return jd_end
+    xtol = tol_seconds / 86400.0
+    if SCIPY_AVAILABLE:
+        return brentq(f, jd_start, jd_end, xtol=xtol)
+    return _secant_root(f, jd_start, jd_end, fa, fb, xtol)
 
 
-def find_aspects(start_date, end_date, targets=[0.0,180.0], orb=1.0):
-    jd0 = swe.julday(start_date.year, start_date.month, start_date.day)
-    jd1 = swe.julday(end_date.year, end_date.month, end_date.day)
-    step = 0.5
+def refine_touch(p1, p2, target_arc, jd_start, jd_end, tol_seconds=ROOT_TOL_SECONDS):
+    """Time of closest approach to `target_arc` when the arc touches it without crossing."""
+    f = _aspect_error(p1, p2, target_arc)
+    err = lambda jd: abs(f(jd))
+    xtol = tol_seconds / 86400.0
+    if SCIPY_AVAILABLE:
+        return minimize_scalar(err, bounds=(jd_start, jd_end), method='bounded', options={'xatol': xtol}).x
+    return _golden_min(err, jd_start, jd_end, xtol)
+
+
+def sample_longitudes(jd0, jd1, step=SCAN_STEP):
+    """Sample every planet in PLANETS once on a fixed grid: returns (jds, lons[planet, sample])."""
+    jds = jd0 + np.arange(int(math.floor((jd1 - jd0) / step)) + 1) * step
+    lons = np.empty((len(PLANETS), len(jds)))
+    for k, (pconst, _, _) in enumerate(PLANETS):
+        lons[k] = [planet_longitude(jd, pconst) for jd in jds.tolist()]
+    return jds, lons
+
+
+def _aspect_brackets(jds, err, orb, coarse):
+    """Sample intervals holding a root of `err`, plus local minima that only touch the orb.
+
+    Returns (crossings, touches) as lists of (index_lo, index_hi). Sign flips across the
+    +/-180 wrap are not roots and are skipped.
+    """
+    neg = err < 0
+    flip = (neg[:-1] != neg[1:]) & (np.abs(err[:-1] - err[1:]) < 180.0)
+    crossings = [(int(n), int(n) + 1) for n in np.flatnonzero(flip)]
+
+    touches = []
+    mag = np.abs(err)
+    if len(err) >= 3:
+        interior = (mag[1:-1] <= mag[:-2]) & (mag[1:-1] <= mag[2:]) & (mag[1:-1] <= orb + coarse)
+        for n in (np.flatnonzero(interior) + 1).tolist():
+            if not (flip[n - 1] or flip[n]):
+                touches.append((n - 1, n + 1))
+    return crossings, touches
+
+
+def _scan_pair(task):
+    """Find every target-arc hit for one planet pair from its cached longitude samples."""
+    i, j, jds, lon1, lon2, targets, orb, coarse = task
+    p1, p1_en, p1_te = PLANETS[i]
+    p2, p2_en, p2_te = PLANETS[j]
     events = []
-    planet_consts = [p[0] for p in PLANETS]
-    for i in range(len(planet_consts)):
-        for j in range(i+1, len(planet_consts)):
-            p1 = planet_consts[i]
-            p2 = planet_consts[j]
-            jd = jd0
-            while jd <= jd1:
-                a = norm(swe.calc_ut(jd, p1)[0])
-                b = norm(swe.calc_ut(jd, p2)[0])
-                diff = abs((a - b + 180.0) % 360.0 - 180.0)
-                if diff <= orb + 2.0:
-                    low = max(jd - 1.0, jd0)
-                    high = min(jd + 1.0, jd1)
-                    for tgt in targets:
-                        refined = refine_aspect(p1, p2, tgt, low, high)
-                        final_a = norm(swe.calc_ut(refined, p1)[0])
-                        final_b = norm(swe.calc_ut(refined, p2)[0])
-                        final_diff = abs((final_a - final_b + 180.0) % 360.0 - 180.0)
-                        if final_diff <= orb:
-                            dt = jd_to_datetime(refined)
-                            p1info = planet_info_at_jd(refined, p1)
-                            p2info = planet_info_at_jd(refined, p2)
-                            ved = compute_vedic(refined)
-                            p1_en = next(x[1] for x in PLANETS if x[0]==p1)
-                            p1_te = next(x[2] for x in PLANETS if x[0]==p1)
-                            p2_en = next(x[1] for x in PLANETS if x[0]==p2)
-                            p2_te = next(x[2] for x in PLANETS if x[0]==p2)
-                            events.append({
-                                "datetime": dt.isoformat(),
-                                "jd": round(refined,6),
-                                "type": "Conjunction" if tgt==0.0 else ("Opposition" if tgt==180.0 else f"Arc {tgt}"),
-                                "planet1_en": p1_en,
-                                "planet1_te": p1_te,
-                                "planet2_en": p2_en,
-                                "planet2_te": p2_te,
-                                "degree_diff": round(final_diff,4),
-                                "planet1": p1info,
-                                "planet2": p2info,
-                                "vedic": ved
-                            })
-                jd += step
+    for tgt in targets:
+        err = wrap180(lon1 - lon2 - tgt)
+        crossings, touches = _aspect_brackets(jds, err, orb, coarse)
+        hits = [refine_aspect(p1, p2, tgt, jds[lo], jds[hi], f_start=err[lo], f_end=err[hi]) for lo, hi in crossings]
+        hits += [refine_touch(p1, p2, tgt, jds[lo], jds[hi]) for lo, hi in touches]
+        for refined in sorted(float(h) for h in hits):
+            final_a = planet_longitude(refined, p1)
+            final_b = planet_longitude(refined, p2)
+            if abs(wrap180(final_a - final_b - tgt)) > orb:
+                continue
+            final_diff = abs(wrap180(final_a - final_b))
+            events.append({
+                "datetime": jd_to_datetime(refined).isoformat(),
+                "jd": round(refined,6),
+                "type": "Conjunction" if tgt==0.0 else ("Opposition" if tgt==180.0 else f"Arc {tgt}"),
+                "planet1_en": p1_en,
+                "planet1_te": p1_te,
+                "planet2_en": p2_en,
+                "planet2_te": p2_te,
+                "degree_diff": round(final_diff,4),
+                "planet1": planet_info_at_jd(refined, p1),
+                "planet2": planet_info_at_jd(refined, p2),
+                "vedic": compute_vedic(refined)
+            })
+    return events
+
+
+def all_pairs():
+    return [(i, j) for i in range(len(PLANETS)) for j in range(i+1, len(PLANETS))]
+
+
+def pair_key(i, j):
+    return f"{PLANETS[i][1]}-{PLANETS[j][1]}"
+
+
+def scan_window(jd0, jd1, pairs=None, targets=(0.0, 180.0), orb=1.0, workers=None, step=SCAN_STEP):
+    """Exact aspect times for the given (i, j) PLANETS index pairs between two Julian days.
+
+    Longitudes are sampled once per planet and shared by all pairs; pairs are scanned in
+    a process pool of `workers` processes (default: CPU count, 1 = in-process).
+    """
+    pairs = all_pairs() if pairs is None else pairs
+    jds, lons = sample_longitudes(jd0, jd1, step)
+
+    # Largest arc change between samples; minima further than this from the target cannot touch the orb
+    coarse = float(np.max(np.abs(wrap180(np.diff(lons, axis=1))))) * 2.0 if lons.shape[1] > 1 else 0.0
+    tasks = [(i, j, jds, lons[i], lons[j], list(targets), orb, coarse) for i, j in pairs]
+    if not tasks:
+        return []
+
+    workers = (os.cpu_count() or 1) if workers is None else max(1, int(workers))
+    results = None
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                results = list(pool.map(_scan_pair, tasks))
+        except Exception as e:
+            print(f"Process pool unavailable ({e}); scanning in-process")
+    if results is None:
+        results = [_scan_pair(task) for task in tasks]
+
+    events = [ev for pair_events in results for ev in pair_events]
     events.sort(key=lambda x: x['jd'])
     return events
 
 
+def find_aspects(start_date, end_date, targets=[0.0,180.0], orb=1.0, workers=None, step=SCAN_STEP):
+    """Exact aspect times for every pair in PLANETS between two dates."""
+    jd0 = swe.julday(start_date.year, start_date.month, start_date.day)
+    jd1 = swe.julday(end_date.year, end_date.month, end_date.day)
+    return scan_window(jd0, jd1, all_pairs(), targets, orb, workers, step)
+
+
 ASTRO_RULES = [
     (lambda ev: ev['planet1_en'] in ['Jupiter','Venus'] or ev['planet2_en'] in ['Jupiter','Venus'], ['EURUSD','GBPUSD','AUDUSD','NZDUSD'], 'Bullish Risk-On', 0.6),
     (lambda ev: ev['planet1_en'] in ['Saturn','Mars'] or ev['planet2_en'] in ['Saturn','Mars'], ['USDJPY','USDCAD','USDCHF','XAUUSD'], 'Bearish Risk-Off', 0.6),
@@ -235,16 +364,82 @@ def generate_predictions(events):
     return preds
 
 
+def refresh_events(store, start, end, targets=(0.0, 180.0), orb=0.5, workers=None, full=False):
+    """Bring the event store up to date for [start, end].
+
+    Each pair records the span it has been scanned over ([scanned_from, checkpoint]). Only
+    what [start, end] adds to that span is scanned: forward from the checkpoint and, when
+    the window was widened into the past, back from scanned_from (each with a small overlap
+    the store deduplicates). Changed scan parameters or `full` force a rescan.
+    Events older than the month of `start` are archived. Returns (added, archived).
+    """
+    jd_start = swe.julday(start.year, start.month, start.day)
+    jd_end = swe.julday(end.year, end.month, end.day)
+    params = {'targets': [float(t) for t in targets], 'orb': orb, 'step': SCAN_STEP}
+
+    state = store.load_state()
+    if full or state.get('params') != params:
+        store.reset()
+        checkpoints, scanned_from = {}, {}
+    else:
+        checkpoints = state.get('checkpoints', {})
+        scanned_from = state.get('scanned_from', {})
+
+    # Windows to scan -> pairs; pairs sharing a window share one sampling pass
+    groups = {}
+    for i, j in all_pairs():
+        key = pair_key(i, j)
+        first, last = scanned_from.get(key), checkpoints.get(key)
+        if first is None or last is None or jd_start > last:
+            # Never scanned, or the window moved past the old span: start a new span
+            windows = [(jd_start, jd_end)]
+            first, last = jd_start, jd_end
+        else:
+            windows = []
+            if jd_start < first:
+                windows.append((jd_start, first + CHECKPOINT_OVERLAP_DAYS))
+            if jd_end > last:
+                windows.append((max(jd_start, last - CHECKPOINT_OVERLAP_DAYS), jd_end))
+            first, last = min(first, jd_start), max(last, jd_end)
+        for window in windows:
+            groups.setdefault(window, []).append((i, j))
+        scanned_from[key], checkpoints[key] = first, last
+
+    added = 0
+    for (begin, stop), pairs in sorted(groups.items()):
+        added += store.add(scan_window(begin, stop, pairs, targets, orb, workers))
+
+    # Midnight UT of the 1st: julday() defaults to noon, which would keep half a day too few
+    cutoff = swe.julday(start.year, start.month, 1, 0.0)
+    archived = store.archive_before(cutoff)
+    # Archived days no longer count as scanned, so widening the window again restores them
+    for key, first in scanned_from.items():
+        scanned_from[key] = max(first, min(cutoff, checkpoints[key]))
+    store.save_state(params, checkpoints, scanned_from)
+    return added, archived
+
+
 if __name__ == '__main__':
+    import argparse
+    from event_store import EventStore
+
+    parser = argparse.ArgumentParser(description="Scan planetary aspects into data/astro_events.*")
+    parser.add_argument('--full', action='store_true', help="ignore checkpoints and rescan the whole window")
+    parser.add_argument('--past-days', type=int, default=365)
+    parser.add_argument('--future-days', type=int, default=365)
+    parser.add_argument('--workers', type=int, default=None, help="scan processes (default: CPU count)")
+    parser.add_argument('--data-dir', default='data')
+    args = parser.parse_args()
+
     today = datetime.date.today()
-    start = today - datetime.timedelta(days=365)
-    end = today + datetime.timedelta(days=365)
-    print(f"Scanning {start} -> {end} (may take a few minutes)")
-    evts = find_aspects(start, end, targets=[0.0,180.0], orb=0.5)
-    os.makedirs('data', exist_ok=True)
-    with open('data/astro_events.json','w',encoding='utf-8') as f:
-        json.dump(evts,f,ensure_ascii=False,indent=2)
+    start = today - datetime.timedelta(days=args.past_days)
+    end = today + datetime.timedelta(days=args.future_days)
+    store = EventStore(args.data_dir)
+    print(f"Scanning {start} -> {end} ({'full' if args.full else 'incremental'})")
+    added, archived = refresh_events(store, start, end, targets=[0.0,180.0], orb=0.5, workers=args.workers, full=args.full)
+
+    evts = store.events
     preds = generate_predictions(evts)
-    with open('data/astro_predictions.json','w',encoding='utf-8') as f:
-        json.dump(preds,f,ensure_ascii=False,indent=2)
-    print(f"Wrote {len(evts)} events and {len(preds)} predictions to data/")
+    store.export('astro_events.json', evts)
+    store.export('astro_predictions.json', preds)
+    print(f"Added {added} events, archived {archived}; wrote {len(evts)} events and {len(preds)} predictions to {args.data_dir}/")
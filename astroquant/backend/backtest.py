@@ -1,31 +1,139 @@
 """
 backtest.py
-- Simple skeleton to overlay predictions on OHLC CSV and compute hit-rate metrics
+- Overlay astro predictions on OHLC bars and compute hit-rate metrics per rule.
+- Every (prediction, rule match, pair) becomes one trade; trade times are mapped to the
+  first bar strictly after the event with one searchsorted per symbol, and forward
+  returns for all horizons come out as a (trades x horizons) matrix.
+- Rules are identified by their bias label (each ASTRO_RULES entry has its own bias).
+  Bullish rules are scored long, Bearish short, the rest on the raw forward return.
+- OHLC CSV needs `timestamp` and `close`; an optional `symbol` column holds several pairs,
+  otherwise the whole file is treated as --symbol.
 """
-import pandas as pd, json
-
-ohlc = pd.read_csv('astroquant/data/ohlc_sample.csv', parse_dates=['timestamp'])
-with open('astroquant/data/astro_predictions.json','r',encoding='utf-8') as f:
-    preds = json.load(f)
-
-results = []
-for p in preds:
-    for m in p['matches']:
-        if 'EURUSD' in m['pairs'] and 'Bullish' in m['bias']:
-            t = pd.to_datetime(p['datetime'])
-            next_row = ohlc[ohlc['timestamp']>t].head(1)
-            if next_row.empty: continue
-            entry = next_row.iloc[0]['close']
-            idx = next_row.index[0]
-            exit_idx = min(idx+24, len(ohlc)-1)
-            exit_price = ohlc.loc[exit_idx,'close']
-            ret = (exit_price - entry)/entry
-            results.append(ret)
+import argparse, json
 
 import numpy as np
-if results:
-    print('N trades', len(results))
-    print('mean return', np.mean(results))
-    print('winrate', sum(1 for r in results if r>0)/len(results))
-else:
-    print('no trades found')
+import pandas as pd
+
+DEFAULT_HORIZONS = (1, 4, 24)
+
+
+def rule_direction(bias):
+    if 'Bullish' in bias:
+        return 1.0
+    if 'Bearish' in bias:
+        return -1.0
+    return 1.0
+
+
+def load_ohlc(path, symbol='EURUSD'):
+    """{symbol: (bar times as int64 ns, close prices)} sorted by time."""
+    df = pd.read_csv(path, parse_dates=['timestamp'])
+    if 'symbol' not in df.columns:
+        df['symbol'] = symbol
+    bars = {}
+    for sym, g in df.groupby('symbol', sort=False):
+        g = g.sort_values('timestamp', kind='stable')
+        bars[str(sym).upper()] = (
+            g['timestamp'].to_numpy(dtype='datetime64[ns]').astype(np.int64),
+            g['close'].to_numpy(dtype=float),
+        )
+    return bars
+
+
+def flatten_predictions(preds):
+    """One row per (prediction, match, pair): time, rule, pair, confidence, direction."""
+    rows = [
+        (p['datetime'], m['bias'], pair.upper(), m.get('confidence', np.nan))
+        for p in preds for m in p['matches'] for pair in m['pairs']
+    ]
+    trades = pd.DataFrame(rows, columns=['time', 'rule', 'pair', 'confidence'])
+    trades['time'] = pd.to_datetime(trades['time'])
+    trades['direction'] = trades['rule'].map(rule_direction).astype(float)
+    return trades
+
+
+def forward_returns(bar_times, close, event_times, horizons):
+    """Entry bar index and (events x horizons) forward returns.
+
+    Entry is the close of the first bar after each event; horizons that run past the last
+    bar are NaN.
+    """
+    horizons = np.asarray(horizons, dtype=np.int64)
+    entry = np.searchsorted(bar_times, event_times, side='right')
+    exit_idx = entry[:, None] + horizons[None, :]
+    valid = exit_idx < len(close)
+    entry_px = close[np.minimum(entry, len(close) - 1)][:, None]
+    exit_px = close[np.minimum(exit_idx, len(close) - 1)]
+    returns = np.where(valid, (exit_px - entry_px) / entry_px, np.nan)
+    return entry, returns
+
+
+def run_backtest(bars, preds, horizons=DEFAULT_HORIZONS):
+    """Trades DataFrame with entry bar and one `ret_<h>` column per horizon (direction-signed)."""
+    trades = flatten_predictions(preds)
+    trades = trades[trades['pair'].isin(bars.keys())].reset_index(drop=True)
+    ret_cols = [f'ret_{h}' for h in horizons]
+    matrix = np.full((len(trades), len(horizons)), np.nan)
+    entry = np.full(len(trades), -1, dtype=np.int64)
+
+    event_ns = trades['time'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    for pair, idx in trades.groupby('pair').indices.items():
+        bar_times, close = bars[pair]
+        entry[idx], matrix[idx] = forward_returns(bar_times, close, event_ns[idx], horizons)
+
+    trades['entry_bar'] = entry
+    signed = matrix * trades['direction'].to_numpy()[:, None]
+    trades[ret_cols] = pd.DataFrame(signed, index=trades.index)
+    return trades
+
+
+def max_drawdown(returns):
+    """Largest peak-to-trough drop of the additive equity curve of a return series."""
+    r = np.asarray(returns, dtype=float)
+    r = r[~np.isnan(r)]
+    if r.size == 0:
+        return np.nan
+    equity = np.concatenate([[0.0], np.cumsum(r)])
+    return float(np.max(np.maximum.accumulate(equity) - equity))
+
+
+def summarize(trades, horizons=DEFAULT_HORIZONS, by_pair=False):
+    """Per rule (and optionally pair) and horizon: trades, hit rate, mean return, max drawdown."""
+    keys = ['rule', 'pair'] if by_pair else ['rule']
+    trades = trades.sort_values('time', kind='stable')
+    rows = []
+    for key, g in trades.groupby(keys, sort=True):
+        key = key if isinstance(key, tuple) else (key,)
+        for h in horizons:
+            r = g[f'ret_{h}'].to_numpy()
+            r = r[~np.isnan(r)]
+            rows.append(dict(zip(keys, key), horizon=h, trades=int(r.size),
+                             hit_rate=float(np.mean(r > 0)) if r.size else np.nan,
+                             mean_return=float(np.mean(r)) if r.size else np.nan,
+                             max_drawdown=max_drawdown(r)))
+    return pd.DataFrame(rows, columns=keys + ['horizon', 'trades', 'hit_rate', 'mean_return', 'max_drawdown'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest astro predictions against OHLC bars")
+    parser.add_argument('--ohlc', default='astroquant/data/ohlc_sample.csv')
+    parser.add_argument('--predictions', default='astroquant/data/astro_predictions.json')
+    parser.add_argument('--symbol', default='EURUSD', help="pair name when the CSV has no symbol column")
+    parser.add_argument('--horizons', default=','.join(map(str, DEFAULT_HORIZONS)), help="comma-separated bar counts")
+    parser.add_argument('--by-pair', action='store_true', help="break results down per pair")
+    args = parser.parse_args()
+
+    horizons = [int(h) for h in args.horizons.split(',') if h.strip()]
+    bars = load_ohlc(args.ohlc, args.symbol)
+    with open(args.predictions, 'r', encoding='utf-8') as f:
+        preds = json.load(f)
+
+    trades = run_backtest(bars, preds, horizons)
+    if trades.empty:
+        print('no trades found')
+        return
+    print(summarize(trades, horizons, by_pair=args.by_pair).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+event_store.py
+- Append-only store for astro_events.py output.
+- data/astro_events.jsonl holds one compact event per line; events are indexed by
+  (planet1, planet2, type) and jd, and an event within JD_TOLERANCE of an indexed one is
+  a duplicate, so rescanned overlaps never duplicate.
+- data/astro_scan_state.json records the scan parameters and the scanned span (first and
+  last Julian day) per planet pair, so a refresh only scans what the window adds.
+- Events that fall out of the live window are moved to data/archive/astro_events_YYYY-MM.jsonl.
+"""
+import bisect, json, os
+
+EVENTS_FILE = 'astro_events.jsonl'
+STATE_FILE = 'astro_scan_state.json'
+ARCHIVE_DIR = 'archive'
+STATE_VERSION = 2
+# Two minutes: the same root found from overlapping scans lands well within this, and
+# distinct events of one pair and type are days apart
+JD_TOLERANCE = 2 / 1440
+
+
+def event_key(ev):
+    return (ev['planet1_en'], ev['planet2_en'], ev['type'])
+
+
+class EventIndex:
+    """Sorted jds per event_key; membership matches within JD_TOLERANCE, so roots on either
+    side of a rounding boundary still count as the same event."""
+
+    def __init__(self, events=()):
+        self._jds = {}
+        for ev in events:
+            self.add(ev)
+
+    def __contains__(self, ev):
+        jds = self._jds.get(event_key(ev), ())
+        i = bisect.bisect_left(jds, ev['jd'] - JD_TOLERANCE)
+        return i < len(jds) and jds[i] <= ev['jd'] + JD_TOLERANCE
+
+    def add(self, ev):
+        bisect.insort(self._jds.setdefault(event_key(ev), []), ev['jd'])
+
+
+def dump_line(ev):
+    return json.dumps(ev, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def read_events(path):
+    """Events of a .jsonl file; a torn last line left by an interrupted append is dropped
+    (and truncated away)."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    end = raw.rfind(b'\n') + 1
+    if end < len(raw):
+        with open(path, 'r+b') as f:
+            f.truncate(end)
+    return [json.loads(line) for line in raw[:end].decode('utf-8').splitlines() if line.strip()]
+
+
+def write_json_atomic(path, payload):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+class EventStore:
+    def __init__(self, data_dir='data'):
+        self.data_dir = data_dir
+        self.events_path = os.path.join(data_dir, EVENTS_FILE)
+        self.state_path = os.path.join(data_dir, STATE_FILE)
+        self.archive_dir = os.path.join(data_dir, ARCHIVE_DIR)
+        self.events = []
+        self.index = EventIndex()
+        os.makedirs(data_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.events_path):
+            return
+        for ev in read_events(self.events_path):
+            if ev not in self.index:
+                self.index.add(ev)
+                self.events.append(ev)
+        self.events.sort(key=lambda x: x['jd'])
+
+    def load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return state if state.get('version') == STATE_VERSION else {}
+
+    def save_state(self, params, checkpoints, scanned_from):
+        write_json_atomic(self.state_path, {'version': STATE_VERSION, 'params': params, 'checkpoints': checkpoints,
+                                            'scanned_from': scanned_from})
+
+    def reset(self):
+        """Forget live events and checkpoints (full rescan)."""
+        self.events, self.index = [], EventIndex()
+        for path in (self.events_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def add(self, events):
+        """Append events not already indexed; returns how many were new."""
+        fresh = []
+        for ev in events:
+            if ev not in self.index:
+                self.index.add(ev)
+                fresh.append(ev)
+        if fresh:
+            with open(self.events_path, 'a', encoding='utf-8') as f:
+                f.writelines(dump_line(ev) for ev in fresh)
+            self.events.extend(fresh)
+            self.events.sort(key=lambda x: x['jd'])
+        return len(fresh)
+
+    def archive_before(self, jd_cutoff):
+        """Move events older than `jd_cutoff` into monthly archive files; returns the count moved."""
+        old = [ev for ev in self.events if ev['jd'] < jd_cutoff]
+        if not old:
+            return 0
+        os.makedirs(self.archive_dir, exist_ok=True)
+        by_month = {}
+        for ev in old:
+            by_month.setdefault(ev['datetime'][:7], []).append(ev)
+        for month, month_events in by_month.items():
+            path = os.path.join(self.archive_dir, f'astro_events_{month}.jsonl')
+            # A window widened into the past rescans archived months: skip what is there
+            archived = EventIndex(read_events(path)) if os.path.exists(path) else EventIndex()
+            month_events = [ev for ev in month_events if ev not in archived]
+            with open(path, 'a', encoding='utf-8') as f:
+                f.writelines(dump_line(ev) for ev in month_events)
+
+        self.events = [ev for ev in self.events if ev['jd'] >= jd_cutoff]
+        self.index = EventIndex(self.events)
+        tmp = self.events_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.writelines(dump_line(ev) for ev in self.events)
+        os.replace(tmp, self.events_path)
+        return len(old)
+
+    def export(self, filename, payload):
+        """Write a compact JSON snapshot (e.g. astro_events.json for server.js)."""
+        write_json_atomic(os.path.join(self.data_dir, filename), payload)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# astro_events.py imports event_store by bare name, as when run from this directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,108 @@
+import datetime
+import json
+import os
+
+import pytest
+
+import event_store
+from event_store import JD_TOLERANCE, STATE_VERSION, EventIndex, EventStore, read_events
+
+
+def event(jd, day, planet1="Sun", planet2="Moon", kind="conjunction"):
+    return {"datetime": f"{day}T12:00:00", "jd": jd, "type": kind, "planet1_en": planet1, "planet2_en": planet2}
+
+
+def live_lines(store):
+    return [json.loads(line) for line in open(store.events_path, encoding="utf-8")]
+
+
+def test_index_matches_within_tolerance_only():
+    index = EventIndex([event(2460000.5, "2023-02-24")])
+    # The same root found from two overlapping scans, either side of a rounding boundary
+    assert event(2460000.5 + JD_TOLERANCE * 0.9, "2023-02-24") in index
+    assert event(2460000.5 - JD_TOLERANCE * 0.9, "2023-02-24") in index
+    assert event(2460000.5 + JD_TOLERANCE * 1.5, "2023-02-24") not in index
+    assert event(2460000.5, "2023-02-24", kind="opposition") not in index
+    assert event(2460000.5, "2023-02-24", planet2="Mars") not in index
+
+
+def test_add_skips_duplicates_and_persists(tmp_path):
+    store = EventStore(str(tmp_path))
+    assert store.add([event(2460000.5, "2023-02-24"), event(2460010.5, "2023-03-06")]) == 2
+    assert store.add([event(2460000.5 + 1e-4, "2023-02-24"), event(2459990.5, "2023-02-14")]) == 1
+    assert [ev["jd"] for ev in store.events] == [2459990.5, 2460000.5, 2460010.5]
+    assert len(live_lines(store)) == 3
+    assert [ev["jd"] for ev in EventStore(str(tmp_path)).events] == [2459990.5, 2460000.5, 2460010.5]
+
+
+def test_torn_last_line_is_dropped_and_truncated(tmp_path):
+    store = EventStore(str(tmp_path))
+    store.add([event(2460000.5, "2023-02-24"), event(2460010.5, "2023-03-06")])
+    # An append interrupted half way through its last line
+    with open(store.events_path, "a", encoding="utf-8") as f:
+        f.write(event_store.dump_line(event(2460020.5, "2023-03-16"))[:25])
+    reopened = EventStore(str(tmp_path))
+    assert [ev["jd"] for ev in reopened.events] == [2460000.5, 2460010.5]
+    assert open(reopened.events_path, "rb").read().endswith(b"}\n")
+    # Later appends start on a clean line
+    reopened.add([event(2460020.5, "2023-03-16")])
+    assert [ev["jd"] for ev in read_events(reopened.events_path)] == [2460000.5, 2460010.5, 2460020.5]
+
+
+def test_archive_moves_old_events_into_monthly_files_once(tmp_path):
+    store = EventStore(str(tmp_path))
+    jan, feb, mar = event(2459950.5, "2023-01-05"), event(2459980.5, "2023-02-04"), event(2460010.5, "2023-03-06")
+    store.add([jan, feb, mar])
+    assert store.archive_before(2460000.5) == 2
+    assert [ev["jd"] for ev in store.events] == [2460010.5] and live_lines(store) == [mar]
+    archive = os.path.join(store.archive_dir, "astro_events_{}.jsonl")
+    assert read_events(archive.format("2023-01")) == [jan] and read_events(archive.format("2023-02")) == [feb]
+    # A widened window rescans archived months: archiving them again adds no duplicates
+    store.add([dict(jan, jd=jan["jd"] + 1e-4), event(2459960.5, "2023-01-15")])
+    assert store.archive_before(2460000.5) == 2
+    assert [ev["jd"] for ev in read_events(archive.format("2023-01"))] == [2459950.5, 2459960.5]
+    assert store.archive_before(2460000.5) == 0
+
+
+def test_state_of_another_version_is_ignored(tmp_path):
+    store = EventStore(str(tmp_path))
+    assert store.load_state() == {}
+    store.save_state({"orb": 0.5}, {"Sun-Moon": 2460010.5}, {"Sun-Moon": 2460000.5})
+    assert store.load_state() == {"version": STATE_VERSION, "params": {"orb": 0.5},
+                                  "checkpoints": {"Sun-Moon": 2460010.5}, "scanned_from": {"Sun-Moon": 2460000.5}}
+    with open(store.state_path, "w", encoding="utf-8") as f:
+        json.dump({"version": STATE_VERSION - 1, "params": {"orb": 0.5}, "checkpoints": {}}, f)
+    assert store.load_state() == {}
+    store.reset()
+    assert store.events == [] and not os.path.exists(store.state_path)
+
+
+def same_events(got, want, jd_start, jd_end):
+    # The live store also keeps the start of the window's first month (archiving is monthly)
+    got = [ev for ev in got if jd_start <= ev["jd"] <= jd_end]
+    want = [ev for ev in want if jd_start <= ev["jd"] <= jd_end]
+    index = EventIndex(want)
+    return len(got) == len(want) and all(ev in index for ev in got)
+
+
+def test_incremental_refresh_matches_a_full_scan(tmp_path):
+    swe = pytest.importorskip("swisseph")
+    from astro_events import refresh_events
+
+    start, end = datetime.date(2024, 3, 10), datetime.date(2024, 5, 20)
+    store = EventStore(str(tmp_path / "incremental"))
+    refresh_events(store, start, end, workers=1)
+    # Moved forward, then widened into the past, then narrowed and widened again
+    windows = [(start + datetime.timedelta(days=20), end + datetime.timedelta(days=30)),
+               (start - datetime.timedelta(days=60), end + datetime.timedelta(days=30)),
+               (start + datetime.timedelta(days=45), end + datetime.timedelta(days=30)),
+               (start - datetime.timedelta(days=60), end + datetime.timedelta(days=40))]
+    for begin, stop in windows:
+        refresh_events(store, begin, stop, workers=1)
+        full = EventStore(str(tmp_path / f"full-{begin}-{stop}"))
+        refresh_events(full, begin, stop, workers=1, full=True)
+        jd_start, jd_end = (swe.julday(d.year, d.month, d.day) for d in (begin, stop))
+        assert same_events(store.events, full.events, jd_start, jd_end), (begin, stop)
+        assert min(ev["jd"] for ev in store.events) >= swe.julday(begin.year, begin.month, 1, 0.0)
+    # Nothing left to scan: a repeated refresh adds nothing
+    assert refresh_events(store, *windows[-1], workers=1)[0] == 0
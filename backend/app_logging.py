@@ -0,0 +1,114 @@
+"""
+app_logging.py
+- Structured logging for the backend, replacing print() on the request and stream paths.
+- One JSON object per line (LOG_FORMAT=json, the default) or a compact text line
+  (LOG_FORMAT=text); the level comes from LOG_LEVEL and defaults to INFO, so DEBUG calls
+  cost a single level check.
+- Non-blocking: loggers only enqueue records (QueueHandler); a QueueListener thread does
+  the formatting and the stderr write.
+- log_sampled() logs only every Nth occurrence per key for high-frequency events (per
+  request, per tick) and reports how many occurrences it stands for.
+- Structured fields go in extra=fields(key=value, ...).
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Default 1-in-N rate for log_sampled
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+ROOT_LOGGER = "astroquant"
+
+_setup_lock = threading.Lock()
+_listener = None
+_sample_counts = {}
+_sample_lock = threading.Lock()
+
+
+def fields(**values) -> dict:
+    """`extra` argument carrying structured fields: log.info("msg", extra=fields(symbol=s))."""
+    return {"fields": values}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        extra = getattr(record, "fields", None)
+        if extra:
+            line += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Merge args and render the traceback now (the objects may change or die before the
+        # listener runs) but leave formatting, and the structured fields, to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging():
+    """Configure the "astroquant" logger tree once: queue handler -> listener -> stderr."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+        records = queue.SimpleQueue()
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        root.addHandler(_QueueHandler(records))
+        root.propagate = False
+        _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_sampled(logger: logging.Logger, level: int, key, msg: str, every: int = None, **values):
+    """Log every `every`-th call per `key` (the 1st, the N+1th, ...) with `values` as fields."""
+    if not logger.isEnabledFor(level):
+        return
+    every = max(1, every or LOG_SAMPLE_EVERY)
+    with _sample_lock:
+        count = _sample_counts.get(key, 0) + 1
+        _sample_counts[key] = count
+    if (count - 1) % every == 0:
+        logger.log(level, msg, extra=fields(sample_every=every, occurrences=count, **values))
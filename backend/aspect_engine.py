@@ -0,0 +1,223 @@
+"""
+aspect_engine.py
+- Sweep-and-prune aspect finder used by /astro/aspects and /astro/aspects/timeline.
+- Longitudes are sorted once per timestamp on the circle; for each target angle only the
+  planets whose forward arc falls inside [angle - orb, angle + orb] are looked up
+  (binary search over a doubled, unwrapped copy) instead of testing every pair.
+- Works on a (timestamps x planets) longitude matrix, so a multi-day timeline is one
+  batch of array ops.
+"""
+import numpy as np
+
+MAJOR_ASPECTS = [
+    {"name": "Conjunction", "angle": 0, "orb": 8, "nature": "neutral"},
+    {"name": "Sextile", "angle": 60, "orb": 6, "nature": "harmonious"},
+    {"name": "Square", "angle": 90, "orb": 8, "nature": "challenging"},
+    {"name": "Trine", "angle": 120, "orb": 8, "nature": "harmonious"},
+    {"name": "Opposition", "angle": 180, "orb": 8, "nature": "challenging"},
+]
+
+MINOR_ASPECTS = [
+    {"name": "Semi-sextile", "angle": 30, "orb": 2, "nature": "harmonious"},
+    {"name": "Semi-square", "angle": 45, "orb": 2, "nature": "challenging"},
+    {"name": "Quintile", "angle": 72, "orb": 2, "nature": "harmonious"},
+    {"name": "Sesquiquadrate", "angle": 135, "orb": 2, "nature": "challenging"},
+    {"name": "Bi-quintile", "angle": 144, "orb": 2, "nature": "harmonious"},
+    {"name": "Quincunx", "angle": 150, "orb": 3, "nature": "challenging"},
+]
+
+ASPECT_SETS = {
+    "major": MAJOR_ASPECTS,
+    "minor": MINOR_ASPECTS,
+    "all": MAJOR_ASPECTS + MINOR_ASPECTS,
+}
+
+# Row offset used to pack every timestamp's doubled longitudes into one sorted array;
+# must exceed the 720 degree span of a doubled row plus the widest query window.
+_ROW_STRIDE = 1000.0
+# Slack on the search window so float error never prunes a pair the exact test accepts
+_WINDOW_EPS = 1e-9
+
+
+def harmonic_aspects(n: int, orb: float = None):
+    """Aspects of the n-th harmonic: multiples of 360/n up to the opposition.
+
+    The conjunction is shared by every harmonic and left out. Orbs shrink with the
+    harmonic number unless given explicitly.
+    """
+    n = int(n)
+    if n < 2:
+        raise ValueError("harmonic must be >= 2")
+    orb = max(1.0, 16.0 / n) if orb is None else float(orb)
+    aspects = []
+    for k in range(1, n // 2 + 1):
+        aspects.append({
+            "name": f"H{n} {k}/{n}",
+            "angle": round(360.0 * k / n, 4),
+            "orb": orb,
+            "nature": "harmonic",
+        })
+    return aspects
+
+
+def resolve_aspects(aspect_set: str = "major", harmonic: int = None, orb_scale: float = 1.0):
+    """Build an aspect list from a named set plus an optional harmonic series."""
+    if aspect_set not in ASPECT_SETS:
+        raise ValueError(f"unknown aspect set '{aspect_set}' (expected one of {', '.join(ASPECT_SETS)})")
+    if orb_scale <= 0:
+        raise ValueError("orb_scale must be positive")
+    aspects = list(ASPECT_SETS[aspect_set])
+    if harmonic:
+        angles = {a["angle"] for a in aspects}
+        aspects += [a for a in harmonic_aspects(harmonic) if a["angle"] not in angles]
+    if orb_scale != 1.0:
+        aspects = [dict(a, orb=a["orb"] * orb_scale) for a in aspects]
+    return aspects
+
+
+class SortedLongitudes:
+    """Per-row sorted longitudes, unwrapped once so arc queries never wrap around."""
+
+    def __init__(self, longitudes):
+        lon = np.atleast_2d(np.asarray(longitudes, dtype=float)) % 360.0
+        self.lon = lon
+        self.rows, self.count = lon.shape
+        order = np.argsort(lon, axis=1, kind="stable")
+        ordered = np.take_along_axis(lon, order, axis=1)
+        offsets = np.arange(self.rows, dtype=float)[:, None] * _ROW_STRIDE
+        # Each row holds [sorted, sorted + 360] so a forward arc is one contiguous run
+        self._flat = (np.concatenate([ordered, ordered + 360.0], axis=1) + offsets).ravel()
+        self._flat_planet = np.concatenate([order, order], axis=1).ravel()
+        self._query = (ordered + offsets).ravel()
+        self._query_planet = order.ravel()
+
+    def forward_pairs(self, lo: float, hi: float):
+        """(row, planet, other) index arrays for every forward arc within [lo, hi] degrees."""
+        start = np.searchsorted(self._flat, self._query + lo - _WINDOW_EPS, side="left")
+        end = np.searchsorted(self._flat, self._query + hi + _WINDOW_EPS, side="right")
+        counts = end - start
+        total = int(counts.sum())
+        if total == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+        query = np.repeat(np.arange(len(counts)), counts)
+        pos = np.repeat(start - np.cumsum(counts) + counts, counts) + np.arange(total)
+        planet = self._query_planet[query]
+        other = self._flat_planet[pos]
+        keep = planet != other
+        return query[keep] // self.count, planet[keep], other[keep]
+
+
+def find_aspects(longitudes, aspects=None) -> dict:
+    """Aspects for every row of a (timestamps x planets) longitude matrix.
+
+    Returns parallel arrays: row, planet1 and planet2 (column indices, planet1 < planet2),
+    aspect (index into `aspects`), separation, orb and strength, ordered by row, pair and
+    aspect.
+    """
+    aspects = MAJOR_ASPECTS if aspects is None else aspects
+    index = SortedLongitudes(longitudes)
+    lon = index.lon
+    rows, p1s, p2s, kinds = [], [], [], []
+    for k, aspect in enumerate(aspects):
+        angle, orb = float(aspect["angle"]), float(aspect["orb"])
+        if orb <= 0:
+            raise ValueError(f"aspect '{aspect['name']}' needs a positive orb")
+        # Separations live in [0, 180]; the pair is found from the side whose forward arc is <= 180
+        lo, hi = max(0.0, angle - orb), min(180.0, angle + orb)
+        if lo > hi:
+            continue
+        row, a, b = index.forward_pairs(lo, hi)
+        rows.append(row)
+        p1s.append(np.minimum(a, b))
+        p2s.append(np.maximum(a, b))
+        kinds.append(np.full(len(row), k, dtype=np.int64))
+
+    if not rows:
+        rows, p1s, p2s, kinds = [np.zeros(0, dtype=np.int64)] * 4
+    row, p1, p2, kind = (np.concatenate(parts).astype(np.int64) for parts in (rows, p1s, p2s, kinds))
+
+    # Pairs at exactly 0 or 180 degrees are reached from both sides; keep one
+    n = index.count
+    key = ((row * n + p1) * n + p2) * max(1, len(aspects)) + kind
+    key, first = np.unique(key, return_index=True)
+    row, p1, p2, kind = row[first], p1[first], p2[first], kind[first]
+
+    # Exact test on the original longitudes, same arithmetic as the pairwise loop
+    separation = np.abs(lon[row, p1] - lon[row, p2])
+    separation = np.where(separation > 180, 360 - separation, separation)
+    angles = np.array([float(a["angle"]) for a in aspects])[kind] if len(kind) else np.zeros(0)
+    orbs = np.array([float(a["orb"]) for a in aspects])[kind] if len(kind) else np.zeros(0)
+    orb_diff = np.abs(separation - angles)
+    ok = orb_diff <= orbs
+    return {
+        "row": row[ok],
+        "planet1": p1[ok],
+        "planet2": p2[ok],
+        "aspect": kind[ok],
+        "separation": separation[ok],
+        "orb": orb_diff[ok],
+        "strength": ((orbs - orb_diff) / orbs * 100)[ok],
+    }
+
+
+def aspect_records(hits: dict, planets, aspects=None) -> list:
+    """Aspect dicts for one row of find_aspects output, strongest first."""
+    aspects = MAJOR_ASPECTS if aspects is None else aspects
+    records = []
+    for p1, p2, k, sep, orb_diff, strength in zip(
+        hits["planet1"].tolist(), hits["planet2"].tolist(), hits["aspect"].tolist(),
+        hits["separation"].tolist(), hits["orb"].tolist(), hits["strength"].tolist(),
+    ):
+        aspect = aspects[k]
+        records.append({
+            "planet1": planets[p1],
+            "planet2": planets[p2],
+            "aspect": aspect["name"],
+            "angle": round(sep, 2),
+            "orb": round(orb_diff, 2),
+            "strength": round(strength, 1),
+            "nature": aspect["nature"],
+            "exact": orb_diff < 1.0,
+        })
+    # Hits arrive in (pair, aspect) order, so the stable sort keeps ties in that order
+    return sorted(records, key=lambda x: x["strength"], reverse=True)
+
+
+def aspect_timeline(longitudes, planets, dates, aspects=None) -> list:
+    """Group per-day aspect hits into spans of consecutive days.
+
+    Each span reports its first and last in-orb day and the day the aspect is tightest.
+    """
+    aspects = MAJOR_ASPECTS if aspects is None else aspects
+    hits = find_aspects(longitudes, aspects)
+    if len(hits["row"]) == 0:
+        return []
+    row, p1, p2, kind, orb = hits["row"], hits["planet1"], hits["planet2"], hits["aspect"], hits["orb"]
+    order = np.lexsort((row, kind, p2, p1))
+    row, p1, p2, kind, orb = row[order], p1[order], p2[order], kind[order], orb[order]
+    sep = hits["separation"][order]
+
+    # A new span starts where the (pair, aspect) changes or a day is skipped
+    breaks = np.ones(len(row), dtype=bool)
+    breaks[1:] = (p1[1:] != p1[:-1]) | (p2[1:] != p2[:-1]) | (kind[1:] != kind[:-1]) | (row[1:] != row[:-1] + 1)
+    starts = np.flatnonzero(breaks)
+    ends = np.append(starts[1:], len(row))
+
+    spans = []
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        peak = s + int(np.argmin(orb[s:e]))
+        aspect = aspects[int(kind[s])]
+        spans.append({
+            "planet1": planets[int(p1[s])],
+            "planet2": planets[int(p2[s])],
+            "aspect": aspect["name"],
+            "nature": aspect["nature"],
+            "start": dates[int(row[s])],
+            "end": dates[int(row[e - 1])],
+            "peak": dates[int(row[peak])],
+            "peak_angle": round(float(sep[peak]), 2),
+            "peak_orb": round(float(orb[peak]), 2),
+            "days": e - s,
+        })
+    return sorted(spans, key=lambda x: (x["start"], x["peak"]))
@@ -1,10 +1,24 @@
-from fastapi import APIRouter, Response, HTTPException, Query
+from fastapi import APIRouter, Response, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 import json, os
+import hashlib
+import html
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import random
 import math
+import threading
+import time
 from typing import List
 
+import numpy as np
+
+from aspect_engine import MAJOR_ASPECTS, aspect_records, aspect_timeline, find_aspects, resolve_aspects
+from app_logging import fields, get_logger
+from http_cache import DAY, MINUTE, Validator, content_etag, settings_fingerprint, static_response
+
+logger = get_logger("astro")
+
 try:
     from astro_settings import load_settings
 except ImportError:
@@ -30,6 +44,50 @@ except ImportError:
                 }
         return DefaultSettings()
 
+# Telugu planet labels
+TELUGU = {
+    "sun": "సూర్య (Sūrya)",
+    "moon": "చంద్ర (Candra)",
+    "mercury": "బుధ (Budha)",
+    "venus": "శుక్ర (Śukra)",
+    "mars": "మంగళ (Maṅgala)",
+    "jupiter": "బృహస్పతి (Guru)",
+    "saturn": "శని (Śani)",
+    "uranus": "యురేనస్",
+    "neptune": "నెప్ట్యూన్",
+    "pluto": "ప్లూటో",
+}
+
+# Zodiac signs (English, Telugu) indexed by sign number: the sign of a longitude is
+# ZODIAC[int(longitude // 30) % 12], no scan over degree ranges
+ZODIAC = (
+    ("Aries", "మేషం"), ("Taurus", "వృషభం"),
+    ("Gemini", "మిథునం"), ("Cancer", "కర్కాటకం"),
+    ("Leo", "సింహం"), ("Virgo", "కన్యా"),
+    ("Libra", "తులా"), ("Scorpio", "వృశ్చికం"),
+    ("Sagittarius", "ధనుస్సు"), ("Capricorn", "మకరం"),
+    ("Aquarius", "కుంభం"), ("Pisces", "మీనం"),
+)
+
+EPHEMERIS_FORMATS = ("full", "compact", "ndjson")
+# Longest range of a buffered (full/compact) ephemeris response
+MAX_EPHEMERIS_DAYS = 365
+# format=ndjson streams in chunks with flat memory, so it can go much further
+EPHEMERIS_STREAM_MAX_DAYS = int(os.getenv("EPHEMERIS_STREAM_MAX_DAYS", "36525"))
+# Days computed, serialized and written per chunk of an NDJSON stream
+EPHEMERIS_STREAM_CHUNK = int(os.getenv("EPHEMERIS_STREAM_CHUNK", "32"))
+# Cache-Control max-age (seconds) per conditional route; also capped at the end of the
+# route's time bucket (a UTC day, or a minute for the live nakshatras and orbit3d data).
+# The orbit3d page itself is fixed after startup
+CACHE_MAX_AGE = {
+    "events.ics": 3600, "nakshatras": 60, "ephemeris": 600, "transits": 600, "cycles": 600,
+    "orbit3d": 3600, "orbit3d.data": 60,
+}
+# Longest range of the events.ics feed
+ICS_MAX_DAYS = int(os.getenv("ICS_MAX_DAYS", "730"))
+# Decimal places of float columns in the compact ephemeris (about 0.004 arcseconds)
+COMPACT_DECIMALS = 6
+
 # Built-in astronomical calculation engine
 class SimpleAstroEngine:
     def __init__(self):
@@ -76,12 +134,8 @@ class SimpleAstroEngine:
             'pluto': '#8A2BE2'
         }
 
-    def get_real_time_positions(self, observer_lat=0.0, observer_lon=0.0, time_utc=None):
-        """Generate realistic planetary positions"""
-        base_time = datetime.now().timestamp()
-        
         # Real orbital periods and current approximate positions
-        planets_data = {
+        self.planets_data = {
             'sun': {'period': 365.25, 'distance': 1.0, 'base_angle': 280.0, 'size': 30},
             'moon': {'period': 27.3, 'distance': 0.0026, 'base_angle': 45.0, 'size': 8},
             'mercury': {'period': 88.0, 'distance': 0.39, 'base_angle': 290.0, 'size': 8},
@@ -93,6 +147,15 @@ class SimpleAstroEngine:
             'neptune': {'period': 60190.0, 'distance': 30.1, 'base_angle': 330.0, 'size': 15},
             'pluto': {'period': 90560.0, 'distance': 39.5, 'base_angle': 290.0, 'size': 6}
         }
+
+        # Planets that carry Nakshatra placements
+        self.nakshatra_planets = ['sun', 'moon', 'mercury', 'venus', 'mars', 'jupiter', 'saturn']
+
+    def get_real_time_positions(self, observer_lat=0.0, observer_lon=0.0, time_utc=None):
+        """Generate realistic planetary positions"""
+        base_time = datetime.now().timestamp()
+        
+        planets_data = self.planets_data
         
         positions = {}
         days_since_epoch = (base_time - 946684800) / 86400  # Days since 2000-01-01
@@ -194,70 +257,392 @@ class SimpleAstroEngine:
         
         return visualization_data
 
-    def get_ephemeris_data(self, days_ahead: int = 30, observer_lat: float = 0.0, observer_lon: float = 0.0):
-        """Generate a simple ephemeris for the next N days using the same model.
-        Returns structure compatible with callers in routes: {'ephemeris': [...], 'generated_at': iso, 'period_days': n}
+    def get_ephemeris_arrays(self, days_ahead: int = 30, observer_lat: float = 0.0, observer_lon: float = 0.0, time_utc=None,
+                             start_day: int = 0):
+        """Vectorized ephemeris: one NumPy pass over a (days x planets) grid.
+
+        Uses the same orbital model as get_real_time_positions: positions at `time_utc`
+        (default now) are advanced by each planet's daily speed. Nakshatra index/pada and
+        zodiac sign are derived as array ops. Returns a dict of arrays; see
+        materialize_ephemeris. `start_day` offsets the first row, so a long range can be
+        computed in chunks that match a single call exactly.
         """
-        base_date = datetime.utcnow()
-        ephemeris = []
+        days = max(0, int(days_ahead))
+        if time_utc is None:
+            base_date = datetime.utcnow()
+            base_time = datetime.now().timestamp()
+        else:
+            base_date = time_utc
+            base_time = (time_utc - datetime(1970, 1, 1)).total_seconds()
+        days_since_epoch = (base_time - 946684800) / 86400  # Days since 2000-01-01
 
-        for i in range(max(0, int(days_ahead))):
-            # For simplicity, reuse current-time model but shift timestamp deterministically by days
-            # Temporarily adjust time using a synthetic offset by altering the epoch-based day count
-            # We'll approximate by adding i days to base_date and deriving positions with same method.
-            # Since get_real_time_positions uses current timestamp, we mimic by computing delta angle.
-            # To keep it consistent, we re-run positions and then rotate by daily speed * i.
-            positions_today = self.get_real_time_positions(observer_lat, observer_lon)
-            adjusted_positions = {}
-            for name, pdata in positions_today.items():
-                daily_speed = pdata.get('speed', 0.0)
-                # Advance longitudes by i * daily_speed
-                adj_geo = (pdata['longitude_geocentric'] + daily_speed * i) % 360
-                adj_helio = (pdata['longitude_heliocentric'] + daily_speed * i) % 360
-                adjusted_positions[name] = {
-                    **pdata,
-                    'longitude_geocentric': adj_geo,
-                    'longitude_heliocentric': adj_helio,
-                }
+        names = list(self.planets_data.keys())
+        period = np.array([self.planets_data[n]['period'] for n in names])
+        base_angle = np.array([self.planets_data[n]['base_angle'] for n in names])
+        speed = 360.0 / period
+
+        # Today's positions, then advanced by i * daily_speed for each day offset
+        angle_variation = math.sin(days_since_epoch * 0.1) * 2.0
+        lon0 = (((base_angle + days_since_epoch * speed) % 360) + angle_variation) % 360
+        lat0 = np.sin(lon0 * math.pi / 180) * 2.0
+        helio0 = np.where(np.array(names) == 'sun', 0.0, lon0)
+
+        offsets = np.arange(start_day, start_day + days, dtype=float)[:, None] * speed
+        lon_geo = (lon0 + offsets) % 360
+        lon_helio = (helio0 + offsets) % 360
+
+        # Same ayanamsa approximation as get_nakshatra_positions
+        ayanamsa = 24.1
+        sidereal = (lon_geo - ayanamsa) % 360
+        nak_index = np.clip((sidereal / 13.333333).astype(int), 0, 26)
+        pos_in_nak = sidereal - nak_index * 13.333333
+        pada = (pos_in_nak / 3.333333).astype(int) + 1
+
+        day0 = base_date.replace(hour=12, minute=0, second=0, microsecond=0)
+        return {
+            'planets': names,
+            'dates': [(day0 + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(start_day, start_day + days)],
+            'longitude_geocentric': lon_geo,
+            'latitude_geocentric': np.broadcast_to(lat0, lon_geo.shape),
+            'longitude_heliocentric': lon_helio,
+            'latitude_heliocentric': np.zeros_like(lon_geo),
+            'speed': np.broadcast_to(speed, lon_geo.shape),
+            'distance_au': np.array([self.planets_data[n]['distance'] for n in names]),
+            'size': [self.planets_data[n]['size'] for n in names],
+            'color': [self.planet_colors.get(n, '#FFFFFF') for n in names],
+            'sidereal_longitude': sidereal,
+            'nakshatra_index': nak_index,
+            'pada': pada,
+            'position_in_nakshatra': pos_in_nak,
+            'sign_index': (lon_geo // 30).astype(int) % 12,
+            'ayanamsa': ayanamsa,
+            'generated_at': base_date.isoformat(),
+            'period_days': int(days_ahead),
+        }
+
+    def materialize_ephemeris(self, eph):
+        """Build the per-day dict payload ({'ephemeris': [...], ...}) from ephemeris arrays."""
+        names = eph['planets']
+        nak_cols = [j for j, n in enumerate(names) if n in self.nakshatra_planets]
+        lon_geo = eph['longitude_geocentric'].tolist()
+        lat_geo = eph['latitude_geocentric'].tolist()
+        lon_helio = eph['longitude_heliocentric'].tolist()
+        speed = eph['speed'].tolist()
+        distance = eph['distance_au'].tolist()
+        sidereal = eph['sidereal_longitude'].tolist()
+        nak_index = eph['nakshatra_index'].tolist()
+        pada = eph['pada'].tolist()
+        pos_in = eph['position_in_nakshatra'].tolist()
 
-            # Compute corresponding nakshatras using the adjusted longitudes
-            # Use same ayanamsa approximation
-            ayanamsa = 24.1
+        ephemeris = []
+        for i, date in enumerate(eph['dates']):
+            positions = {}
+            for j, name in enumerate(names):
+                positions[name] = {
+                    'longitude_geocentric': lon_geo[i][j],
+                    'latitude_geocentric': lat_geo[i][j],
+                    'longitude_heliocentric': lon_helio[i][j],
+                    'latitude_heliocentric': 0.0,
+                    'distance_au': distance[j],
+                    'speed': speed[i][j],
+                    'color': eph['color'][j],
+                    'size': eph['size'][j],
+                }
             nak_map = {}
-            for planet, pdata in adjusted_positions.items():
-                if planet in ['sun', 'moon', 'mercury', 'venus', 'mars', 'jupiter', 'saturn']:
-                    sidereal_longitude = (pdata['longitude_geocentric'] - ayanamsa) % 360
-                    idx = int(sidereal_longitude / 13.333333)
-                    idx = min(max(idx, 0), 26)
-                    curr = self.nakshatras[idx]
-                    pos_in = sidereal_longitude - (idx * 13.333333)
-                    pada = int(pos_in / 3.333333) + 1
-                    nak_map[planet] = {
-                        'nakshatra': curr['name'],
-                        'deity': curr['deity'],
-                        'symbol': curr['symbol'],
-                        'pada': pada,
-                        'sidereal_longitude': sidereal_longitude,
-                        'tropical_longitude': pdata['longitude_geocentric'],
-                        'position_in_nakshatra': pos_in
-                    }
-
-            day_dt = base_date.replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=i)
+            for j in nak_cols:
+                curr = self.nakshatras[nak_index[i][j]]
+                nak_map[names[j]] = {
+                    'nakshatra': curr['name'],
+                    'deity': curr['deity'],
+                    'symbol': curr['symbol'],
+                    'pada': pada[i][j],
+                    'sidereal_longitude': sidereal[i][j],
+                    'tropical_longitude': lon_geo[i][j],
+                    'position_in_nakshatra': pos_in[i][j]
+                }
             ephemeris.append({
-                'date': day_dt.strftime('%Y-%m-%d'),
-                'positions': adjusted_positions,
+                'date': date,
+                'positions': positions,
                 'nakshatras': nak_map,
-                'ayanamsa': ayanamsa,
+                'ayanamsa': eph['ayanamsa'],
             })
 
         return {
             'ephemeris': ephemeris,
-            'generated_at': base_date.isoformat(),
-            'period_days': int(days_ahead),
+            'generated_at': eph['generated_at'],
+            'period_days': eph['period_days'],
+        }
+
+    def get_ephemeris_data(self, days_ahead: int = 30, observer_lat: float = 0.0, observer_lon: float = 0.0):
+        """Generate a simple ephemeris for the next N days using the same model.
+        Returns structure compatible with callers in routes: {'ephemeris': [...], 'generated_at': iso, 'period_days': n}
+        """
+        eph = self.get_ephemeris_arrays(days_ahead, observer_lat, observer_lon)
+        return self.materialize_ephemeris(eph)
+
+def slice_ephemeris(eph, days: int, start: int = 0):
+    """`days` rows of an ephemeris array dict from row `start` (views, no copies)."""
+    days = max(0, int(days))
+    stop = start + days
+    sliced = dict(eph)
+    for key, value in eph.items():
+        if isinstance(value, np.ndarray) and value.ndim == 2:
+            sliced[key] = value[start:stop]
+    sliced['dates'] = eph['dates'][start:stop]
+    sliced['period_days'] = days
+    return sliced
+
+
+class EphemerisCache:
+    """LRU/TTL cache of ephemeris arrays shared by the astro routes.
+
+    Entries are keyed by (UTC date, observer lat/lon, center mode) and computed at noon
+    UTC of that date, matching the per-day labels. Each entry holds the longest horizon
+    requested so far, up to `max_horizon`; shorter requests are served as slices of it and
+    longer ones are computed without being cached.
+    """
+
+    def __init__(self, max_entries: int = 16, ttl_seconds: int = 6 * 3600, min_horizon: int = 90,
+                 max_horizon: int = MAX_EPHEMERIS_DAYS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_horizon = max_horizon
+        self.min_horizon = min(min_horizon, max_horizon)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        for key in [k for k, entry in self._entries.items() if entry['expires_at'] <= now]:
+            del self._entries[key]
+            self.evictions += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def _bucket():
+        return datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    def get_arrays(self, days_ahead: int = 30, observer_lat: float = 0.0, observer_lon: float = 0.0, center_mode: str = "heliocentric"):
+        days = max(0, int(days_ahead))
+        bucket = self._bucket()
+        key = (bucket.date().isoformat(), round(float(observer_lat), 4), round(float(observer_lon), 4), center_mode)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['expires_at'] > now and entry['horizon'] >= days:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return slice_ephemeris(entry['ephemeris'], days)
+            self.misses += 1
+            horizon = max(days, self.min_horizon, entry['horizon'] if entry else 0)
+
+        if days > self.max_horizon:
+            return astro_engine.get_ephemeris_arrays(days, observer_lat, observer_lon, time_utc=bucket)
+        horizon = min(horizon, self.max_horizon)
+        eph = astro_engine.get_ephemeris_arrays(horizon, observer_lat, observer_lon, time_utc=bucket)
+        for value in eph.values():
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+
+        with self._lock:
+            self._entries[key] = {'ephemeris': eph, 'horizon': horizon, 'expires_at': now + self.ttl_seconds}
+            self._entries.move_to_end(key)
+            self._evict(now)
+        return slice_ephemeris(eph, days)
+
+    def iter_arrays(self, days_ahead: int, observer_lat: float = 0.0, observer_lon: float = 0.0, center_mode: str = "heliocentric",
+                    chunk_days: int = None, start_day: int = 0):
+        """Ephemeris arrays for days [start_day, days_ahead) as consecutive chunks of `chunk_days` rows.
+
+        Rows within MAX_EPHEMERIS_DAYS are sliced from the cached entry; later rows are
+        computed chunk by chunk and not cached, so memory stays flat however long the range.
+        """
+        days = max(0, int(days_ahead))
+        chunk_days = max(1, int(chunk_days or EPHEMERIS_STREAM_CHUNK))
+        cached_days = min(days, MAX_EPHEMERIS_DAYS)
+        cached = self.get_arrays(cached_days, observer_lat, observer_lon, center_mode)
+        bucket = datetime.fromisoformat(cached['generated_at'])
+        for start in range(max(0, int(start_day)), days, chunk_days):
+            n = min(chunk_days, days - start)
+            if start + n <= cached_days:
+                yield slice_ephemeris(cached, n, start)
+            else:
+                yield astro_engine.get_ephemeris_arrays(n, observer_lat, observer_lon, time_utc=bucket, start_day=start)
+
+    def get_ephemeris_data(self, days_ahead: int = 30, observer_lat: float = 0.0, observer_lon: float = 0.0, center_mode: str = "heliocentric"):
+        """Cached counterpart of SimpleAstroEngine.get_ephemeris_data."""
+        eph = self.get_arrays(days_ahead, observer_lat, observer_lon, center_mode)
+        return astro_engine.materialize_ephemeris(eph)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'horizons': {'|'.join(map(str, k)): e['horizon'] for k, e in self._entries.items()},
+            }
+
+def enrich_ephemeris(eph, ephemeris_data) -> list:
+    """Full-format days: each planet's dict plus zodiac/Telugu labels.
+
+    Every planet is inserted under both its lowercase key and a Title-case variant, so
+    frontends that expect either form can access the same data.
+    """
+    sign_index = eph['sign_index'].tolist()
+    deg_into_sign = (eph['longitude_geocentric'] - eph['sign_index'] * 30.0).tolist()
+    planet_col = {name: j for j, name in enumerate(eph['planets'])}
+
+    enriched = []
+    for i, day in enumerate(ephemeris_data['ephemeris']):
+        pos_with_meta = {}
+        for pname, pdata in day.get('positions', {}).items():
+            j = planet_col[pname]
+            zn_en, zn_tel = ZODIAC[sign_index[i][j]]
+            meta = {
+                **pdata,
+                'zodiac_en': zn_en,
+                'zodiac_telugu': zn_tel,
+                'deg_into_sign': round(deg_into_sign[i][j], 3),
+                'label_telugu': TELUGU.get(pname.lower()),
+            }
+            pos_with_meta[pname] = meta
+            pos_with_meta[pname.title()] = meta
+        enriched.append({**day, 'positions': pos_with_meta})
+    return enriched
+
+
+def compact_ephemeris(eph) -> dict:
+    """Compact-format body: static per-planet metadata and lookup tables once, then
+    (days x planets) arrays indexed like `dates` and `planets`.
+
+    Sign and nakshatra fields are indexes into the `zodiac` and `nakshatra_table` lists.
+    """
+    names = eph['planets']
+    lon = eph['longitude_geocentric']
+    columns = {
+        'longitude_geocentric': lon,
+        'latitude_geocentric': eph['latitude_geocentric'],
+        'longitude_heliocentric': eph['longitude_heliocentric'],
+        'latitude_heliocentric': eph['latitude_heliocentric'],
+        'speed': eph['speed'],
+        'sidereal_longitude': eph['sidereal_longitude'],
+        'position_in_nakshatra': eph['position_in_nakshatra'],
+        'deg_into_sign': lon - eph['sign_index'] * 30.0,
+    }
+    body = {name: np.round(values, COMPACT_DECIMALS).tolist() for name, values in columns.items()}
+    body['sign_index'] = eph['sign_index'].tolist()
+    body['nakshatra_index'] = eph['nakshatra_index'].tolist()
+    body['pada'] = eph['pada'].tolist()
+    return {
+        "format": "compact",
+        "planets": names,
+        "planet_meta": {
+            name: {
+                'label_telugu': TELUGU.get(name),
+                'color': eph['color'][j],
+                'size': eph['size'][j],
+                'distance_au': float(eph['distance_au'][j]),
+                'nakshatra': name in astro_engine.nakshatra_planets,
+            }
+            for j, name in enumerate(names)
+        },
+        "zodiac": [{'en': en, 'telugu': tel} for en, tel in ZODIAC],
+        "nakshatra_table": [
+            {'name': n['name'], 'deity': n['deity'], 'symbol': n['symbol']} for n in astro_engine.nakshatras
+        ],
+        "ayanamsa": eph['ayanamsa'],
+        "dates": eph['dates'],
+        "columns": body,
+    }
+
+
+def ephemeris_settings(settings) -> dict:
+    return {
+        "center_mode": getattr(settings, 'center_mode', 'heliocentric'),
+        "coordinate_system": getattr(settings, 'coordinate_system', 'tropical'),
+        "observer_location": getattr(settings, 'observer_location', 'Greenwich'),
+        "vedic_mode": getattr(settings, 'vedic_mode', True)
+    }
+
+
+def _ndjson(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def stream_ephemeris(days: int, settings):
+    """NDJSON body of /astro/ephemeris?format=ndjson: a header line, then one line per day.
+
+    The header carries what the buffered formats put next to the day list (status,
+    ai_mentor, settings, generated_at, period_days); each day line is a full-format day.
+    Days are computed, enriched and encoded one chunk at a time, and each chunk is one
+    write. An error after the first byte can no longer change the status code, so it is
+    reported as a final {"status": "error"} line.
+    """
+    location = (
+        getattr(settings, 'observer_latitude', 0.0),
+        getattr(settings, 'observer_longitude', 0.0),
+        getattr(settings, 'center_mode', 'heliocentric'),
+    )
+    try:
+        head = ephemeris_cache.get_arrays(0, *location)
+        yield _ndjson({
+            "status": "success",
+            "format": "ndjson",
+            "ai_mentor": ephemeris_mentor_summary(zip(head['planets'], head['size']) if days else ()),
+            "settings": ephemeris_settings(settings),
+            "generated_at": head['generated_at'],
+            "period_days": days,
+        })
+        for chunk in ephemeris_cache.iter_arrays(days, *location):
+            days_out = enrich_ephemeris(chunk, astro_engine.materialize_ephemeris(chunk))
+            yield b"".join(_ndjson(day) for day in days_out)
+    except Exception as e:
+        logger.exception("Error streaming ephemeris", extra=fields(days=days))
+        yield _ndjson({"status": "error", "detail": f"Error generating ephemeris: {str(e)}"})
+
+
+def ephemeris_mentor_summary(planet_sizes):
+    """Short AI Mentor block from synthetic signals over (planet, size) pairs, or None."""
+    try:
+        # Example synthetic signal: big planets (size >= 15) produce 'order_block' like signals
+        simple_signals: List[dict] = []
+        for p, size in planet_sizes:
+            if size >= 15:
+                simple_signals.append({
+                    'type': 'order_block',
+                    'price_high': None,
+                    'price_low': None,
+                    'confidence': 0.6,
+                    'meta': {'planet': p}
+                })
+
+        # Import AI mentor analyzer locally to avoid top-level dependency issues
+        from ai_mentor import analyze_signals_for_mentor
+        mentor_result = analyze_signals_for_mentor(simple_signals, symbol='EURUSD')
+        # Keep a short mentor block
+        return {
+            'narration': mentor_result.get('mentor', {}).get('narration'),
+            'trade_idea': mentor_result.get('mentor', {}).get('trade_idea'),
+            'confluence_score': mentor_result.get('confluence', {}).get('score')
         }
+    except Exception:
+        return None
+
 
 # Initialize the engine
 astro_engine = SimpleAstroEngine()
+ephemeris_cache = EphemerisCache(
+    max_entries=int(os.getenv("EPHEMERIS_CACHE_SIZE", "16")),
+    ttl_seconds=int(os.getenv("EPHEMERIS_CACHE_TTL", str(6 * 3600))),
+)
 
 router = APIRouter()
 
@@ -291,6 +676,7 @@ async def get_orbits():
         return orbital_data
         
     except Exception as e:
+        logger.warning("orbits unavailable, serving demo data", extra=fields(error=str(e)))
         # Fallback to demo data
         today = datetime.utcnow().strftime("%Y-%m-%d")
         return [{"date": today, "Sun": "187.23°", "Moon": "23.88°", "Mercury": "45.12°", "Venus": "78.90°", "Mars": "123.45°", "Jupiter": "234.56°", "Saturn": "312.78°"}]
@@ -300,10 +686,11 @@ async def get_events():
     """Get astronomical events with Vedic calculations"""
     try:
         settings = load_settings()
-        ephemeris_data = astro_engine.get_ephemeris_data(
+        ephemeris_data = ephemeris_cache.get_ephemeris_data(
             days_ahead=30,
             observer_lat=settings.observer_latitude,
-            observer_lon=settings.observer_longitude
+            observer_lon=settings.observer_longitude,
+            center_mode=settings.center_mode
         )
         
         events = []
@@ -339,6 +726,7 @@ async def get_events():
         return events[:15]  # Limit to 15 events
         
     except Exception as e:
+        logger.warning("events unavailable, serving demo data", extra=fields(error=str(e)))
         # Fallback demo data
         events = []
         planets = ["Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune"]
@@ -355,78 +743,115 @@ async def get_events():
         return events
 
 
-@router.get("/astro/events.ics")
-async def get_events_ics():
-    """Return events as an ICS calendar for subscription/download."""
-    try:
-        settings = load_settings()
-        ephemeris_data = astro_engine.get_ephemeris_data(
-            days_ahead=30,
-            observer_lat=settings.observer_latitude,
-            observer_lon=settings.observer_longitude
-        )
+def _ics_text(value: str) -> str:
+    """Escape a TEXT property value (RFC 5545 3.3.11)."""
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
 
-        events = []
-        planets = ["Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune"]
-        aspects = ["Conjunction", "Opposition", "Trine", "Square", "Sextile"]
 
-        for day_data in ephemeris_data['ephemeris'][:30]:
-            if settings.vedic_mode and 'nakshatras' in day_data:
-                for planet, nakshatra_info in day_data['nakshatras'].items():
-                    events.append({
-                        "date": day_data['date'],
-                        "title": f"{planet.title()} in {nakshatra_info['nakshatra']} Nakshatra",
-                        "description": '',
-                        "planets": [planet],
-                        "nakshatra": nakshatra_info['nakshatra'],
-                    })
+class IcsFeed:
+    """events.ics rendered once per (UTC day, settings) and kept as encoded bytes.
 
-            p1, p2 = random.choice(planets), random.choice(planets)
-            if p1 != p2:
-                events.append({
-                    "date": day_data['date'],
-                    "title": f"{p1} {random.choice(aspects)} {p2}",
-                    "description": '',
-                    "planets": [p1, p2]
-                })
+    Each day's VEVENTs are rendered once into a byte block; a feed of N days is the
+    calendar header, the first N blocks and the footer. A longer range only renders the
+    days not rendered yet, and each assembled feed is kept for repeat polls. Everything
+    is dropped when the UTC day or the settings change.
+    """
+
+    PLANETS = ["Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune"]
+    ASPECTS = ["Conjunction", "Opposition", "Trine", "Square", "Sextile"]
+    HEADER = b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//AstroQuant//Events\r\n"
+    FOOTER = b"END:VCALENDAR\r\n"
+    MAX_FEEDS = 8
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._blocks = []
+        self._feeds = OrderedDict()
+        self._dtstamp = None
+
+    def _day_events(self, settings, day_data):
+        if settings.vedic_mode and 'nakshatras' in day_data:
+            for planet, nakshatra_info in day_data['nakshatras'].items():
+                yield f"{planet.title()} in {nakshatra_info['nakshatra']} Nakshatra"
+        # Seeded by date, so a day's aspect is the same in every rebuild and process
+        rng = random.Random(f"astro-ics|{day_data['date']}")
+        p1, p2 = rng.choice(self.PLANETS), rng.choice(self.PLANETS)
+        if p1 != p2:
+            yield f"{p1} {rng.choice(self.ASPECTS)} {p2}"
+
+    def _render_day(self, settings, day_data) -> bytes:
+        day = datetime.strptime(day_data['date'], '%Y-%m-%d')
+        dtstart = day.strftime('%Y%m%d')
+        dtend = (day + timedelta(days=1)).strftime('%Y%m%d')
+        lines = []
+        for title in self._day_events(settings, day_data):
+            # Derived from the event itself, so a calendar client updates rather than duplicates it
+            uid = hashlib.blake2b(f"{dtstart}|{title}".encode("utf-8"), digest_size=8).hexdigest()
+            lines += [
+                'BEGIN:VEVENT',
+                f'UID:astro-{dtstart}-{uid}@astroquant',
+                f'DTSTAMP:{self._dtstamp}',
+                f'DTSTART;VALUE=DATE:{dtstart}',
+                f'DTEND;VALUE=DATE:{dtend}',
+                f'SUMMARY:{_ics_text(title)}',
+                'END:VEVENT',
+            ]
+        return "".join(line + "\r\n" for line in lines).encode("utf-8")
+
+    def render(self, settings, days: int) -> bytes:
+        key = (datetime.utcnow().date().isoformat(), settings_fingerprint(settings))
+        with self._lock:
+            if key != self._key:
+                self._key, self._blocks, self._dtstamp = key, [], datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+                self._feeds.clear()
+            feed = self._feeds.get(days)
+            if feed is not None:
+                self._feeds.move_to_end(days)
+                return feed
+            if len(self._blocks) < days:
+                chunks = ephemeris_cache.iter_arrays(
+                    days, settings.observer_latitude, settings.observer_longitude, settings.center_mode,
+                    start_day=len(self._blocks),
+                )
+                for chunk in chunks:
+                    for day_data in astro_engine.materialize_ephemeris(chunk)['ephemeris']:
+                        self._blocks.append(self._render_day(settings, day_data))
+            feed = self.HEADER + b"".join(self._blocks[:days]) + self.FOOTER
+            self._feeds[days] = feed
+            while len(self._feeds) > self.MAX_FEEDS:
+                self._feeds.popitem(last=False)
+            return feed
+
+
+ics_feed = IcsFeed()
 
-        # Build ICS content
-        lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//AstroQuant//Events']
-        for idx, ev in enumerate(events):
-            date_str = ev.get('date')
-            if not date_str:
-                continue
-            uid = f"astro-{idx}-{date_str}"
-            dtstamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
-            dtstart = date_str.replace('-', '')
-            # DTSTART as all-day
-            lines.append('BEGIN:VEVENT')
-            lines.append(f'UID:{uid}')
-            lines.append(f'DTSTAMP:{dtstamp}')
-            lines.append(f'DTSTART;VALUE=DATE:{dtstart}')
-            # DTEND is next day
-            try:
-                d0 = datetime.strptime(date_str, '%Y-%m-%d')
-                d1 = d0 + timedelta(days=1)
-                lines.append(f'DTEND;VALUE=DATE:{d1.strftime("%Y%m%d")}')
-            except Exception:
-                pass
-            lines.append(f'SUMMARY:{ev.get("title","Astro Event")}')
-            if ev.get('description'):
-                lines.append(f'DESCRIPTION:{ev.get("description")}')
-            lines.append('END:VEVENT')
-
-        lines.append('END:VCALENDAR')
-        ics = '\r\n'.join(lines)
-        return Response(content=ics, media_type='text/calendar')
+
+@router.get("/astro/events.ics")
+async def get_events_ics(
+    request: Request,
+    days: int = Query(30, ge=1, le=ICS_MAX_DAYS, description="Days of events from today"),
+):
+    """Return events as an ICS calendar for subscription/download."""
+    try:
+        settings = load_settings()
+        validator = Validator(request, "events.ics", DAY, CACHE_MAX_AGE["events.ics"], settings, days)
+        if validator.fresh:
+            return validator.not_modified()
+        return Response(content=ics_feed.render(settings, days), media_type='text/calendar', headers=validator.headers)
     except Exception as e:
+        logger.exception("Failed to generate ICS")
         raise HTTPException(status_code=500, detail=f"Failed to generate ICS: {str(e)}")
 
 @router.get("/astro/nakshatras")
-async def get_nakshatras():
+async def get_nakshatras(request: Request, response: Response):
     """Get current Nakshatra positions for all planets"""
     try:
         settings = load_settings()
+        validator = Validator(request, "nakshatras", MINUTE, CACHE_MAX_AGE["nakshatras"], settings)
+        if validator.fresh:
+            return validator.not_modified()
+        response.headers.update(validator.headers)
         nakshatra_data = astro_engine.get_nakshatra_positions()
         
         return {
@@ -439,136 +864,73 @@ async def get_nakshatras():
             "ayanamsa_system": settings.ayanamsa_system
         }
     except Exception as e:
+        logger.exception("Error calculating Nakshatras")
         raise HTTPException(status_code=500, detail=f"Error calculating Nakshatras: {str(e)}")
 
 @router.get("/astro/ephemeris")
-async def get_ephemeris(days: int = Query(30, description="Number of days for ephemeris")):
-    """Get ephemeris data for specified period"""
+async def get_ephemeris(
+    request: Request,
+    days: int = Query(30, description="Number of days for ephemeris"),
+    fmt: str = Query("full", alias="format", description="full | compact | ndjson"),
+):
+    """Get ephemeris data for specified period.
+
+    format=compact sends per-planet metadata once and the per-day numbers as
+    (days x planets) arrays instead of one enriched dict per planet per day.
+    format=ndjson streams a header line and then one full-format day per line, for up to
+    EPHEMERIS_STREAM_MAX_DAYS days (the other formats stop at MAX_EPHEMERIS_DAYS).
+    """
+    if fmt not in EPHEMERIS_FORMATS:
+        raise HTTPException(status_code=400, detail=f"unknown format '{fmt}' (expected one of {', '.join(EPHEMERIS_FORMATS)})")
     try:
         settings = load_settings()
         # Defensive: ensure astro_engine is always an instance of SimpleAstroEngine
         if not hasattr(astro_engine, 'get_ephemeris_data'):
             raise Exception("astro_engine is not properly initialized")
+        validator = Validator(request, "ephemeris", DAY, CACHE_MAX_AGE["ephemeris"], settings, days, fmt)
+        if validator.fresh:
+            return validator.not_modified()
+        if fmt == "ndjson":
+            return StreamingResponse(
+                stream_ephemeris(min(max(0, days), EPHEMERIS_STREAM_MAX_DAYS), settings),
+                media_type="application/x-ndjson",
+                headers=validator.headers,
+            )
         # Call with correct arguments
-        ephemeris_data = astro_engine.get_ephemeris_data(
-            days_ahead=min(days, 365),  # Limit to 1 year
+        ephemeris = ephemeris_cache.get_arrays(
+            days_ahead=min(days, MAX_EPHEMERIS_DAYS),
             observer_lat=getattr(settings, 'observer_latitude', 0.0),
-            observer_lon=getattr(settings, 'observer_longitude', 0.0)
+            observer_lon=getattr(settings, 'observer_longitude', 0.0),
+            center_mode=getattr(settings, 'center_mode', 'heliocentric')
         )
-        # --- Enrich ephemeris with Telugu zodiac labels and optional AI Mentor summary ---
-        # Minimal TELUGU and ZODIAC mappings (fallback to generator script values)
-        TELUGU = {
-            "sun": "సూర్య (Sūrya)",
-            "moon": "చంద్ర (Candra)",
-            "mercury": "బుధ (Budha)",
-            "venus": "శుక్ర (Śukra)",
-            "mars": "మంగళ (Maṅgala)",
-            "jupiter": "బృహస్పతి (Guru)",
-            "saturn": "శని (Śani)",
-            "uranus": "యురేనస్",
-            "neptune": "నెప్ట్యూన్",
-            "pluto": "ప్లూటో",
-        }
-
-        ZODIAC = [
-            ("Aries", "మేషం", 0, 30), ("Taurus", "వృషభం", 30, 60),
-            ("Gemini", "మిథునం", 60, 90), ("Cancer", "కర్కాటకం", 90, 120),
-            ("Leo", "సింహం", 120, 150), ("Virgo", "కన్యా", 150, 180),
-            ("Libra", "తులా", 180, 210), ("Scorpio", "వృశ్చికం", 210, 240),
-            ("Sagittarius", "ధనుస్సు", 240, 270), ("Capricorn", "మకరం", 270, 300),
-            ("Aquarius", "కుంభం", 300, 330), ("Pisces", "మీనం", 330, 360)
-        ]
-
-        def zodiac_from_degree(deg: float):
-            d = deg % 360.0
-            for en, tel, lo, hi in ZODIAC:
-                if lo <= d < hi:
-                    return en, tel, d - lo
-            return "Aries", "మేషం", d
-
-        # Add telugu and zodiac info to each day's positions where possible
-        enriched = []
-        for day in ephemeris_data['ephemeris']:
-            positions = day.get('positions', {})
-            pos_with_meta = {}
-            for pname, pdata in positions.items():
-                try:
-                    lon = pdata.get('longitude_geocentric', pdata.get('longitude_heliocentric', 0.0))
-                    zn_en, zn_tel, deg_into = zodiac_from_degree(lon)
-                except Exception:
-                    zn_en, zn_tel, deg_into = (None, None, None)
-
-                # Build metadata-enriched object and insert under both the
-                # original key (lowercase) and a Title-case variant so frontends
-                # that expect either form can access the same data.
-                meta = {
-                    **pdata,
-                    'zodiac_en': zn_en,
-                    'zodiac_telugu': zn_tel,
-                    'deg_into_sign': round(deg_into, 3) if deg_into is not None else None,
-                    'label_telugu': TELUGU.get(pname, TELUGU.get(pname.lower(), None))
-                }
-
-                # Original key (likely lowercase) and Title-case duplicate
-                pos_with_meta[pname] = meta
-                try:
-                    pos_with_meta[pname.title()] = meta
-                except Exception:
-                    # If title-casing fails for any reason, ignore silently
-                    pass
-
-            enriched.append({**day, 'positions': pos_with_meta})
-
-        # Attempt to include a short AI Mentor summary by synthesizing simple signals and calling the mentor
-        ai_summary = None
-        try:
-            # Build a tiny signal set from today's ephemeris (order_blocks / liquidity approximations are synthetic)
-            simple_signals: List[dict] = []
-            if enriched:
-                for p, pd in enriched[0]['positions'].items():
-                    # Example synthetic signal: big planets > 10 size produce 'order_block' like signals
-                    if pd.get('size', 0) >= 15:
-                        simple_signals.append({
-                            'type': 'order_block',
-                            'price_high': None,
-                            'price_low': None,
-                            'confidence': 0.6,
-                            'meta': {'planet': p}
-                        })
-
-            # Import AI mentor analyzer locally to avoid top-level dependency issues
-            try:
-                from ai_mentor import analyze_signals_for_mentor
-                mentor_result = analyze_signals_for_mentor(simple_signals, symbol='EURUSD')
-                # Keep a short mentor block
-                ai_summary = {
-                    'narration': mentor_result.get('mentor', {}).get('narration'),
-                    'trade_idea': mentor_result.get('mentor', {}).get('trade_idea'),
-                    'confluence_score': mentor_result.get('confluence', {}).get('score')
-                }
-            except Exception:
-                ai_summary = None
-        except Exception:
-            ai_summary = None
+        if fmt == "compact":
+            body = compact_ephemeris(ephemeris)
+        else:
+            body = {"ephemeris": enrich_ephemeris(ephemeris, astro_engine.materialize_ephemeris(ephemeris))}
+        # Planet sizes are static, so the summary never needs the per-day positions
+        ai_summary = ephemeris_mentor_summary(zip(ephemeris['planets'], ephemeris['size']) if ephemeris['dates'] else ())
 
-        return {
+        # Plain lists/dicts of JSON scalars: skip jsonable_encoder
+        return JSONResponse(content={
             "status": "success",
-            "ephemeris": enriched,
+            **body,
             "ai_mentor": ai_summary,
-            "settings": {
-                "center_mode": getattr(settings, 'center_mode', 'heliocentric'),
-                "coordinate_system": getattr(settings, 'coordinate_system', 'tropical'),
-                "observer_location": getattr(settings, 'observer_location', 'Greenwich'),
-                "vedic_mode": getattr(settings, 'vedic_mode', True)
-            },
-            "generated_at": ephemeris_data['generated_at'],
-            "period_days": ephemeris_data['period_days']
-        }
+            "settings": ephemeris_settings(settings),
+            "generated_at": ephemeris['generated_at'],
+            "period_days": ephemeris['period_days']
+        }, headers=validator.headers)
     except TypeError as e:
+        logger.exception("Ephemeris argument error")
         raise HTTPException(status_code=500, detail=f"Ephemeris argument error: {str(e)}")
     except Exception as e:
+        logger.exception("Error generating ephemeris")
         raise HTTPException(status_code=500, detail=f"Error generating ephemeris: {str(e)}")
 
+@router.get("/astro/cache/stats")
+async def get_cache_stats():
+    """Hit/miss/eviction counters for the shared ephemeris cache"""
+    return {"status": "success", "ephemeris_cache": ephemeris_cache.stats()}
+
 @router.get("/astro/positions/live")
 async def get_live_positions():
     """Get live planetary positions with both geocentric and heliocentric coordinates"""
@@ -592,6 +954,7 @@ async def get_live_positions():
             }
         }
     except Exception as e:
+        logger.exception("Error getting live positions")
         raise HTTPException(status_code=500, detail=f"Error getting live positions: {str(e)}")
 
 @router.get("/astro/visualization")
@@ -616,253 +979,95 @@ async def get_visualization_data():
             "settings": settings.dict()
         }
     except Exception as e:
+        logger.exception("Error getting visualization data")
         raise HTTPException(status_code=500, detail=f"Error getting visualization data: {str(e)}")
 
+ORBIT3D_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "orbit3d.html")
+
+
+def compile_orbit3d_page() -> bytes:
+    """templates/orbit3d.html with the fixed nakshatra markup filled in, encoded once."""
+    with open(ORBIT3D_TEMPLATE, "r", encoding="utf-8") as f:
+        page = f.read()
+    items = ' '.join(f'<span class="nakshatra-item">{html.escape(n["name"])}</span>' for n in astro_engine.nakshatras[:9])
+    page = page.replace("{{ nakshatra_count }}", str(len(astro_engine.nakshatras))).replace("{{ nakshatra_items }}", items)
+    return page.encode("utf-8")
+
+
+try:
+    ORBIT3D_PAGE = compile_orbit3d_page()
+    ORBIT3D_ETAG = content_etag(ORBIT3D_PAGE)
+except OSError:
+    logger.exception("orbit3d template unavailable", extra=fields(path=ORBIT3D_TEMPLATE))
+    ORBIT3D_PAGE = ORBIT3D_ETAG = None
+
+
 @router.get("/astro/orbit3d")
-async def orbit3d():
-    """Generate advanced 3D orbital visualization with real-time calculations and Vedic features"""
-    settings = load_settings()
-    viz_data = astro_engine.get_visualization_data(
-        center_mode=settings.center_mode,
-        observer_lat=settings.observer_latitude,
-        observer_lon=settings.observer_longitude
-    )
-    
-    # Get Nakshatra data if Vedic mode is enabled
-    nakshatra_overlay = ""
-    if settings.vedic_mode:
-        nakshatra_data = astro_engine.get_nakshatra_positions()
-        nakshatra_overlay = f"""
-        <div class="nakshatra-panel">
-            <h3>Nakshatras ({len(nakshatra_data['nakshatra_details'])} Lunar Mansions)</h3>
-            <div class="nakshatra-list">
-                {' '.join([f'<span class="nakshatra-item">{n["name"]}</span>' for n in nakshatra_data['nakshatra_details'][:9]])}
-            </div>
-            <div class="current-nakshatras">
-                {' '.join([f'<div class="planet-nakshatra"><span>{planet.title()}</span>: {data["nakshatra"]} ({data["pada"]}/4)</div>' for planet, data in nakshatra_data.get('planetary_nakshatras', {}).items()])}
-            </div>
-        </div>
-        """
+async def orbit3d(request: Request):
+    """Advanced 3D orbital visualization: a static page that renders /astro/orbit3d/data"""
+    if ORBIT3D_PAGE is None:
+        raise HTTPException(status_code=500, detail="orbit3d template unavailable")
+    return static_response(request, "orbit3d", ORBIT3D_PAGE, ORBIT3D_ETAG, "text/html",
+                           CACHE_MAX_AGE["orbit3d"])
 
-    html = f"""
-    <!doctype html><html><head><meta charset='utf-8'><title>Advanced Astro Engine - Real-time Planetary Positions</title>
-    <style>
-    * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-    body {{ 
-        font-family: 'Segoe UI', system-ui, -apple-system; 
-        background: #000 url('data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100"><defs><radialGradient id="stars"><stop offset="0%" stop-color="%23fff" stop-opacity="0.8"/><stop offset="100%" stop-color="%23fff" stop-opacity="0"/></radialGradient></defs><circle cx="10" cy="20" r="0.5" fill="url(%23stars)"/><circle cx="80" cy="80" r="0.3" fill="url(%23stars)"/><circle cx="30" cy="70" r="0.4" fill="url(%23stars)"/><circle cx="90" cy="30" r="0.2" fill="url(%23stars)"/><circle cx="60" cy="10" r="0.3" fill="url(%23stars)"/></svg>');
-        color: #fff; 
-        overflow: hidden; 
-        height: 100vh;
-        position: relative;
-    }}
-    
-    .settings-panel {{
-        position: fixed;
-        top: 10px;
-        right: 10px;
-        background: rgba(0,20,40,0.9);
-        border: 1px solid #0099ff;
-        border-radius: 8px;
-        padding: 15px;
-        min-width: 280px;
-        backdrop-filter: blur(10px);
-        z-index: 1000;
-    }}
-    
-    .settings-title {{
-        color: #00ccff;
-        font-size: 16px;
-        font-weight: bold;
-        margin-bottom: 10px;
-        text-align: center;
-    }}
-    }}
-    
-    .nakshatra-panel h3 {{
-        color: #ff9900;
-        font-size: 14px;
-        margin-bottom: 10px;
-    }}
-    
-    .nakshatra-list {{
-        display: flex;
-        flex-wrap: wrap;
-        gap: 4px;
-        margin-bottom: 10px;
-    }}
-    
-    .nakshatra-item {{
-        background: rgba(255,100,0,0.2);
-        color: #ffcc88;
-        padding: 2px 6px;
-        border-radius: 3px;
-        font-size: 10px;
-    }}
-    
-    .current-nakshatras {{
-        display: flex;
-        flex-direction: column;
-        gap: 3px;
-    }}
-    
-    .planet-nakshatra {{
-        background: rgba(255,150,0,0.1);
-        padding: 4px;
-        border-radius: 3px;
-        font-size: 11px;
-        color: #ffddaa;
-    }}
-    
-    .planet-nakshatra span {{
-        color: #ff9900;
-        font-weight: bold;
-    }}
-    
-    /* Real-time Planet Positions */"""
 
-    # Generate real-time planet positions
-    planet_styles = ""
-    planet_elements = ""
-    
-    for planet, data in viz_data['planets'].items():
-        if planet == 'sun':
-            continue  # Sun is handled separately
-            
-        # Calculate scaled distance for visualization
-        distance = min(data['distance'] * 40, 350)  # Scale and cap distance
-        angle = data['longitude']
-        
-        # Position calculation
-        x = distance * math.cos(math.radians(angle))
-        y = distance * math.sin(math.radians(angle))
-        
-        planet_styles += f"""
-    .{planet} {{
-        width: {data['size']}px;
-        height: {data['size']}px;
-        background: radial-gradient(circle, {data['color']}, {data['color']}55);
-        color: {data['color']};
-        left: {x + 400}px;
-        top: {y + 400}px;
-        transform: translate(-50%, -50%);
-    }}
-    
-    .{planet}-orbit {{
-        width: {distance * 2}px;
-        height: {distance * 2}px;
-        transform: translate(-50%, -50%);
-    }}
-    
-    .{planet}-label {{
-        left: {x + 415}px;
-        top: {y + 385}px;
-        color: {data['color']};
-    }}
-    """
-        
-        planet_elements += f"""
-        <div class="orbit {planet}-orbit"></div>
-        <div class="planet {planet}"></div>
-        <div class="planet-label {planet}-label">{planet.title()}</div>
-        """
+@router.get("/astro/orbit3d/data")
+async def orbit3d_data(request: Request):
+    """Positions, settings and (in Vedic mode) nakshatras for the orbit3d page.
 
-    html += planet_styles + f"""
-    </style>
-    </head>
-    <body>
-    
-    <div class="nasa-header">
-        <div class="nasa-title">Advanced Astro Engine</div>
-        <div class="nasa-subtitle">Real-time Planetary Positions & Vedic Calculations</div>
-        <div class="live-indicator">● LIVE DATA</div>
-    </div>
-    
-    <div class="settings-panel">
-        <div class="settings-title">⚙️ Configuration</div>
-        
-        <div class="mode-indicator">
-            <div class="center-mode">{settings.center_mode.title()} View</div>
-            <div class="coordinate-system">{settings.coordinate_system.title()} System</div>
-        </div>
-        
-        <div class="setting-group">
-            <label class="setting-label">Center Mode:</label>
-            <select class="setting-control" onchange="setCenterMode(this.value)">
-                <option value="heliocentric" {'selected' if settings.center_mode == 'heliocentric' else ''}>Heliocentric (Sun-centered)</option>
-                <option value="geocentric" {'selected' if settings.center_mode == 'geocentric' else ''}>Geocentric (Earth-centered)</option>
-            </select>
-        </div>
-        
-        <div class="setting-group">
-            <label class="setting-label">Coordinate System:</label>
-            <select class="setting-control" onchange="setCoordinateSystem(this.value)">
-                <option value="tropical" {'selected' if settings.coordinate_system == 'tropical' else ''}>Tropical (Western)</option>
-                <option value="sidereal" {'selected' if settings.coordinate_system == 'sidereal' else ''}>Sidereal (Vedic)</option>
-            </select>
-        </div>
-        
-        <div class="setting-group">
-            <label class="setting-label">Vedic Features:</label>
-            <select class="setting-control" onchange="toggleVedicMode(this.value)">
-                <option value="true" {'selected' if settings.vedic_mode else ''}>Enabled (Nakshatras)</option>
-                <option value="false" {'selected' if not settings.vedic_mode else ''}>Disabled</option>
-            </select>
-        </div>
-    </div>
-    
-    <div class="solar-system">
-        <div class="sun"></div>
-        <div class="sun-label">☉ Sun</div>
-        {planet_elements}
-    </div>
-    
-    <div class="data-panel">
-        <div class="data-title">📊 Live Positions ({datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')})</div>
-        <div class="data-item">System: {settings.center_mode.title()} / {settings.coordinate_system.title()}</div>
-        <div class="data-item">Observer: {settings.observer_location} ({settings.observer_latitude:.2f}°, {settings.observer_longitude:.2f}°)</div>
-        <div class="data-item">Update Rate: Real-time calculations</div>
-        {"<div class='data-item'>Ayanamsa: " + str(round(nakshatra_data.get('ayanamsa', 24.1), 2)) + "°</div>" if settings.vedic_mode and 'nakshatra_data' in locals() else ""}
-    </div>
-    
-    {nakshatra_overlay}
-    
-    <script>
-    function setCenterMode(mode) {{
-        fetch(`/astro/settings/center-mode/${{mode}}`).then(() => location.reload());
-    }}
-    
-    function setCoordinateSystem(system) {{
-        fetch(`/astro/settings/coordinate-system/${{system}}`).then(() => location.reload());
-    }}
-    
-    function toggleVedicMode(enabled) {{
-        fetch(`/astro/settings/vedic-mode/${{enabled}}`).then(() => location.reload());
-    }}
-    
-    // Auto-refresh every 60 seconds for live data
-    setInterval(() => {{
-        location.reload();
-    }}, 60000);
-    
-    console.log('Advanced Astro Engine Loaded');
-    console.log('Center Mode: {settings.center_mode}');
-    console.log('Coordinate System: {settings.coordinate_system}');
-    console.log('Vedic Mode: {settings.vedic_mode}');
-    </script>
-    
-    </body>
-    </html>
+    Tables are {"columns": [...], "rows": [[...], ...]}; tagged per minute and settings.
     """
-    
-    return Response(content=html, media_type="text/html")
+    try:
+        settings = load_settings()
+        validator = Validator(request, "orbit3d.data", MINUTE, CACHE_MAX_AGE["orbit3d.data"], settings)
+        if validator.fresh:
+            return validator.not_modified()
+        viz_data = astro_engine.get_visualization_data(
+            center_mode=settings.center_mode,
+            observer_lat=settings.observer_latitude,
+            observer_lon=settings.observer_longitude
+        )
+        planets = [
+            [name, round(data['longitude'], 4), data['distance'], data['size'], data['color']]
+            for name, data in viz_data['planets'].items()
+        ]
+        nakshatras = None
+        if settings.vedic_mode:
+            nakshatra_data = astro_engine.get_nakshatra_positions()
+            nakshatras = {
+                "ayanamsa": nakshatra_data['ayanamsa'],
+                "columns": ["planet", "nakshatra", "pada"],
+                "rows": [[planet, data['nakshatra'], data['pada']]
+                         for planet, data in nakshatra_data['planetary_nakshatras'].items()],
+            }
+        return JSONResponse(content={
+            "timestamp": datetime.utcnow().isoformat(),
+            "settings": {
+                **ephemeris_settings(settings),
+                "observer_latitude": settings.observer_latitude,
+                "observer_longitude": settings.observer_longitude,
+            },
+            "planets": {"columns": ["name", "longitude", "distance", "size", "color"], "rows": planets},
+            "nakshatras": nakshatras,
+        }, headers=validator.headers)
+    except Exception as e:
+        logger.exception("Error building orbit3d data")
+        raise HTTPException(status_code=500, detail=f"Error building orbit3d data: {str(e)}")
 
 # ENHANCED ASTRO ENDPOINTS
 # ========================
 
 @router.get("/astro/aspects")
-async def get_planetary_aspects():
+async def get_planetary_aspects(
+    aspect_set: str = Query("major", description="Aspect set: major, minor or all"),
+    harmonic: int = Query(None, ge=2, le=36, description="Add the aspects of this harmonic"),
+    orb_scale: float = Query(1.0, gt=0, le=3, description="Multiply every orb by this factor"),
+):
     """Get current planetary aspects and their strengths"""
+    try:
+        aspect_list = resolve_aspects(aspect_set, harmonic, orb_scale)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         settings = load_settings()
         positions = astro_engine.get_real_time_positions(
@@ -870,7 +1075,7 @@ async def get_planetary_aspects():
             observer_lon=settings.observer_longitude
         )
         
-        aspects = calculate_planetary_aspects(positions)
+        aspects = calculate_planetary_aspects(positions, aspect_list)
         
         return {
             "status": "success",
@@ -879,20 +1084,68 @@ async def get_planetary_aspects():
             "total_count": len(aspects)
         }
     except Exception as e:
+        logger.exception("Error calculating aspects")
         raise HTTPException(status_code=500, detail=f"Error calculating aspects: {str(e)}")
 
+@router.get("/astro/aspects/timeline")
+async def get_aspect_timeline(
+    days: int = Query(30, ge=1, le=730, description="Days to scan from today"),
+    aspect_set: str = Query("major", description="Aspect set: major, minor or all"),
+    harmonic: int = Query(None, ge=2, le=36, description="Add the aspects of this harmonic"),
+    orb_scale: float = Query(1.0, gt=0, le=3, description="Multiply every orb by this factor"),
+):
+    """Aspect spans (start, peak, end) over the coming days, from one batch pass over the ephemeris"""
+    try:
+        aspect_list = resolve_aspects(aspect_set, harmonic, orb_scale)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        settings = load_settings()
+        ephemeris = ephemeris_cache.get_arrays(
+            days_ahead=days,
+            observer_lat=settings.observer_latitude,
+            observer_lon=settings.observer_longitude,
+            center_mode=settings.center_mode
+        )
+        spans = aspect_timeline(ephemeris['longitude_geocentric'], ephemeris['planets'], ephemeris['dates'], aspect_list)
+        return {
+            "status": "success",
+            "period_days": days,
+            "aspect_set": aspect_set,
+            "harmonic": harmonic,
+            "timeline": spans,
+            "total_count": len(spans),
+            "generated_at": datetime.utcnow().isoformat()
+        }
+    except Exception as e:
+        logger.exception("Error building aspect timeline")
+        raise HTTPException(status_code=500, detail=f"Error building aspect timeline: {str(e)}")
+
 @router.get("/astro/transits")
-async def get_major_transits(days_ahead: int = Query(30, description="Days to look ahead for transits")):
-    """Get major planetary transits for specified period"""
+async def get_major_transits(
+    request: Request,
+    response: Response,
+    days_ahead: int = Query(30, ge=1, le=EPHEMERIS_STREAM_MAX_DAYS, description="Days to look ahead for transits"),
+):
+    """Get major planetary transits for specified period.
+
+    Up to MAX_EPHEMERIS_DAYS come from the shared ephemeris cache; longer periods (up to
+    EPHEMERIS_STREAM_MAX_DAYS, like the NDJSON ephemeris) are computed uncached.
+    """
     try:
         settings = load_settings()
-        ephemeris_data = astro_engine.get_ephemeris_data(
+        validator = Validator(request, "transits", DAY, CACHE_MAX_AGE["transits"], settings, days_ahead)
+        if validator.fresh:
+            return validator.not_modified()
+        response.headers.update(validator.headers)
+        ephemeris = ephemeris_cache.get_arrays(
             days_ahead=days_ahead,
             observer_lat=settings.observer_latitude,
-            observer_lon=settings.observer_longitude
+            observer_lon=settings.observer_longitude,
+            center_mode=settings.center_mode
         )
         
-        transits = find_major_transits(ephemeris_data['ephemeris'])
+        transits = find_major_transits(ephemeris)
         
         return {
             "status": "success",
@@ -901,20 +1154,30 @@ async def get_major_transits(days_ahead: int = Query(30, description="Days to lo
             "generated_at": datetime.utcnow().isoformat()
         }
     except Exception as e:
+        logger.exception("Error getting transits")
         raise HTTPException(status_code=500, detail=f"Error getting transits: {str(e)}")
 
 @router.get("/astro/cycles")
-async def get_planetary_cycles(days_ahead: int = Query(90, description="Days for cycle analysis")):
-    """Get comprehensive planetary cycle analysis"""
+async def get_planetary_cycles(
+    request: Request,
+    response: Response,
+    days_ahead: int = Query(90, ge=1, le=EPHEMERIS_STREAM_MAX_DAYS, description="Days for cycle analysis"),
+):
+    """Get comprehensive planetary cycle analysis (same period limits as /astro/transits)"""
     try:
         settings = load_settings()
-        ephemeris_data = astro_engine.get_ephemeris_data(
+        validator = Validator(request, "cycles", DAY, CACHE_MAX_AGE["cycles"], settings, days_ahead)
+        if validator.fresh:
+            return validator.not_modified()
+        response.headers.update(validator.headers)
+        ephemeris = ephemeris_cache.get_arrays(
             days_ahead=days_ahead,
             observer_lat=settings.observer_latitude,
-            observer_lon=settings.observer_longitude
+            observer_lon=settings.observer_longitude,
+            center_mode=settings.center_mode
         )
         
-        cycle_analysis = analyze_planetary_cycles(ephemeris_data['ephemeris'])
+        cycle_analysis = analyze_planetary_cycles(ephemeris)
         
         return {
             "status": "success",
@@ -923,6 +1186,7 @@ async def get_planetary_cycles(days_ahead: int = Query(90, description="Days for
             "generated_at": datetime.utcnow().isoformat()
         }
     except Exception as e:
+        logger.exception("Error analyzing cycles")
         raise HTTPException(status_code=500, detail=f"Error analyzing cycles: {str(e)}")
 
 @router.get("/astro/market-correlation")
@@ -943,58 +1207,21 @@ async def get_market_correlation():
             "market_outlook": generate_market_outlook(correlations)
         }
     except Exception as e:
+        logger.exception("Error calculating market correlation")
         raise HTTPException(status_code=500, detail=f"Error calculating market correlation: {str(e)}")
 
 # HELPER FUNCTIONS FOR ENHANCED FEATURES
 # ======================================
 
-def calculate_planetary_aspects(positions):
+def calculate_planetary_aspects(positions, aspects=None):
     """Calculate planetary aspects with orbs and strengths"""
-    aspects = []
     planets = list(positions.keys())
-    
-    major_aspects = [
-        {"name": "Conjunction", "angle": 0, "orb": 8, "nature": "neutral"},
-        {"name": "Sextile", "angle": 60, "orb": 6, "nature": "harmonious"},
-        {"name": "Square", "angle": 90, "orb": 8, "nature": "challenging"},
-        {"name": "Trine", "angle": 120, "orb": 8, "nature": "harmonious"},
-        {"name": "Opposition", "angle": 180, "orb": 8, "nature": "challenging"}
-    ]
-    
-    for i in range(len(planets)):
-        for j in range(i + 1, len(planets)):
-            planet1 = planets[i]
-            planet2 = planets[j]
-            
-            pos1 = positions[planet1]['longitude_geocentric']
-            pos2 = positions[planet2]['longitude_geocentric']
-            
-            angle_diff = abs(pos1 - pos2)
-            if angle_diff > 180:
-                angle_diff = 360 - angle_diff
-            
-            for aspect in major_aspects:
-                orb_diff = abs(angle_diff - aspect['angle'])
-                if orb_diff <= aspect['orb']:
-                    strength = ((aspect['orb'] - orb_diff) / aspect['orb']) * 100
-                    
-                    aspects.append({
-                        "planet1": planet1,
-                        "planet2": planet2,
-                        "aspect": aspect['name'],
-                        "angle": round(angle_diff, 2),
-                        "orb": round(orb_diff, 2),
-                        "strength": round(strength, 1),
-                        "nature": aspect['nature'],
-                        "exact": orb_diff < 1.0
-                    })
-    
-    return sorted(aspects, key=lambda x: x['strength'], reverse=True)
+    longitudes = [positions[p]['longitude_geocentric'] for p in planets]
+    aspects = MAJOR_ASPECTS if aspects is None else aspects
+    return aspect_records(find_aspects(longitudes, aspects), planets, aspects)
 
-def find_major_transits(ephemeris_data):
-    """Find major planetary transits"""
-    transits = []
-    
+def find_major_transits(ephemeris):
+    """Find major planetary transits (sign ingresses) from ephemeris arrays"""
     # Define significant degrees (ingresses, critical degrees)
     significant_degrees = {
         0: "Aries Ingress", 30: "Taurus Ingress", 60: "Gemini Ingress",
@@ -1002,31 +1229,29 @@ def find_major_transits(ephemeris_data):
         180: "Libra Ingress", 210: "Scorpio Ingress", 240: "Sagittarius Ingress",
         270: "Capricorn Ingress", 300: "Aquarius Ingress", 330: "Pisces Ingress"
     }
-    
-    for day in ephemeris_data:
-        if not day.get('positions'):
-            continue
-            
-        for planet, data in day['positions'].items():
-            longitude = data['longitude_geocentric']
-            
-            for degree, significance in significant_degrees.items():
-                diff = abs(longitude - degree) % 360
-                if diff < 0.5 or diff > 359.5:  # Within 0.5 degrees
-                    transits.append({
-                        "date": day['date'],
-                        "planet": planet,
-                        "longitude": round(longitude, 2),
-                        "significance": significance,
-                        "type": "ingress",
-                        "exactness": 1.0 - min(diff, 360 - diff)
-                    })
-    
+
+    longitude = ephemeris['longitude_geocentric']
+    # Distance to the nearest 30 degree boundary, within 0.5 degrees counts as a transit
+    into_sign = longitude % 30.0
+    distance = np.minimum(into_sign, 30.0 - into_sign)
+    nearest = (np.round((longitude - into_sign) / 30.0).astype(int) + (into_sign > 15.0)) % 12 * 30
+    days, cols = np.nonzero(distance < 0.5)
+
+    transits = [{
+        "date": ephemeris['dates'][d],
+        "planet": ephemeris['planets'][p],
+        "longitude": round(float(longitude[d, p]), 2),
+        "significance": significant_degrees[int(nearest[d, p])],
+        "type": "ingress",
+        "exactness": 1.0 - float(distance[d, p])
+    } for d, p in zip(days.tolist(), cols.tolist())]
+
     return sorted(transits, key=lambda x: x['exactness'], reverse=True)[:20]
 
-def analyze_planetary_cycles(ephemeris_data):
-    """Analyze planetary cycles and patterns"""
-    if len(ephemeris_data) < 7:
+def analyze_planetary_cycles(ephemeris):
+    """Analyze planetary cycles and patterns from ephemeris arrays"""
+    dates = ephemeris['dates']
+    if len(dates) < 7:
         return {"error": "Insufficient data for cycle analysis"}
     
     cycles = {
@@ -1037,70 +1262,54 @@ def analyze_planetary_cycles(ephemeris_data):
         "cycle_summary": {}
     }
     
+    names = ephemeris['planets']
     planets = ['mercury', 'venus', 'mars', 'jupiter', 'saturn']
     
     # Analyze each planet
     for planet in planets:
-        if planet not in ephemeris_data[0].get('positions', {}):
+        if planet not in names:
             continue
-            
-        speeds = []
-        positions = []
+        speeds = ephemeris['speed'][:, names.index(planet)]
+
+        # Track retrograde periods: a period opens when speed turns negative and
+        # closes on the first day it is back to direct motion
+        retro = speeds < 0
+        starts = np.flatnonzero(retro & ~np.concatenate(([False], retro[:-1]))).tolist()
+        ends = np.flatnonzero(~retro & np.concatenate(([False], retro[:-1]))).tolist()
         retrograde_periods = []
+        for start in starts:
+            end = next((e for e in ends if e > start), None)
+            if end is None:
+                break
+            retrograde_periods.append({
+                "start": dates[start],
+                "end": dates[end],
+                "duration_days": (datetime.strptime(dates[end], '%Y-%m-%d') -
+                               datetime.strptime(dates[start], '%Y-%m-%d')).days
+            })
         
-        in_retrograde = False
-        retro_start = None
-        
-        for day in ephemeris_data:
-            if planet in day.get('positions', {}):
-                speed = day['positions'][planet].get('speed', 0)
-                position = day['positions'][planet].get('longitude_geocentric', 0)
-                
-                speeds.append(speed)
-                positions.append(position)
-                
-                # Track retrograde periods
-                if speed < 0 and not in_retrograde:
-                    in_retrograde = True
-                    retro_start = day['date']
-                elif speed >= 0 and in_retrograde:
-                    in_retrograde = False
-                    if retro_start:
-                        retrograde_periods.append({
-                            "start": retro_start,
-                            "end": day['date'],
-                            "duration_days": (datetime.strptime(day['date'], '%Y-%m-%d') - 
-                                           datetime.strptime(retro_start, '%Y-%m-%d')).days
-                        })
-        
-        if speeds:
-            cycles["speed_patterns"][planet] = {
-                "average_speed": round(sum(speeds) / len(speeds), 4),
-                "max_speed": round(max(speeds), 4),
-                "min_speed": round(min(speeds), 4),
-                "retrograde_percentage": round((len([s for s in speeds if s < 0]) / len(speeds)) * 100, 1)
-            }
+        cycles["speed_patterns"][planet] = {
+            "average_speed": round(float(speeds.mean()), 4),
+            "max_speed": round(float(speeds.max()), 4),
+            "min_speed": round(float(speeds.min()), 4),
+            "retrograde_percentage": round(float(retro.mean()) * 100, 1)
+        }
         
         cycles["retrograde_periods"][planet] = retrograde_periods
     
     # Calculate lunar phases
-    if 'moon' in ephemeris_data[0].get('positions', {}) and 'sun' in ephemeris_data[0].get('positions', {}):
-        for day in ephemeris_data:
-            positions = day.get('positions', {})
-            if 'moon' in positions and 'sun' in positions:
-                moon_pos = positions['moon']['longitude_geocentric']
-                sun_pos = positions['sun']['longitude_geocentric']
-                
-                phase_angle = (moon_pos - sun_pos) % 360
-                phase_name = get_lunar_phase_name(phase_angle)
-                
-                # Only add if it's a major phase
-                if phase_name in ['New Moon', 'First Quarter', 'Full Moon', 'Last Quarter']:
-                    cycles["lunar_phases"].append({
-                        "date": day['date'],
-                        "phase": phase_name,
-                        "angle": round(phase_angle, 1)
-                    })
+    if 'moon' in names and 'sun' in names:
+        longitude = ephemeris['longitude_geocentric']
+        phase_angle = (longitude[:, names.index('moon')] - longitude[:, names.index('sun')]) % 360
+        # Only major phases are reported (see get_lunar_phase_name)
+        new_moon = (phase_angle < 45) | (phase_angle >= 315)
+        full_moon = (phase_angle >= 135) & (phase_angle < 225)
+        for d in np.flatnonzero(new_moon | full_moon).tolist():
+            cycles["lunar_phases"].append({
+                "date": dates[d],
+                "phase": "New Moon" if new_moon[d] else "Full Moon",
+                "angle": round(float(phase_angle[d]), 1)
+            })
     
     return cycles
 
@@ -1267,4 +1476,5 @@ async def event_ai(event: dict):
         }
         return insight
     except Exception as e:
+        logger.exception('AI insight generation failed')
         raise HTTPException(status_code=500, detail=f'AI insight generation failed: {str(e)}')
@@ -0,0 +1,236 @@
+"""
+broadcast_hub.py
+- Pub/sub fan-out for the streaming websockets (/ws/confluence, /ws/signals, /ict/ws).
+- One producer task per (channel, symbol, interval) topic; each payload is serialized once
+  and the same text frame is sent to every subscriber of that topic.
+- Producers start with the first subscriber and are cancelled with the last one.
+- Sequenced topics (serve_sequenced) stamp every payload with a monotonically increasing
+  "seq" and keep a bounded replay buffer, so a client reconnecting with the last seq and
+  the topic epoch only receives what it missed; otherwise it is sent a fresh snapshot.
+  Their producer outlives the last subscriber by RESUME_GRACE seconds so a reconnect can
+  resume; then the topic and its buffer are dropped.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+
+from fastapi import WebSocket
+
+from app_logging import fields, get_logger
+from candle_store import canonical_interval, normalize_symbol
+from perf_metrics import SEND_ERRORS, SEND_SECONDS, SERIALIZE_SECONDS
+
+logger = get_logger("broadcast")
+
+# Seconds a single subscriber may take to accept a frame before it is dropped
+SEND_TIMEOUT = 5.0
+
+# Frames kept per sequenced topic for resuming clients
+REPLAY_SIZE = int(os.getenv("WS_REPLAY_SIZE", "512"))
+
+# Seconds an idle sequenced topic keeps producing (and stays resumable) before it is dropped
+RESUME_GRACE = float(os.getenv("WS_RESUME_GRACE_SECONDS", "30"))
+
+
+def encode_payload(payload) -> str:
+    """Serialize like WebSocket.send_json so clients see identical frames."""
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+class _Topic:
+    def __init__(self, key, replay: int = 0):
+        self.key = key
+        # websocket -> None once live, or a list of frames queued while it is joining
+        self.subscribers = {}
+        self.task = None
+        # Pending drop of an idle sequenced topic (asyncio.TimerHandle)
+        self.reaper = None
+        self.last_message = None
+        # Sequencing state (replay > 0 only); survives producer restarts within the process
+        self.history = deque(maxlen=replay) if replay else None
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.floor = 0
+
+    def missed_since(self, since, epoch):
+        """Frames after `since`, or None when the gap cannot be replayed."""
+        if since is None or epoch != self.epoch or not (self.floor <= since <= self.seq):
+            return None
+        if self.history and since < self.history[0][0] - 1:
+            return None
+        return [frame for seq, frame in self.history if seq > since]
+
+
+class BroadcastHub:
+    """Topic registry mapping (channel, symbol, interval) to one shared producer."""
+
+    def __init__(self, send_timeout: float = SEND_TIMEOUT, resume_grace: float = RESUME_GRACE):
+        self.send_timeout = send_timeout
+        self.resume_grace = resume_grace
+        self._topics = {}
+
+    @staticmethod
+    def topic_key(channel: str, symbol: str, interval: str):
+        """(channel, SYMBOL, canonical interval); ValueError for an invalid symbol or interval.
+
+        Every spelling of one bar length ("1h", "1H", "60m") maps to the same topic.
+        """
+        return (channel, normalize_symbol(symbol), canonical_interval(interval))
+
+    def subscriber_count(self, key) -> int:
+        topic = self._topics.get(key)
+        return len(topic.subscribers) if topic else 0
+
+    def stats(self) -> dict:
+        return {"/".join(key): len(topic.subscribers) for key, topic in self._topics.items()}
+
+    def _topic(self, key, replay: int = 0) -> _Topic:
+        topic = self._topics.get(key)
+        if topic is None:
+            topic = _Topic(key, replay)
+            self._topics[key] = topic
+        return topic
+
+    def _start(self, topic: _Topic, producer) -> bool:
+        """Start the producer if it is not running; returns True if it was started."""
+        if topic.task is not None and not topic.task.done():
+            return False
+        if topic.history is not None:
+            # Nothing was produced while the topic was idle; older seqs must resync
+            topic.history.clear()
+            topic.floor = topic.seq + 1
+        topic.task = asyncio.create_task(self._produce(topic, producer))
+        return True
+
+    async def subscribe(self, key, websocket: WebSocket, producer, replay_last: bool = True):
+        """Add a socket to a topic, starting the producer if it is the first subscriber.
+
+        `producer` is a zero-argument callable returning an async iterator of payloads.
+        """
+        topic = self._topic(key)
+        topic.subscribers[websocket] = None
+        if not self._start(topic, producer) and replay_last and topic.last_message is not None:
+            # Late joiners get the latest frame instead of waiting for the next tick
+            await self._send(topic, websocket, topic.last_message)
+
+    async def unsubscribe(self, key, websocket: WebSocket):
+        topic = self._topics.get(key)
+        if topic is None:
+            return
+        topic.subscribers.pop(websocket, None)
+        if topic.subscribers:
+            return
+        if topic.history is None or self.resume_grace <= 0:
+            self._drop(key, topic)
+        elif topic.reaper is None:
+            # Keep producing for a while so a client that reconnects can still resume
+            topic.reaper = asyncio.get_running_loop().call_later(self.resume_grace, self._drop, key, topic)
+
+    def _drop(self, key, topic: _Topic):
+        """Remove a topic that has no subscribers and cancel its producer."""
+        topic.reaper = None
+        if topic.subscribers:
+            return
+        if self._topics.get(key) is topic:
+            self._topics.pop(key)
+        if topic.task is not None and not topic.task.done():
+            topic.task.cancel()
+
+    async def _hold(self, websocket: WebSocket):
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+    async def serve(self, key, websocket: WebSocket, producer, replay_last: bool = True):
+        """Subscribe an accepted socket and hold it until the client disconnects."""
+        await self.subscribe(key, websocket, producer, replay_last=replay_last)
+        try:
+            await self._hold(websocket)
+        finally:
+            await self.unsubscribe(key, websocket)
+
+    async def serve_sequenced(self, key, websocket: WebSocket, producer, send_snapshot,
+                              since: int = None, epoch: str = None, replay: int = REPLAY_SIZE):
+        """Serve a sequenced topic: resume from `since` or send a snapshot, then stream.
+
+        `send_snapshot(seq, epoch)` is awaited when the client cannot be resumed; it must send
+        state that is current as of `seq`. Frames produced meanwhile are queued for this socket
+        and flushed in order before it goes live.
+        """
+        topic = self._topic(key, replay)
+        if topic.reaper is not None:
+            topic.reaper.cancel()
+            topic.reaper = None
+        # Registered (as joining) before any await so no frame after this seq is lost
+        topic.subscribers[websocket] = []
+        self._start(topic, producer)
+        missed = topic.missed_since(since, epoch)
+        try:
+            if missed is None:
+                await send_snapshot(topic.seq, topic.epoch)
+            else:
+                await websocket.send_text(encode_payload({"resumed": True, "seq": since, "epoch": topic.epoch}))
+                for frame in missed:
+                    await websocket.send_text(frame)
+            await self._go_live(topic, websocket)
+            await self._hold(websocket)
+        finally:
+            await self.unsubscribe(key, websocket)
+
+    async def _go_live(self, topic: _Topic, websocket: WebSocket):
+        queue = topic.subscribers.get(websocket)
+        while queue:
+            await websocket.send_text(queue.pop(0))
+        if websocket in topic.subscribers:
+            topic.subscribers[websocket] = None
+
+    async def _produce(self, topic: _Topic, producer):
+        try:
+            async for payload in producer():
+                if topic.history is not None:
+                    topic.seq += 1
+                    payload = dict(payload, seq=topic.seq)
+                with SERIALIZE_SECONDS.labels(topic.key[0]).time():
+                    message = encode_payload(payload)
+                topic.last_message = message
+                if topic.history is not None:
+                    topic.history.append((topic.seq, message))
+                live = []
+                for ws, queue in topic.subscribers.items():
+                    if queue is None:
+                        live.append(ws)
+                    else:
+                        queue.append(message)
+                if live:
+                    await asyncio.gather(*(self._send(topic, ws, message) for ws in live))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("broadcast producer failed", extra=fields(topic="/".join(topic.key)))
+            # Close subscribers so clients reconnect and restart the producer
+            await asyncio.gather(*(self._close(ws) for ws in list(topic.subscribers)))
+
+    async def _send(self, topic: _Topic, websocket: WebSocket, message: str):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(websocket.send_text(message), self.send_timeout)
+            SEND_SECONDS.labels(topic.key[0]).observe(time.perf_counter() - start)
+        except Exception:
+            # Slow or closed sockets are dropped so they never stall the topic
+            SEND_ERRORS.labels(topic.key[0]).inc()
+            topic.subscribers.pop(websocket, None)
+            asyncio.ensure_future(self._close(websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+
+
+broadcast_hub = BroadcastHub()
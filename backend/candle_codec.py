@@ -0,0 +1,65 @@
+"""
+candle_codec.py
+- Wire formats for candle batches (/candles, /ict/candles, /ict/ws initial batch).
+- objects: [{"time", "open", ...}, ...]  (default, LightweightCharts-ready)
+- columns: {"columns": [...names], "candles": [[times], [opens], ...]} in COLUMNS order
+- binary:  typed little-endian columns behind a small self-describing header:
+    uint32 header length | UTF-8 JSON header, space-padded to 8-byte alignment |
+    column 0 | column 1 | ...   (each `count` values, dtype per the header)
+  The header carries {"symbol", "interval", "count", "columns": [[name, dtype], ...],
+  "generated_at"}, so the same bytes work as an HTTP body and as a websocket frame.
+"""
+import json
+import struct
+
+import numpy as np
+
+from candle_store import COLUMNS, COLUMN_DTYPES, columns_to_records
+
+FORMATS = ("objects", "columns", "binary")
+BINARY_MEDIA_TYPE = "application/vnd.astroquant.candles"
+
+_WIRE_DTYPES = {name: np.dtype(dtype).newbyteorder("<") for name, dtype in COLUMN_DTYPES.items()}
+
+
+def negotiate_format(fmt: str = None, accept: str = None) -> str:
+    """Pick the wire format: an explicit `format` param wins, then the Accept header."""
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown format '{fmt}' (expected one of {', '.join(FORMATS)})")
+        return fmt
+    accept = (accept or "").lower()
+    if BINARY_MEDIA_TYPE in accept or "application/octet-stream" in accept:
+        return "binary"
+    return "objects"
+
+
+def encode_json(columns: dict, fmt: str):
+    """The `candles` field for the JSON formats."""
+    if fmt == "columns":
+        return [columns[name].tolist() for name in COLUMNS]
+    return columns_to_records(columns)
+
+
+def encode_binary(columns: dict, meta: dict) -> bytes:
+    count = len(columns["time"])
+    header = dict(meta, count=count, columns=[[name, _WIRE_DTYPES[name].str] for name in COLUMNS])
+    raw = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # Pad so every column starts 8-byte aligned (Float64Array/BigInt64Array views)
+    raw += b" " * (-(4 + len(raw)) % 8)
+    parts = [struct.pack("<I", len(raw)), raw]
+    parts.extend(np.ascontiguousarray(columns[name], dtype=_WIRE_DTYPES[name]).tobytes() for name in COLUMNS)
+    return b"".join(parts)
+
+
+def decode_binary(data: bytes):
+    """Inverse of encode_binary: (header dict, {name: array})."""
+    (length,) = struct.unpack_from("<I", data, 0)
+    header = json.loads(data[4:4 + length].decode("utf-8"))
+    offset, count, columns = 4 + length, header["count"], {}
+    for name, dtype in header["columns"]:
+        dtype = np.dtype(dtype)
+        columns[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += dtype.itemsize * count
+    return header, columns
@@ -0,0 +1,604 @@
+"""
+candle_store.py
+- Process-wide OHLCV candle store shared by /candles, /ict/candles, /market/ohlc and /ict/ws.
+- Only the base resolution (BASE_INTERVAL) is generated and ticked; every higher
+  timeframe is an AggregatedSeries that resamples base bars, so all intervals of a symbol
+  agree with each other. Closed higher-timeframe bars are cached in their own ring and
+  extended incrementally as base bars close; the forming bar is aggregated on demand.
+- Every series keeps a column-oriented ring buffer; requests are answered as tail slices
+  instead of regenerating the whole series on every hit.
+- Base bars come from the seeded generator in synthetic_data, so a given bar is identical
+  across restarts; only the forming bar's live ticks are random. With a history store
+  attached (history_store.py), closed base bars are persisted as they close and reloaded
+  on restart, and reads older than the ring are served from the on-disk history.
+- The registry holds at most MAX_SYMBOLS symbols; creating one more evicts the least
+  recently used symbol (an idle one first) with all of its series.
+"""
+import os
+from collections import OrderedDict
+import random
+import re
+import threading
+import time
+
+import numpy as np
+
+from synthetic_data import SyntheticMarket
+
+UNIT_SECONDS = {"m": 60, "min": 60, "h": 3600, "d": 86400, "w": 604800}
+_INTERVAL_RE = re.compile(r"^(\d+)\s*(m|min|h|d|w)$")
+# Symbols the store accepts (after upper-casing); anything else is rejected before a
+# series, a ring or a history file is created for it
+SYMBOL_RE = re.compile(r"^[A-Z0-9_]{1,16}$")
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+COLUMN_DTYPES = {
+    "time": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.int64,
+}
+
+# Higher timeframe used as context for each chart interval (by bar seconds),
+# e.g. fractal alignment of a 5m chart against closed 1H bars
+HTF_MAP = {60: "15m", 300: "1H", 900: "4H", 1800: "4H", 3600: "4H", 14400: "1D"}
+
+# Number of bars retained per (symbol, higher timeframe)
+DEFAULT_CAPACITY = int(os.getenv("CANDLE_STORE_CAPACITY", "2000"))
+
+# Finest resolution; the only one generated, everything else is aggregated from it
+BASE_INTERVAL = os.getenv("CANDLE_BASE_INTERVAL", "1m")
+# Base bars retained per symbol (64k one-minute bars is about 45 days)
+BASE_CAPACITY = int(os.getenv("CANDLE_BASE_CAPACITY", str(2 ** 16)))
+# Symbols kept in the registry (each costs a base ring of about 6 MB plus its timeframes)
+MAX_SYMBOLS = int(os.getenv("CANDLE_MAX_SYMBOLS", "64"))
+# A symbol whose series were not read or ticked for this long is evicted first
+SYMBOL_IDLE_SECONDS = float(os.getenv("CANDLE_SYMBOL_IDLE_SECONDS", "300"))
+# Most base bars generated to backfill a higher timeframe's history on first use
+HTF_BACKFILL_BASE_BARS = int(os.getenv("CANDLE_HTF_BACKFILL_BARS", str(2 ** 20)))
+# Hard cap on the bars of one query (limit, or the span of start/end)
+MAX_PAGE_BARS = int(os.getenv("CANDLE_MAX_PAGE_BARS", "100000"))
+# Most base bars one higher-timeframe page may aggregate, which caps its page below
+# MAX_PAGE_BARS (e.g. about 17k bars of 1H or 728 of 1D over a 1m base)
+MAX_PAGE_BASE_BARS = int(os.getenv("CANDLE_MAX_PAGE_BASE_BARS", str(HTF_BACKFILL_BASE_BARS)))
+
+# Random-walk step of the forming bar per tick, as a fraction of the symbol volatility
+TICK_VOLATILITY = 0.05
+
+
+def interval_seconds(interval: str) -> int:
+    """Bar length in seconds for an interval label such as 5m, 15min, 1H, 4h, 1D or 1W.
+
+    Raises ValueError for anything else (minutes must be lowercase; "M" reads as months).
+    """
+    label = str(interval).strip()
+    match = _INTERVAL_RE.match(label if label.endswith("M") else label.lower())
+    if match is None or int(match.group(1)) <= 0:
+        raise ValueError(f"unsupported interval '{interval}' (expected e.g. 1m, 5m, 15m, 1H, 4H, 1D)")
+    return int(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+
+def canonical_interval(interval: str) -> str:
+    """One label per bar length, in the largest whole unit: "60m", "1h" and "1H" are all "1H".
+
+    Use it wherever an interval is part of a key (topics, pipeline state, metric labels).
+    """
+    seconds = interval_seconds(interval)
+    for unit, suffix in ((604800, "W"), (86400, "D"), (3600, "H"), (60, "m")):
+        if seconds % unit == 0:
+            return f"{seconds // unit}{suffix}"
+
+
+def normalize_symbol(symbol: str) -> str:
+    """Upper-cased symbol; raises ValueError unless it matches SYMBOL_RE."""
+    value = str(symbol).strip().upper()
+    if not SYMBOL_RE.match(value):
+        raise ValueError(f"unsupported symbol '{symbol}' (expected 1-16 characters of A-Z, 0-9 or _)")
+    return value
+
+
+def higher_timeframe(interval: str):
+    """Context interval label for `interval` per HTF_MAP, or None if there is none."""
+    return HTF_MAP.get(interval_seconds(interval))
+
+
+def aggregate(columns: dict, step: int) -> dict:
+    """Resample time-sorted OHLCV columns into `step`-second bars.
+
+    Buckets are aligned to multiples of `step`; empty buckets produce no bar.
+    """
+    times = np.asarray(columns["time"])
+    if len(times) == 0:
+        return {name: np.zeros(0, dtype=COLUMN_DTYPES[name]) for name in COLUMNS}
+    buckets = times - times % step
+    starts = np.flatnonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))
+    ends = np.concatenate([starts[1:], [len(times)]]) - 1
+    return {
+        "time": buckets[starts].astype(np.int64),
+        "open": np.asarray(columns["open"])[starts],
+        "high": np.maximum.reduceat(columns["high"], starts),
+        "low": np.minimum.reduceat(columns["low"], starts),
+        "close": np.asarray(columns["close"])[ends],
+        "volume": np.add.reduceat(columns["volume"], starts).astype(np.int64),
+    }
+
+
+class ColumnRing:
+    """Fixed-capacity column buffer.
+
+    Storage is allocated at twice the capacity so the live window is always a
+    contiguous slice: appends write past the end and, once the spare room is
+    used up, the newest rows are moved back to the front in one copy.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._cols = {name: np.zeros(2 * self.capacity, dtype=COLUMN_DTYPES[name]) for name in COLUMNS}
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def _make_room(self, count: int):
+        if self._end + count <= 2 * self.capacity:
+            return
+        keep = min(len(self), max(0, self.capacity - count))
+        for col in self._cols.values():
+            col[:keep] = col[self._end - keep:self._end]
+        self._start, self._end = 0, keep
+
+    def extend(self, columns: dict):
+        """Append equally sized column arrays (oldest first)."""
+        count = len(columns["time"])
+        if count == 0:
+            return
+        if count > self.capacity:
+            columns = {name: values[-self.capacity:] for name, values in columns.items()}
+            count = self.capacity
+        self._make_room(count)
+        for name, col in self._cols.items():
+            col[self._end:self._end + count] = columns[name]
+        self._end += count
+        if len(self) > self.capacity:
+            self._start = self._end - self.capacity
+
+    def column(self, name: str):
+        """Read-only view of one column over the live window."""
+        view = self._cols[name][self._start:self._end]
+        view.flags.writeable = False
+        return view
+
+    def tail(self, limit: int) -> dict:
+        """Views of the newest `limit` rows for every column."""
+        limit = max(0, min(int(limit), len(self)))
+        lo = self._end - limit
+        return {name: col[lo:self._end] for name, col in self._cols.items()}
+
+    def window(self, lo: int, hi: int) -> dict:
+        """Views of rows lo:hi of the live window for every column."""
+        lo, hi = self._start + max(0, lo), self._start + min(hi, len(self))
+        return {name: col[lo:hi] for name, col in self._cols.items()}
+
+    def first_time(self):
+        return int(self._cols["time"][self._start]) if len(self) else None
+
+    def last_time(self):
+        return int(self._cols["time"][self._end - 1]) if len(self) else None
+
+    def last(self, name: str):
+        return self._cols[name][self._end - 1].item()
+
+    def set_last(self, values: dict):
+        """Overwrite fields of the newest row (the forming bar)."""
+        for name, value in values.items():
+            self._cols[name][self._end - 1] = value
+
+
+def columns_to_records(columns: dict) -> list:
+    """Materialize column arrays as LightweightCharts-style candle dicts."""
+    lists = [columns[name].tolist() for name in COLUMNS]
+    return [dict(zip(COLUMNS, row)) for row in zip(*lists)]
+
+
+def _bounds(step: int, last: int, limit: int, start: int = None, end: int = None):
+    """[lo, hi) open times of a query: up to `limit` bars from `start`, or the newest `limit`
+    before `end` (exclusive), never past the bar opening at `last`.
+
+    `limit` is clamped to MAX_PAGE_BARS, which also bounds the span of a start/end range.
+    """
+    limit = min(max(0, int(limit)), MAX_PAGE_BARS)
+    hi = last + step if end is None else min(-(-int(end) // step) * step, last + step)
+    if start is None:
+        return hi - limit * step, hi
+    lo = -(-int(start) // step) * step
+    return lo, max(lo, min(hi, lo + limit * step))
+
+
+def _copy(columns: dict) -> dict:
+    return {name: values.copy() for name, values in columns.items()}
+
+
+def _concat(parts: list) -> dict:
+    if len(parts) == 1:
+        return parts[0]
+    return {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+
+
+def _join(parts: list) -> dict:
+    parts = [part for part in parts if part is not None and len(part["time"])]
+    if not parts:
+        return {name: np.zeros(0, dtype=COLUMN_DTYPES[name]) for name in COLUMNS}
+    return _concat(parts)
+
+
+class CandleSeries:
+    """Ring-buffered synthetic OHLCV history at the base resolution of one symbol.
+
+    `history` is an optional HistoryTable the closed bars are appended to; the ring starts
+    from its newest rows.
+    """
+
+    max_page = MAX_PAGE_BARS
+
+    def __init__(self, symbol: str, interval: str = BASE_INTERVAL, capacity: int = BASE_CAPACITY,
+                 history=None):
+        self.symbol = symbol
+        self.interval = interval
+        self.step = interval_seconds(interval)
+        self.market = SyntheticMarket(symbol, self.step)
+        self.volatility = self.market.volatility
+        self.ring = ColumnRing(capacity)
+        self.lock = threading.Lock()
+        self.history = history
+        # Monotonic time of the last sync; every read and tick (also of timeframes) syncs
+        self.used = time.monotonic()
+        if history is not None and len(history):
+            self.ring.extend(history.tail(self.ring.capacity))
+
+    def sync(self, now: int = None):
+        """Append bars for every interval elapsed since the last stored bar.
+
+        The last bar is the one whose bucket contains `now`.
+        """
+        self.used = time.monotonic()
+        now = int(time.time()) if now is None else int(now)
+        current = now - now % self.step
+        last = self.ring.last_time()
+        if last is not None and last >= current:
+            return
+        if last is None or (current - last) // self.step > self.ring.capacity:
+            first = current - (self.ring.capacity - 1) * self.step
+        else:
+            first = last + self.step
+        self.ring.extend(self.market.bars(first, (current - first) // self.step + 1))
+        self._persist()
+
+    def _persist(self):
+        """Append closed ring bars the history does not have yet (the forming bar is skipped)."""
+        if self.history is None:
+            return
+        times = self.ring.column("time")
+        last = self.history.last_time()
+        lo = 0 if last is None else int(np.searchsorted(times, last, side="right"))
+        hi = len(times) - 1
+        if hi <= lo:
+            return
+        if last is not None and times[lo] > last + self.step:
+            # Downtime longer than the ring: fill the gap so the history stays contiguous
+            self.history.append(self.market.bars(last + self.step, (int(times[lo]) - last) // self.step - 1))
+        self.history.append(self.ring.window(lo, hi))
+
+    def _generate(self, start: int, stop: int):
+        count = -(-(stop - start) // self.step)
+        return self.market.bars(start, count) if count > 0 else None
+
+    def _split(self, start: int, end: int):
+        """(copy of the ring bars with start <= time < end, (lo, hi) of the older span).
+
+        The caller holds the lock; the older span is read with _older(), which does not
+        need it, so history reads and generation can run after the lock is released.
+        """
+        start = max(start - start % self.step, 0)
+        ring_first = self.ring.first_time()
+        stop = end if ring_first is None else min(end, ring_first)
+        recent = None
+        if ring_first is not None and end > ring_first:
+            times = self.ring.column("time")
+            lo = int(np.searchsorted(times, max(start, stop), side="left"))
+            hi = int(np.searchsorted(times, end, side="left"))
+            recent = _copy(self.ring.window(lo, hi))
+        return recent, (start, stop)
+
+    def _older(self, start: int, stop: int) -> dict:
+        """Bars with start <= time < stop from the on-disk history, and anything it does not
+        hold regenerated from the seeded market. Needs no lock."""
+        parts, cursor = [], start
+        if cursor < stop and self.history is not None and len(self.history):
+            first, after = self.history.first_time(), self.history.last_time() + self.step
+            if first < stop and after > cursor:
+                parts.append(self._generate(cursor, first))
+                cursor = max(cursor, first)
+                parts.append(self.history.range(cursor, min(stop, after)))
+                cursor = min(stop, after)
+        parts.append(self._generate(cursor, stop))
+        return _join(parts)
+
+    def range(self, start: int, end: int) -> dict:
+        """Bars with start <= time < end (caller holds the lock and has synced).
+
+        Bars come from the ring (including live ticks of former forming bars), then the
+        on-disk history, and anything neither holds is regenerated from the seeded market.
+        """
+        recent, older = self._split(start, end)
+        return _join([self._older(*older), recent])
+
+    def query(self, start: int = None, end: int = None, limit: int = 200) -> dict:
+        """Up to `limit` bars (oldest first, at most MAX_PAGE_BARS) with start <= time < end.
+
+        Without `start` these are the newest `limit` bars before `end`, or before now.
+        Only the ring is read under the lock; bars older than the ring come from history or
+        the generator after it is released, so a deep page never stalls this symbol's ticks.
+        """
+        with self.lock:
+            self.sync()
+            lo, hi = _bounds(self.step, self.ring.last_time(), limit, start, end)
+            recent, older = self._split(lo, hi)
+        return _join([_copy(self._older(*older)), recent])
+
+    def tail(self, limit: int) -> dict:
+        """Newest `limit` bars, the forming bar last."""
+        return self.query(limit=limit)
+
+    def records(self, limit: int) -> list:
+        return columns_to_records(self.tail(limit))
+
+    def closed(self, limit: int) -> dict:
+        """Newest `limit` closed bars (the forming bar excluded)."""
+        with self.lock:
+            self.sync()
+            columns = self.ring.tail(max(0, int(limit)) + 1)
+            return {name: values[:-1].copy() for name, values in columns.items()}
+
+    def tick(self, since: int = None, now: int = None) -> list:
+        """Move the forming (last) bar one random-walk step and return bar records.
+
+        Returns every bar whose open time is >= `since` (oldest first), so bars that opened
+        since the caller's previous tick are included; without `since`, only the forming bar.
+        """
+        with self.lock:
+            self.sync(now)
+            ring = self.ring
+            close = round(ring.last("close") + random.gauss(0.0, self.volatility * TICK_VOLATILITY), 5)
+            ring.set_last({
+                "close": close,
+                "high": max(ring.last("high"), close),
+                "low": min(ring.last("low"), close),
+                "volume": ring.last("volume") + random.randint(1, 50),
+            })
+            count = 1
+            if since is not None:
+                times = ring.column("time")
+                count = max(1, len(times) - int(np.searchsorted(times, since, side="left")))
+            return columns_to_records(_copy(ring.tail(count)))
+
+    def seconds_until_next_bar(self, now: float = None) -> float:
+        now = time.time() if now is None else now
+        return self.step - (now % self.step)
+
+
+class AggregatedSeries:
+    """Higher-timeframe view of a base CandleSeries.
+
+    Closed bars are cached in a ring and only the buckets that closed since the last call
+    are aggregated; the forming bar is rebuilt from the base bars of the current bucket.
+    Shares the base series' lock, so base ticks and aggregation never interleave.
+    """
+
+    def __init__(self, base: CandleSeries, interval: str, step: int, capacity: int = DEFAULT_CAPACITY):
+        self.base = base
+        self.symbol = base.symbol
+        self.interval = interval
+        self.step = int(step)
+        self.ring = ColumnRing(capacity)
+        self.lock = base.lock
+        # Pages are also bounded by the base bars they aggregate
+        self.max_page = max(1, min(MAX_PAGE_BARS, MAX_PAGE_BASE_BARS * base.step // self.step))
+        # Open time of the first bucket not yet in the ring
+        self._next = None
+
+    def _sync(self, now: int = None):
+        """Sync the base series and append every higher-timeframe bar closed since last time."""
+        now = int(time.time()) if now is None else int(now)
+        self.base.sync(now)
+        current = now - now % self.step
+        if self._next is None:
+            # Backfill, bounded by capacity and by how many base bars we are willing to build
+            buckets = min(self.ring.capacity, max(1, HTF_BACKFILL_BASE_BARS * self.base.step // self.step))
+            self._next = current - buckets * self.step
+        elif current - self._next > self.ring.capacity * self.step:
+            self._next = current - self.ring.capacity * self.step
+        # Chunked so a long backfill never materializes more than ~HTF_BACKFILL_BASE_BARS at once
+        chunk = max(self.step, HTF_BACKFILL_BASE_BARS * self.base.step // self.step * self.step)
+        while self._next < current:
+            end = min(current, self._next + chunk)
+            self.ring.extend(aggregate(self.base.range(self._next, end), self.step))
+            self._next = end
+
+    def _query(self, start: int = None, end: int = None, limit: int = 200, now: int = None) -> dict:
+        """Bars like CandleSeries.query: closed ones from the ring when it covers the range
+        (else aggregated from base bars on the fly), plus the forming bar if in range."""
+        now = int(time.time()) if now is None else int(now)
+        current = now - now % self.step
+        lo, hi = _bounds(self.step, current, limit, start, end)
+        parts = []
+        closed_hi = min(hi, current)
+        first = self.ring.first_time()
+        if lo < closed_hi:
+            if first is not None and lo >= first:
+                times = self.ring.column("time")
+                parts.append(_copy(self.ring.window(int(np.searchsorted(times, lo, side="left")),
+                                                    int(np.searchsorted(times, closed_hi, side="left")))))
+            else:
+                parts.append(aggregate(self.base.range(lo, closed_hi), self.step))
+        if hi > current:
+            parts.append(aggregate(self.base.range(current, current + self.step), self.step))
+        return _concat(parts) if parts else _copy(self.ring.tail(0))
+
+    def query(self, start: int = None, end: int = None, limit: int = 200) -> dict:
+        """Like CandleSeries.query, at most `max_page` bars.
+
+        Pages the cache covers are sliced under the lock. Older pages are aggregated from
+        base bars, of which only the base ring's share is read under the lock.
+        """
+        limit = min(max(0, int(limit)), self.max_page)
+        with self.lock:
+            self._sync()
+            now = int(time.time())
+            current = now - now % self.step
+            lo, hi = _bounds(self.step, current, limit, start, end)
+            first = self.ring.first_time()
+            if lo >= min(hi, current) or (first is not None and lo >= first):
+                return self._query(start, end, limit, now)
+            recent, older = self.base._split(lo, hi)
+        return aggregate(_join([self.base._older(*older), recent]), self.step)
+
+    def tail(self, limit: int) -> dict:
+        return self.query(limit=limit)
+
+    def records(self, limit: int) -> list:
+        return columns_to_records(self.tail(limit))
+
+    def closed(self, limit: int) -> dict:
+        """Newest `limit` closed bars, straight from the cache (the forming bar excluded)."""
+        with self.lock:
+            self._sync()
+            return _copy(self.ring.tail(limit))
+
+    def tick(self, since: int = None, now: int = None) -> list:
+        """Tick the base series and return higher-timeframe bar records like CandleSeries.tick."""
+        self.base.tick(now=now)
+        with self.lock:
+            self._sync(now)
+            count = 1
+            if since is not None:
+                times = self.ring.column("time")
+                count = 1 + len(times) - int(np.searchsorted(times, since, side="left"))
+            return columns_to_records(self._query(limit=count, now=now))
+
+    def seconds_until_next_bar(self, now: float = None) -> float:
+        now = time.time() if now is None else now
+        return self.step - (now % self.step)
+
+
+class CandleStore:
+    """Registry of base series per SYMBOL and aggregated series per (SYMBOL, bar seconds).
+
+    Interval labels that name the same bar length ("1h", "1H", "60m") share one series.
+    Symbols are kept in LRU order and at most `max_symbols` of them are held: a new one
+    evicts the least recently used idle symbol, or the least recently used one if none is
+    idle. Symbols persisted to history are never evicted (the history allow-list bounds
+    them), so a table never has two writers. A live feed holding an evicted series keeps
+    ticking it; the next lookup simply builds a fresh one.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, base_interval: str = BASE_INTERVAL,
+                 base_capacity: int = BASE_CAPACITY, max_symbols: int = MAX_SYMBOLS,
+                 idle_seconds: float = SYMBOL_IDLE_SECONDS):
+        self.capacity = capacity
+        self.base_interval = base_interval
+        self.base_step = interval_seconds(base_interval)
+        self.base_capacity = base_capacity
+        self.max_symbols = max(1, int(max_symbols))
+        self.idle_seconds = idle_seconds
+        self.history = None
+        # SYMBOL -> {bar seconds: series}, least recently used first
+        self._symbols = OrderedDict()
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def attach_history(self, history):
+        """Persist base bars to a HistoryStore and warm the series it already holds.
+
+        Must be called before any series is created (i.e. at startup).
+        """
+        self.history = history
+        for symbol, interval in history.stored():
+            if interval == self.base_interval:
+                self.base(symbol)
+
+    def _entry(self, symbol: str) -> dict:
+        """{bar seconds: series} of a symbol, created with its base series if missing and
+        marked most recently used (caller holds the registry lock)."""
+        entry = self._symbols.get(symbol)
+        if entry is not None:
+            self._symbols.move_to_end(symbol)
+            return entry
+        self._evict()
+        history = None
+        if self.history is not None and self.history.persists(symbol):
+            history = self.history.table(symbol, self.base_interval)
+        entry = self._symbols[symbol] = {
+            self.base_step: CandleSeries(symbol, self.base_interval, self.base_capacity, history)
+        }
+        return entry
+
+    def _evict(self):
+        """Make room for one more symbol (caller holds the registry lock)."""
+        if len(self._symbols) < self.max_symbols:
+            return
+        evictable = [symbol for symbol, entry in self._symbols.items() if entry[self.base_step].history is None]
+        if not evictable:
+            return
+        idle_before = time.monotonic() - self.idle_seconds
+        victim = next((symbol for symbol in evictable if self._symbols[symbol][self.base_step].used < idle_before),
+                      evictable[0])
+        del self._symbols[victim]
+        self.evicted += 1
+
+    def symbols(self) -> list:
+        """Symbols currently held, least recently used first."""
+        with self._lock:
+            return list(self._symbols)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"symbols": len(self._symbols), "max_symbols": self.max_symbols,
+                    "series": sum(len(entry) for entry in self._symbols.values()), "evicted": self.evicted}
+
+    def base(self, symbol: str) -> CandleSeries:
+        """Base series of a symbol; ValueError for a symbol outside SYMBOL_RE."""
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            return self._entry(symbol)[self.base_step]
+
+    def series(self, symbol: str, interval: str):
+        """Series for an interval label; ValueError for an invalid symbol or an interval that
+        is not a multiple of the base interval."""
+        symbol = normalize_symbol(symbol)
+        step = interval_seconds(interval)
+        if step == self.base_step:
+            return self.base(symbol)
+        if step < self.base_step or step % self.base_step:
+            raise ValueError(
+                f"interval '{interval}' is not a multiple of the base interval '{self.base_interval}'"
+            )
+        with self._lock:
+            entry = self._entry(symbol)
+            series = entry.get(step)
+            if series is None:
+                series = entry[step] = AggregatedSeries(entry[self.base_step], interval, step, self.capacity)
+            return series
+
+    def candles(self, symbol: str, interval: str, limit: int = 200, start: int = None, end: int = None) -> list:
+        """Bars as candle dicts (oldest first): the newest `limit`, or a page per query()."""
+        return columns_to_records(self.series(symbol, interval).query(start, end, limit))
+
+    def closed_candles(self, symbol: str, interval: str, limit: int = 200) -> list:
+        """Newest `limit` closed bars as candle dicts; they only change when a bar closes."""
+        return columns_to_records(self.series(symbol, interval).closed(limit))
+
+
+candle_store = CandleStore()
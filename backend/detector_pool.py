@@ -0,0 +1,95 @@
+"""
+detector_pool.py
+- Bounded executor for CPU-bound detector runs (the /ws/confluence ICT pipeline), kept
+  apart from the loop's default executor so slow detectors never starve store reads.
+- Threads rather than processes: the incremental pipeline keeps per-window state in
+  process memory, and the numpy-heavy detectors release the GIL for much of their work.
+- Per-key coalescing: while a run for a key (e.g. confluence/SYMBOL/interval) is in flight,
+  further submissions for that key with the same input `version` (e.g. the last bar time)
+  wait on it instead of queueing another run. A submission with newer inputs starts a
+  fresh run that replaces it; the old one finishes in the background, unawaited.
+- Deadlines: callers wait at most `timeout` seconds and then get DeadlineExceeded. The run
+  itself is shielded (a thread cannot be interrupted) and finishes in the background; a
+  caller arriving meanwhile with the same inputs joins it instead of piling up more work,
+  and a dict result it gets that way is marked {"stale": True}.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+DETECTOR_WORKERS = int(os.getenv("DETECTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Seconds a caller waits for a detector run before skipping that tick
+DETECTOR_TIMEOUT = float(os.getenv("DETECTOR_TIMEOUT", "2.0"))
+
+
+class DeadlineExceeded(Exception):
+    """A detector run did not finish within its budget."""
+
+
+class _Run:
+    def __init__(self, version, future):
+        self.version = version
+        self.future = future
+        # Set once a caller gave up on this run; later joiners get a stale result
+        self.timed_out = False
+
+
+class DetectorPool:
+    def __init__(self, workers: int = DETECTOR_WORKERS, timeout: float = DETECTOR_TIMEOUT):
+        self.workers = max(1, int(workers))
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="detector")
+        self._inflight = {}
+        self.counts = {"submitted": 0, "coalesced": 0, "superseded": 0, "stale": 0, "completed": 0, "failed": 0,
+                       "deadline_exceeded": 0}
+
+    def stats(self) -> dict:
+        return dict(self.counts, workers=self.workers, inflight=len(self._inflight))
+
+    def _finished(self, key, future):
+        entry = self._inflight.get(key)
+        if entry is not None and entry.future is future:
+            del self._inflight[key]
+        if future.cancelled():
+            return
+        # Retrieved here so runs nobody waited for do not log "exception never retrieved"
+        self.counts["failed" if future.exception() is not None else "completed"] += 1
+
+    async def run(self, key, func, *args, version=None, timeout: float = None, **kwargs):
+        """Run func(*args, **kwargs) in the pool, coalesced per (`key`, `version`), within
+        `timeout` seconds."""
+        entry = self._inflight.get(key)
+        if entry is not None and entry.version != version:
+            # Newer inputs: do not hand this caller the result of an older run
+            self.counts["superseded"] += 1
+            entry = None
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+            entry = self._inflight[key] = _Run(version, future)
+            future.add_done_callback(partial(self._finished, key))
+            self.counts["submitted"] += 1
+            stale = False
+        else:
+            self.counts["coalesced"] += 1
+            stale = entry.timed_out
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            result = await asyncio.wait_for(asyncio.shield(entry.future), timeout)
+        except asyncio.TimeoutError:
+            entry.timed_out = True
+            self.counts["deadline_exceeded"] += 1
+            raise DeadlineExceeded(f"{'/'.join(map(str, key))} exceeded {timeout:.1f}s") from None
+        if stale:
+            # Started for an earlier tick that already gave up on it
+            self.counts["stale"] += 1
+            if isinstance(result, dict):
+                result = dict(result, stale=True)
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+detector_pool = DetectorPool()
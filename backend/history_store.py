@@ -0,0 +1,209 @@
+"""
+history_store.py
+- On-disk candle history behind the candle store: one append-only, memory-mapped file per
+  (symbol, interval, column) at <root>/<SYMBOL>/<interval>/<column>.bin (little-endian).
+- meta.json holds the committed row count and is the commit marker: an append writes and
+  flushes the column files first, then replaces meta.json atomically. Rows past `count`
+  (a crash mid-append) are ignored and overwritten; columns shorter than `count` cap it.
+- Only symbols in HISTORY_SYMBOLS are persisted (others stay in memory), and symbol and
+  interval must be plain names (candle_store.SYMBOL_RE, _INTERVAL_NAME_RE): a request can
+  neither pick a path outside the root nor make the store preallocate files for it.
+- Opening a table only reads meta.json and maps the files, so startup cost does not grow
+  with history length. Reads are binary searches over the time column returning read-only
+  views of the maps; nothing is loaded into Python lists.
+"""
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+from candle_store import COLUMNS, COLUMN_DTYPES, SYMBOL_RE
+
+HISTORY_VERSION = 1
+# Files grow in steps of this many rows so appends rarely remap
+GROW_ROWS = 2 ** 16
+META_FILE = "meta.json"
+_INTERVAL_NAME_RE = re.compile(r"^[0-9]{1,6}[A-Za-z]{1,3}$")
+
+_DTYPES = {name: np.dtype(dtype).newbyteorder("<") for name, dtype in COLUMN_DTYPES.items()}
+
+
+def _empty() -> dict:
+    return {name: np.zeros(0, dtype=_DTYPES[name]) for name in COLUMNS}
+
+
+class HistoryTable:
+    """Append-only column files for one (symbol, interval)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.lock = threading.Lock()
+        self._maps = {}
+        self._capacity = 0
+        self.count = self._committed_count()
+        self._map(self.count)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _committed_count(self) -> int:
+        meta_path = os.path.join(self.path, META_FILE)
+        if not os.path.exists(meta_path):
+            return 0
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if meta.get("version") != HISTORY_VERSION or meta.get("columns") != list(COLUMNS):
+            return 0
+        count = int(meta.get("count", 0))
+        for name in COLUMNS:
+            path = self._file(name)
+            rows = os.path.getsize(path) // _DTYPES[name].itemsize if os.path.exists(path) else 0
+            count = min(count, rows)
+        return count
+
+    def _write_meta(self):
+        meta_path = os.path.join(self.path, META_FILE)
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": HISTORY_VERSION, "columns": list(COLUMNS), "count": self.count,
+                       "dtypes": {name: _DTYPES[name].str for name in COLUMNS}}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, meta_path)
+
+    def _map(self, rows: int):
+        """(Re)map every column file with room for at least `rows` rows."""
+        capacity = max(GROW_ROWS, -(-rows // GROW_ROWS) * GROW_ROWS)
+        for name in COLUMNS:
+            path = self._file(name)
+            with open(path, "ab"):
+                pass
+            os.truncate(path, capacity * _DTYPES[name].itemsize)
+            self._maps[name] = np.memmap(path, dtype=_DTYPES[name], mode="r+", shape=(capacity,))
+        self._capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def first_time(self):
+        return int(self._maps["time"][0]) if self.count else None
+
+    def last_time(self):
+        return int(self._maps["time"][self.count - 1]) if self.count else None
+
+    def _view(self, lo: int, hi: int) -> dict:
+        out = {}
+        for name, values in self._maps.items():
+            view = values[lo:hi].view(np.ndarray)
+            view.flags.writeable = False
+            out[name] = view
+        return out
+
+    def range(self, start: int, end: int) -> dict:
+        """Read-only views of the rows with start <= time < end."""
+        with self.lock:
+            if not self.count:
+                return _empty()
+            times = self._maps["time"][:self.count]
+            lo = int(np.searchsorted(times, start, side="left"))
+            hi = int(np.searchsorted(times, end, side="left"))
+            return self._view(lo, hi)
+
+    def tail(self, limit: int) -> dict:
+        """Read-only views of the newest `limit` rows."""
+        with self.lock:
+            return self._view(max(0, self.count - max(0, int(limit))), self.count)
+
+    def append(self, columns: dict) -> int:
+        """Append bars newer than the last stored one; returns how many were written."""
+        with self.lock:
+            times = np.asarray(columns["time"])
+            if self.count:
+                keep = times > self._maps["time"][self.count - 1]
+                if not keep.all():
+                    columns = {name: np.asarray(columns[name])[keep] for name in COLUMNS}
+            n = len(columns["time"])
+            if n == 0:
+                return 0
+            if self.count + n > self._capacity:
+                self._map(max(2 * self._capacity, self.count + n))
+            for name, values in self._maps.items():
+                values[self.count:self.count + n] = columns[name]
+                values.flush()
+            self.count += n
+            self._write_meta()
+            return n
+
+    def close(self):
+        with self.lock:
+            for values in self._maps.values():
+                values.flush()
+
+
+def _valid(symbol: str, interval: str) -> bool:
+    return bool(SYMBOL_RE.match(symbol)) and bool(_INTERVAL_NAME_RE.match(interval))
+
+
+class HistoryStore:
+    """HistoryTable registry rooted at one directory.
+
+    `symbols` is the set of SYMBOLs to persist, or None for every valid symbol.
+    """
+
+    def __init__(self, root: str, symbols=None):
+        self.root = os.path.abspath(root)
+        self.symbols = None if symbols is None else frozenset(s.upper() for s in symbols)
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def persists(self, symbol: str) -> bool:
+        symbol = symbol.upper()
+        return bool(SYMBOL_RE.match(symbol)) and (self.symbols is None or symbol in self.symbols)
+
+    def table(self, symbol: str, interval: str) -> HistoryTable:
+        """Table of a persisted (symbol, interval); ValueError for anything else."""
+        key = (symbol.upper(), interval)
+        if not _valid(*key) or not self.persists(key[0]):
+            raise ValueError(f"no candle history for '{symbol}' / '{interval}'")
+        with self._lock:
+            table = self._tables.get(key)
+            if table is None:
+                table = HistoryTable(os.path.join(self.root, key[0], interval))
+                self._tables[key] = table
+        return table
+
+    def stored(self) -> list:
+        """Persisted (SYMBOL, interval) pairs that have a table on disk."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            (symbol, interval)
+            for symbol in os.listdir(self.root)
+            for interval in (os.listdir(os.path.join(self.root, symbol))
+                             if os.path.isdir(os.path.join(self.root, symbol)) else [])
+            if _valid(symbol, interval) and self.persists(symbol)
+            and os.path.exists(os.path.join(self.root, symbol, interval, META_FILE))
+        )
+
+    def close(self):
+        with self._lock:
+            for table in self._tables.values():
+                table.close()
+
+
+HISTORY_DIR = os.getenv("CANDLE_HISTORY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "candles"))
+# Comma-separated symbols whose base bars are persisted; "*" persists every valid symbol
+HISTORY_SYMBOLS = os.getenv(
+    "CANDLE_HISTORY_SYMBOLS", "EURUSD,GBPUSD,USDJPY,USDCHF,USDCAD,AUDUSD,NZDUSD,XAUUSD,BTCUSD,AAPL,NVDA"
+)
+
+# Disabled with CANDLE_HISTORY_DIR="" (in-memory only, as before)
+history_store = HistoryStore(
+    HISTORY_DIR, None if HISTORY_SYMBOLS.strip() == "*" else [s.strip() for s in HISTORY_SYMBOLS.split(",") if s.strip()]
+) if HISTORY_DIR else None
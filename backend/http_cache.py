@@ -0,0 +1,82 @@
+"""
+http_cache.py
+- Conditional GET for astro routes whose output only changes per time bucket (a UTC day,
+  a minute) or when the astro settings change.
+- The ETag is a hash of (route, bucket index, settings, query params), so it is known
+  before anything is computed: a matching If-None-Match is answered with 304 and an empty
+  body straight away.
+- Tags are weak (W/"..."): bodies carry generation timestamps, so two responses with the
+  same tag are equivalent rather than byte-identical.
+- Cache-Control max-age is the route's own limit, capped at the time left in the bucket,
+  so browsers never keep a body past its rollover.
+- Fixed bodies built once at startup (static_response) get a strong tag of their bytes.
+"""
+import hashlib
+import json
+import time
+
+from fastapi import Request, Response
+
+from perf_metrics import HTTP_CACHE_REQUESTS
+
+MINUTE = 60
+DAY = 86400
+# Bumping the version changes every tag (e.g. when a response format changes)
+ETAG_VERSION = 1
+
+
+def settings_fingerprint(settings) -> str:
+    """Stable hash of an astro settings object (its dict() if it has one)."""
+    if settings is None:
+        return ""
+    values = settings.dict() if hasattr(settings, "dict") else vars(settings)
+    text = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _tags(header: str):
+    for tag in header.split(","):
+        tag = tag.strip()
+        yield tag[2:] if tag.startswith("W/") else tag
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match matches `etag` (weak comparison) or is *."""
+    header = request.headers.get("if-none-match")
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return bool(header) and any(tag in ("*", opaque) for tag in _tags(header))
+
+
+def content_etag(content: bytes) -> str:
+    return '"' + hashlib.blake2b(content, digest_size=12).hexdigest() + '"'
+
+
+def static_response(request: Request, route: str, content: bytes, etag: str, media_type: str,
+                    max_age: int) -> Response:
+    """`content` with its ETag and Cache-Control, or a 304 if the client already has it."""
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    fresh = if_none_match(request, etag)
+    HTTP_CACHE_REQUESTS.labels(route, "not_modified" if fresh else "full").inc()
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+class Validator:
+    """ETag and Cache-Control headers for one request to a bucketed route."""
+
+    def __init__(self, request: Request, route: str, granularity: int, max_age: int, settings=None, *params,
+                 now: float = None):
+        now = time.time() if now is None else now
+        bucket = int(now // granularity)
+        parts = (ETAG_VERSION, route, granularity, bucket, settings_fingerprint(settings)) + params
+        digest = hashlib.blake2b("|".join(map(str, parts)).encode("utf-8"), digest_size=12).hexdigest()
+        self.route = route
+        self.etag = f'W/"{digest}"'
+        ttl = int((bucket + 1) * granularity - now)
+        self.headers = {"ETag": self.etag, "Cache-Control": f"public, max-age={max(0, min(max_age, ttl))}"}
+        self.fresh = if_none_match(request, self.etag)
+        HTTP_CACHE_REQUESTS.labels(route, "not_modified" if self.fresh else "full").inc()
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
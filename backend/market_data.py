@@ -0,0 +1,36 @@
+"""
+market_data.py
+- Async data-access layer for in-process consumers such as the websocket feeds.
+- Candles are read straight from the shared CandleStore (no loopback HTTP, no JSON
+  re-parse) and CPU-bound work is pushed to an executor so the event loop keeps serving
+  other sockets and requests.
+"""
+import asyncio
+from functools import partial
+
+from candle_store import candle_store, higher_timeframe
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable in the default executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+
+
+async def load_candles(symbol: str, interval: str, limit: int = 200) -> list:
+    """Newest `limit` candles for a symbol/interval as LightweightCharts dicts."""
+    # Usually an O(limit) ring slice, but the first read of a higher timeframe backfills
+    # it from base bars, so keep it off the event loop
+    return await run_blocking(candle_store.candles, symbol, interval, limit)
+
+
+async def load_htf_candles(symbol: str, interval: str, limit: int = 200):
+    """(higher timeframe label, its newest `limit` closed candles) for a chart interval.
+
+    Returns (None, None) when the interval has no higher timeframe in HTF_MAP. The bars
+    come from the store's cached aggregation, so they only change when an HTF bar closes.
+    """
+    htf_interval = higher_timeframe(interval)
+    if htf_interval is None:
+        return None, None
+    return htf_interval, await run_blocking(candle_store.closed_candles, symbol, htf_interval, limit)
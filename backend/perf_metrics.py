@@ -0,0 +1,225 @@
+"""
+perf_metrics.py
+- In-process latency histograms and counters for the streaming hot paths: every ICT
+  detector call, payload serialization and websocket send. No external dependencies.
+- /metrics renders the registry in the Prometheus text exposition format (0.0.4);
+  /debug/perf returns the same data as JSON with means and bucket-estimated percentiles.
+- Recording costs one lock and one bisect into fixed bucket bounds.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "astroquant_"
+# Upper bounds in seconds; the +Inf bucket is implicit
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000.0, 3)
+
+
+def _number(value) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _CounterValue:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramValue:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self.buckets[bisect.bisect_left(self.bounds, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q: float):
+        """Estimate by linear interpolation inside the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                lo = self.bounds[i - 1] if i > 0 else 0.0
+                hi = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(lo + (hi - lo) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class _Family:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **by_name):
+        key = tuple(str(by_name[n]) for n in self.labelnames) if by_name else tuple(map(str, values))
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new()
+        return child
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._items():
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new(self):
+        return _CounterValue()
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_number(child.value)}"]
+
+    def snapshot(self) -> dict:
+        return {"/".join(key): child.value for key, child in self._items()}
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), bounds=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.bounds = tuple(bounds)
+
+    def _new(self):
+        return _HistogramValue(self.bounds)
+
+    def _render_child(self, key, child):
+        lines, cumulative = [], 0
+        with child._lock:
+            buckets, total, count = list(child.buckets), child.sum, child.count
+        labels = _label_text(self.labelnames, key)
+        for bound, n in zip(self.bounds + (float("inf"),), buckets):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{labels} {repr(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def snapshot(self) -> dict:
+        out = {}
+        for key, child in self._items():
+            out["/".join(key)] = {
+                "count": child.count,
+                "total_ms": _ms(child.sum),
+                "mean_ms": _ms(child.sum / child.count) if child.count else None,
+                "p50_ms": _ms(child.quantile(0.5)),
+                "p95_ms": _ms(child.quantile(0.95)),
+                "p99_ms": _ms(child.quantile(0.99)),
+                "max_ms": _ms(child.max),
+            }
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._families = []
+
+    def counter(self, name: str, help_text: str, labelnames=()) -> Counter:
+        family = Counter(name, help_text, labelnames)
+        self._families.append(family)
+        return family
+
+    def histogram(self, name: str, help_text: str, labelnames=(), bounds=LATENCY_BUCKETS) -> Histogram:
+        family = Histogram(name, help_text, labelnames, bounds)
+        self._families.append(family)
+        return family
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for family in self._families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        return {family.name[len(PREFIX):]: family.snapshot() for family in self._families}
+
+
+registry = Registry()
+
+DETECTOR_SECONDS = registry.histogram("ict_detector_seconds", "Wall time of one ICT detector call.", ("detector",))
+DETECTOR_CALLS = registry.counter("ict_detector_calls_total", "ICT detector calls.", ("detector",))
+DETECTOR_CACHED = registry.counter(
+    "ict_detector_cached_total", "Ticks where a detector result was reused without a call.", ("detector",)
+)
+DETECTOR_SIGNALS = registry.counter(
+    "ict_detector_signals_total", "Events returned by ICT detector calls.", ("detector",)
+)
+DETECTOR_ERRORS = registry.counter("ict_detector_errors_total", "ICT detector calls that raised.", ("detector",))
+PIPELINE_SECONDS = registry.histogram(
+    "confluence_run_seconds", "Wall time of one confluence pipeline run (all detectors).", ("interval",)
+)
+SERIALIZE_SECONDS = registry.histogram(
+    "ws_serialize_seconds", "Time to encode one websocket payload.", ("channel",)
+)
+SEND_SECONDS = registry.histogram("ws_send_seconds", "Time to send one frame to one websocket.", ("channel",))
+SEND_ERRORS = registry.counter(
+    "ws_send_errors_total", "Frames dropped because the socket was slow or closed.", ("channel",)
+)
+HTTP_CACHE_REQUESTS = registry.counter(
+    "http_cache_requests_total", "Conditional astro GETs by route and outcome (not_modified or full).",
+    ("route", "outcome"),
+)
+
+
+def signal_count(result) -> int:
+    """Events in a detector result: list/tuple length, else 1 for a non-empty result."""
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1 if result else 0
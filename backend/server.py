@@ -13,14 +13,15 @@ from fastapi import WebSocket, WebSocketDisconnect
 import os
 import sys
 import asyncio
+import logging
 import random
 import time
 from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 # Ensure local imports work
@@ -28,6 +29,19 @@ BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
+from app_logging import fields, get_logger, log_sampled
+
+logger = get_logger("server")
+
+from candle_store import COLUMNS, MAX_PAGE_BARS, candle_store, canonical_interval, columns_to_records, normalize_symbol
+from history_store import history_store
+from candle_codec import BINARY_MEDIA_TYPE, encode_binary, encode_json, negotiate_format
+from ict_pipeline import confluence_pipeline
+from broadcast_hub import broadcast_hub
+from market_data import load_candles, load_htf_candles, run_blocking
+from detector_pool import DeadlineExceeded, detector_pool
+from perf_metrics import SEND_SECONDS, SERIALIZE_SECONDS, registry as metrics_registry
+
 # Helper to attempt module imports safely
 def try_import_router(module_name: str, attr: str = "router"):
     try:
@@ -35,8 +49,7 @@ def try_import_router(module_name: str, attr: str = "router"):
         if hasattr(mod, attr):
             return getattr(mod, attr)
     except Exception as e:
-        print(f"Could not import {module_name}: {e}")
-        pass
+        logger.warning("optional module unavailable", extra=fields(module=module_name, error=str(e)))
     return None
 
 app = FastAPI(title="AstroQuant Backend", version="3.2.0")
@@ -87,9 +100,19 @@ if news_router:
 @app.on_event("startup")
 async def startup_event():
     """Initialize application components"""
+    if history_store is not None:
+        # Reopens the on-disk candle history (maps files, no full reads); warming the stored
+        # series reads their tails and persists bars closed while down, so not on the loop
+        await run_blocking(candle_store.attach_history, history_store)
     if startup_news_api:
         await startup_news_api()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    detector_pool.shutdown()
+    if history_store is not None:
+        history_store.close()
+
 # --------------------
 # Basic health & quotes
 # --------------------
@@ -97,6 +120,25 @@ async def startup_event():
 async def health():
     return {"status": "ok", "time": datetime.utcnow().isoformat(), "version": "3.2.0"}
 
+# --------------------
+# Performance metrics
+# --------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Detector, serialization and websocket-send metrics in Prometheus text format"""
+    return PlainTextResponse(metrics_registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/perf")
+async def debug_perf():
+    """JSON view of the same metrics with percentiles, plus pool, stream and candle store state"""
+    return {
+        "metrics": metrics_registry.snapshot(),
+        "detector_pool": detector_pool.stats(),
+        "subscribers": broadcast_hub.stats(),
+        "candle_store": candle_store.stats(),
+        "generated_at": datetime.utcnow().isoformat(),
+    }
+
 QUOTES = [
     "Plan your trade, trade your plan.",
     "GANN geometry shows time and price harmony.",
@@ -657,416 +699,105 @@ async def websocket_live(websocket: WebSocket):
     except WebSocketDisconnect:
         pass
 
+async def signals_feed(symbol: str, interval: str):
+    """Shared GANN/level emitter feed for one /ws/signals topic"""
+    # Try to import emitters if available
+    try:
+        from gann_angle_emitter import emit_fans  # type: ignore
+    except Exception:
+        emit_fans = None  # type: ignore
+    try:
+        from natural_resistance_emitter import emit_fractional_levels  # type: ignore
+    except Exception:
+        emit_fractional_levels = None  # type: ignore
+    try:
+        from time_cycle_emitter import emit_time_squares  # type: ignore
+    except Exception:
+        emit_time_squares = None  # type: ignore
+
+    # Seed demo pivot/range; could be wired to live candles later
+    pivot_price = 2000.0
+    pivot_time = datetime.utcnow().replace(microsecond=0).isoformat()
+    low, high = 1980.0, 2020.0
+
+    while True:
+        sigs = []
+        if emit_fans:
+            sigs += emit_fans(symbol, pivot_price, pivot_time)
+        if emit_fractional_levels:
+            sigs += emit_fractional_levels(symbol, low, high, pivot_time)
+        if emit_time_squares:
+            sigs += emit_time_squares(symbol, pivot_time, pivot_price, abs(high - low))
+        yield {"signals": sigs}
+        await asyncio.sleep(8)
+
 @app.websocket("/ws/signals")
 async def websocket_signals(websocket: WebSocket):
     await websocket.accept()
+    # Read query params for instrument awareness
+    qp = websocket.query_params
     try:
-        # Try to import emitters if available
-        try:
-            from gann_angle_emitter import emit_fans  # type: ignore
-        except Exception:
-            emit_fans = None  # type: ignore
-        try:
-            from natural_resistance_emitter import emit_fractional_levels  # type: ignore
-        except Exception:
-            emit_fractional_levels = None  # type: ignore
-        try:
-            from time_cycle_emitter import emit_time_squares  # type: ignore
-        except Exception:
-            emit_time_squares = None  # type: ignore
-
-        # Read query params for instrument awareness
-        qp = websocket.query_params
-        symbol = qp.get("symbol", "XAUUSD")
-        interval = qp.get("interval", "5m")  # currently unused, reserved for future use
-        # Seed demo pivot/range; could be wired to live candles later
-        pivot_price = 2000.0
-        pivot_time = datetime.utcnow().replace(microsecond=0).isoformat()
-        low, high = 1980.0, 2020.0
-
-        while True:
-            sigs = []
-            if emit_fans:
-                sigs += emit_fans(symbol, pivot_price, pivot_time)
-            if emit_fractional_levels:
-                sigs += emit_fractional_levels(symbol, low, high, pivot_time)
-            if emit_time_squares:
-                sigs += emit_time_squares(symbol, pivot_time, pivot_price, abs(high - low))
-            await websocket.send_json({"signals": sigs})
-            await asyncio.sleep(8)
+        symbol = normalize_symbol(qp.get("symbol", "XAUUSD"))
+        interval = canonical_interval(qp.get("interval", "5m"))  # currently unused, reserved for future use
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    key = broadcast_hub.topic_key("signals", symbol, interval)
+    try:
+        await broadcast_hub.serve(key, websocket, lambda: signals_feed(symbol, interval))
     except WebSocketDisconnect:
         pass
 
+async def confluence_feed(symbol: str, interval: str):
+    """Shared ICT confluence feed for one /ws/confluence topic"""
+    logger.info("confluence stream started", extra=fields(symbol=symbol, interval=interval))
+    while True:
+        current_time = datetime.utcnow()
+
+        # Get current market data for ICT analysis (in-process, no loopback HTTP)
+        market_data = await load_candles(symbol, interval, 200)
+        # Closed higher-timeframe bars for fractal alignment, from the shared aggregation
+        htf_interval, htf_bars = await load_htf_candles(symbol, interval, 200)
+
+        # Detectors only re-process bars that changed since the last tick and run in the
+        # bounded detector pool, one run per topic and last bar at a time; a run over its
+        # deadline skips this tick instead of stalling the stream, and once a new bar opens
+        # the next tick starts a fresh run rather than joining the late one
+        try:
+            yield await detector_pool.run(
+                ("confluence", symbol, interval), confluence_pipeline.run,
+                symbol, interval, market_data, current_time,
+                htf_interval=htf_interval, htf_bars=htf_bars,
+                version=market_data[-1]["time"] if market_data else None,
+            )
+        except DeadlineExceeded as e:
+            logger.warning("confluence tick skipped", extra=fields(reason=str(e)))
+        await asyncio.sleep(5)  # Update every 5 seconds for real ICT analysis
+
 @app.websocket("/ws/confluence")
 async def websocket_confluence(websocket: WebSocket):
     """Real-time ICT Signal Confluence Stream"""
     await websocket.accept()
     try:
-        # Import ICT detectors for real-time confluence
-        try:
-            from ict_detectors.confluence import aggregate_confluence, get_realistic_confluence, analyze_market_structure
-            from ict_detectors.orderblock import detect_order_blocks
-            from ict_detectors.fvg import detect_fvg
-            from ict_detectors.liquidity_pool import detect_liquidity_pools
-            from ict_detectors.choch import detect_choch
-            from ict_detectors.msb import detect_msb
-            from ict_detectors.ote import detect_ote
-            from ict_detectors.sweep import detect_sweeps
-            from ict_detectors.killzone import detect_killzone
-            from ict_detectors.breaker import detect_breaker_entry
-            from ict_detectors.stop_hunt import detect_stop_hunt
-            from ict_detectors.structure_fractal import detect_fractal_alignment
-            from ict_detectors.orderflow_proxy import detect_orderflow_proxies
-            from ict_detectors.vol_profile_spike import detect_volume_spikes
-            from ict_detectors.fairness_gap import detect_mitigation_zones
-            from ict_detectors.supply_demand import detect_supply_demand_zones
-            from ict_detectors.range_detector import detect_range
-            from ict_detectors.trap import detect_trap
-            detectors_available = True
-            print("✅ All ICT detectors loaded successfully (including extended ICT modules)")
-        except Exception as e:
-            print(f"Warning: Could not import ICT detectors: {e}")
-            aggregate_confluence = None
-            get_realistic_confluence = None
-            detectors_available = False
-
         # Get parameters
         qp = websocket.query_params
-        symbol = qp.get("symbol", "EURUSD")
-        interval = qp.get("interval", "5m")
-        
-        print(f"Starting real-time confluence stream for {symbol} {interval}")
-        
-        # Function to get current market data (simulate or fetch real data)
-        def get_current_market_data(symbol: str, limit: int = 200):
-            """Get current market data for ICT analysis"""
-            try:
-                # Try to get real market data from existing candles endpoint
-                import requests
-                response = requests.get(f"http://localhost:8000/candles?symbol={symbol}&interval={interval}&limit={limit}")
-                if response.status_code == 200:
-                    data = response.json()
-                    if isinstance(data, list) and len(data) > 0:
-                        return data
-            except:
-                pass
-            
-            # Fallback: generate realistic candle data for testing
-            base_price = 1.1000 if symbol == "EURUSD" else 2000.0
-            candles = []
-            current_time = datetime.utcnow()
-            
-            for i in range(limit):
-                # Generate realistic OHLC data
-                time_offset = timedelta(minutes=(limit - i) * 5)  # 5-minute intervals
-                candle_time = current_time - time_offset
-                
-                # Price movement simulation
-                price_change = random.uniform(-0.01, 0.01) * base_price
-                open_price = base_price + price_change
-                
-                volatility = random.uniform(0.0005, 0.002) * base_price
-                high_price = open_price + random.uniform(0, volatility)
-                low_price = open_price - random.uniform(0, volatility)
-                close_price = open_price + random.uniform(-volatility/2, volatility/2)
-                
-                candles.append({
-                    "time": int(candle_time.timestamp()),
-                    "open": round(open_price, 5),
-                    "high": round(high_price, 5),
-                    "low": round(low_price, 5),
-                    "close": round(close_price, 5),
-                    "volume": random.randint(1000, 5000)
-                })
-                
-                base_price = close_price  # Update base for next candle
-            
-            return candles
-        
-        while True:
-            current_time = datetime.utcnow()
-            
-            # Get current market data for ICT analysis
-            market_data = get_current_market_data(symbol, 200)
-            current_price = market_data[-1]["close"] if market_data else 1.1000
-            
-            # Initialize evidence and signals
-            evidence = {}
-            signals = []
-            confluence_zones = []
-            
-            if detectors_available and market_data:
-                print(f"Running ICT detectors on {len(market_data)} candles...")
-                try:
-                    # Order Block Detection
-                    order_blocks = detect_order_blocks(market_data)
-                    evidence["ob"] = len(order_blocks) > 0
-                    for ob in order_blocks:
-                        signals.append({
-                            "type": "order_block",
-                            "high": ob["high"],
-                            "low": ob["low"],
-                            "start_time": datetime.fromtimestamp(ob["time"]).isoformat(),
-                            "end_time": (current_time + timedelta(hours=2)).isoformat(),
-                            "side": "bullish" if ob["type"] == "bull_ob" else "bearish",
-                            "confidence": 0.8
-                        })
-
-                    # Fair Value Gap Detection
-                    fvgs = detect_fvg(market_data)
-                    evidence["fvg"] = len(fvgs) > 0
-                    for fvg in fvgs:
-                        signals.append({
-                            "type": "fvg",
-                            "high": fvg["high"],
-                            "low": fvg["low"],
-                            "start_time": datetime.fromtimestamp(fvg["time"]).isoformat(),
-                            "end_time": (current_time + timedelta(hours=1)).isoformat(),
-                            "confidence": 0.7
-                        })
-
-                    # Liquidity Pool Detection
-                    liquidity_pools = detect_liquidity_pools(market_data)
-                    evidence["liquidity_pool"] = len(liquidity_pools) > 0
-                    for pool in liquidity_pools[:3]:
-                        pool_range = (market_data[-1]["high"] - market_data[-1]["low"]) * 0.001
-                        signals.append({
-                            "type": "liquidity",
-                            "high": pool["price"] + pool_range,
-                            "low": pool["price"] - pool_range,
-                            "start_time": (current_time - timedelta(hours=1)).isoformat(),
-                            "end_time": (current_time + timedelta(hours=2)).isoformat(),
-                            "label": f"liquidity-pool-{pool['strength']}",
-                            "confidence": min(0.9, 0.5 + (pool["strength"] * 0.1))
-                        })
-
-                    # Market Structure Break Detection
-                    msb = detect_msb(market_data)
-                    evidence["msb"] = msb is not None
-
-                    # Change of Character Detection
-                    choch = detect_choch(market_data)
-                    evidence["choch"] = choch is not None
-
-                    # OTE Detection
-                    ote_zones = detect_ote(market_data)
-                    evidence["ote"] = len(ote_zones) > 0
-                    for ote in ote_zones:
-                        signals.append({
-                            "type": "ote",
-                            "high": ote["max"],
-                            "low": ote["min"],
-                            "start_time": (current_time - timedelta(hours=1)).isoformat(),
-                            "end_time": (current_time + timedelta(hours=2)).isoformat(),
-                            "label": f"OTE-{ote['type']}",
-                            "confidence": 0.75
-                        })
-
-                    # Sweep Detection
-                    sweeps = detect_sweeps(market_data)
-                    evidence["sweep"] = len(sweeps) > 0
-                    for sweep in sweeps:
-                        sweep_range = abs(sweep["sweep_high"] - sweep["level"]) if "sweep_high" in sweep else abs(sweep["level"] - current_price) * 0.001
-                        signals.append({
-                            "type": "sweep",
-                            "high": sweep["level"] + sweep_range,
-                            "low": sweep["level"] - sweep_range,
-                            "start_time": datetime.fromtimestamp(sweep["sweep_time"]).isoformat(),
-                            "end_time": (current_time + timedelta(hours=1)).isoformat(),
-                            "label": f"Sweep-{sweep['type']}",
-                            "confidence": 0.85
-                        })
-
-                    # Breaker Detection
-                    breakers = detect_breaker_entry(market_data)
-                    evidence["breaker"] = len(breakers) > 0
-                    for breaker in breakers:
-                        signals.append({
-                            "type": "breaker",
-                            "high": breaker["high"],
-                            "low": breaker["low"],
-                            "start_time": datetime.fromtimestamp(breaker["time"]).isoformat(),
-                            "end_time": (current_time + timedelta(hours=3)).isoformat(),
-                            "side": "bullish" if breaker["type"] == "bull_breaker" else "bearish",
-                            "confidence": 0.8
-                        })
-
-                    # Killzone Detection
-                    killzone_info = detect_killzone(int(current_time.timestamp()))
-                    evidence["killzone"] = len(killzone_info["active_zones"]) > 0
-
-                    # Stop Hunt Detection
-                    stop_hunts = detect_stop_hunt(market_data)
-                    evidence["stop_hunt"] = len(stop_hunts) > 0
-                    for sh in stop_hunts:
-                        signals.append({
-                            "type": sh["type"],
-                            "low": sh.get("sweep_low"),
-                            "high": sh.get("sweep_high"),
-                            "close": sh.get("close"),
-                            "time": datetime.fromtimestamp(sh["time"]).isoformat(),
-                            "confidence": 0.8
-                        })
-
-                    # Fractal Alignment Detection (HTF/LTF)
-                    # For demo, use same market_data for both HTF/LTF
-                    fractal_alignment = detect_fractal_alignment(market_data, market_data)
-                    evidence["fractal_alignment"] = fractal_alignment.get("score", 0) > 50
-
-                    # Orderflow Proxy Detection
-                    orderflow_proxies = detect_orderflow_proxies(market_data)
-                    evidence["orderflow_proxy"] = len(orderflow_proxies) > 0
-                    for ofp in orderflow_proxies:
-                        signals.append({
-                            "type": "orderflow_proxy",
-                            "dir": ofp["dir"],
-                            "vol_ratio": ofp["vol_ratio"],
-                            "body_ratio": ofp["body_ratio"],
-                            "time": datetime.fromtimestamp(ofp["time"]).isoformat(),
-                            "confidence": 0.8
-                        })
-
-                    # Volume Spike Detection
-                    volume_spikes = detect_volume_spikes(market_data)
-                    evidence["volume_spike"] = len(volume_spikes) > 0
-                    for vs in volume_spikes:
-                        signals.append({
-                            "type": "volume_spike",
-                            "vol": vs["vol"],
-                            "vol_ratio": vs["vol_ratio"],
-                            "price": vs["price"],
-                            "time": datetime.fromtimestamp(vs["time"]).isoformat(),
-                            "confidence": 0.8
-                        })
-
-                    # Mitigation Zone Detection
-                    mitigation_zones = detect_mitigation_zones(market_data)
-                    evidence["mitigation_zone"] = len(mitigation_zones) > 0
-                    for mz in mitigation_zones:
-                        signals.append({
-                            "type": "mitigation_zone",
-                            "low": mz["low"],
-                            "high": mz["high"],
-                            "note": mz["note"],
-                            "time": datetime.fromtimestamp(mz["time"]).isoformat(),
-                            "confidence": 0.7
-                        })
-
-                    # Supply/Demand Zone Detection
-                    supply_demand_zones = detect_supply_demand_zones(market_data)
-                    evidence["supply_demand_zone"] = len(supply_demand_zones) > 0
-                    for sd in supply_demand_zones:
-                        signals.append({
-                            "type": sd["type"],
-                            "price": sd["price"],
-                            "count": sd["count"],
-                            "confidence": 0.7
-                        })
-
-                    # Range Detection
-                    range_zone = detect_range(market_data)
-                    evidence["range_zone"] = range_zone is not None
-                    if range_zone:
-                        signals.append({
-                            "type": "range_zone",
-                            "high": range_zone["high"],
-                            "low": range_zone["low"],
-                            "mid": range_zone["mid"],
-                            "premium": range_zone["premium"],
-                            "discount": range_zone["discount"],
-                            "time": datetime.fromtimestamp(range_zone["time"]).isoformat(),
-                            "confidence": 0.7
-                        })
-
-                    # Trap Detection
-                    traps = detect_trap(market_data)
-                    evidence["trap"] = len(traps) > 0 if traps else False
-                    if traps:
-                        for trap_event in traps if isinstance(traps, list) else [traps]:
-                            signals.append({
-                                "type": "trap",
-                                "details": trap_event,
-                                "confidence": 0.7
-                            })
-
-                    # Add some additional evidence based on market conditions
-                    evidence["orderflow"] = random.random() > 0.7  # Volume analysis (simplified)
-
-                    print(f"ICT Evidence: {evidence}")
-                except Exception as e:
-                    print(f"Error running ICT detectors: {e}")
-                    evidence = get_realistic_confluence(symbol, current_time)
-
-                # Calculate confluence
-                confluence = aggregate_confluence(evidence)
-
-                # Analyze market structure
-                market_structure = analyze_market_structure(symbol, market_data)
-                
-                # Adjust confluence based on market structure
-                structure_multiplier = {
-                    "strong": 1.2,
-                    "weak": 0.8,
-                    "neutral": 1.0
-                }.get(market_structure.get("structure_quality", "neutral"), 1.0)
-                
-                confluence["score"] = min(100, int(confluence["score"] * structure_multiplier))
-                confluence["market_structure"] = market_structure
-                
-                # Generate confluence zones based on detected signals
-                if confluence["score"] > 30:  # High confluence threshold
-                    zone_height = current_price * 0.002
-                    confluence_zones.append({
-                        "type": "confluence_zone",
-                        "high": current_price + zone_height,
-                        "low": current_price - zone_height,
-                        "start_time": current_time.isoformat(),
-                        "end_time": (current_time + timedelta(hours=2)).isoformat(),
-                        "score": confluence["score"],
-                        "tags": confluence["tags"],
-                        "strength": "high" if confluence["score"] > 70 else "medium" if confluence["score"] > 50 else "low"
-                    })
-                
-            else:
-                # Fallback when ICT detectors not available
-                if get_realistic_confluence:
-                    evidence = get_realistic_confluence(symbol, current_time)
-                    confluence = aggregate_confluence(evidence)
-                    market_structure = analyze_market_structure(symbol)
-                else:
-                    evidence = {}
-                    confluence = {"score": 0, "tags": []}
-                    market_structure = {"trend": "neutral"}
-            
-            # Send real-time confluence data
-            response = {
-                "timestamp": current_time.isoformat(),
-                "symbol": symbol,
-                "interval": interval,
-                "current_price": round(current_price, 5),
-                "confluence": {
-                    "score": confluence["score"],
-                    "tags": confluence["tags"],
-                    "bias": confluence.get("market_structure", {}).get("trend", "neutral") if hasattr(confluence, 'get') else "neutral",
-                    "strength": "high" if confluence["score"] > 70 else "medium" if confluence["score"] > 50 else "low"
-                },
-                "evidence": evidence,
-                "signals": signals,
-                "confluence_zones": confluence_zones,
-                "market_structure": market_structure if 'market_structure' in locals() else {},
-                "real_time": True,
-                "detectors_used": "ICT_MODULES" if detectors_available else "SIMULATED"
-            }
-            
-            await websocket.send_json(response)
-            await asyncio.sleep(5)  # Update every 5 seconds for real ICT analysis
-            
+        try:
+            # Canonical names, so "1h", "1H" and "60m" share one topic and one pipeline state
+            symbol = normalize_symbol(qp.get("symbol", "EURUSD"))
+            interval = canonical_interval(qp.get("interval", "5m"))
+            await run_blocking(candle_store.series, symbol, interval)
+        except ValueError:
+            await websocket.close(code=1008)
+            return
+
+        # One computation per symbol/interval, fanned out to every subscriber
+        key = broadcast_hub.topic_key("confluence", symbol, interval)
+        await broadcast_hub.serve(key, websocket, lambda: confluence_feed(symbol, interval))
+        logger.info("confluence client disconnected", extra=fields(symbol=symbol, interval=interval))
     except WebSocketDisconnect:
-        print(f"Client disconnected from confluence stream")
-        pass
-    except Exception as e:
-        print(f"Error in confluence websocket: {e}")
-        pass
+        logger.info("confluence client disconnected", extra=fields(symbol=symbol, interval=interval))
+    except Exception:
+        logger.exception("confluence websocket error")
 
 # --------------------
 # Static mounts
@@ -1081,266 +812,185 @@ if os.path.exists("/mnt/data"):
 # Simple demo data for charts
 # --------------------
 
-def generate_demo_data(symbol: str, interval: str, limit: int = 200):
-    candles = []
-    now = int(time.time())
-    base = 100.0
-    for i in range(limit):
-        t = now - (limit - i) * 60
-        o = base + random.uniform(-1, 1)
-        h = o + random.uniform(0, 1)
-        l = o - random.uniform(0, 1)
-        c = l + (h - l) * random.random()
-        candles.append({"time": t, "open": o, "high": h, "low": l, "close": c})
-        base = c
-    return {"symbol": symbol, "interval": interval, "candles": candles}
+def query_candles(series, limit: int, start: Optional[int] = None, end: Optional[int] = None,
+                  before: Optional[int] = None):
+    """(columns, cursor fields) for a limit / start / end (inclusive) / before (exclusive) page.
+
+    `next_before` fetches the page of older bars; `next_start` is set when a forward page
+    from `start` was cut off by `limit`, which is capped at the series' `max_page`.
+    """
+    limit = min(limit, series.max_page)
+    stop = None if end is None else end + 1
+    if before is not None:
+        stop = before if stop is None else min(stop, before)
+    columns = series.query(start, stop, limit)
+    times = columns["time"]
+    cursors = {"next_before": int(times[0]) if len(times) else None}
+    if start is not None:
+        cursors["next_start"] = int(times[-1]) + 1 if len(times) and len(times) >= limit else None
+    return columns, cursors
+
+def generate_demo_data(symbol: str, interval: str, limit: int = 200, start: Optional[int] = None,
+                       end: Optional[int] = None, before: Optional[int] = None):
+    columns, cursors = query_candles(candle_store.series(symbol, interval), limit, start, end, before)
+    return dict({"symbol": symbol, "interval": interval, "candles": columns_to_records(columns)}, **cursors)
 
 @app.get("/market/ohlc")
-async def market_ohlc(symbol: str = "AAPL", interval: str = "1m", limit: int = 200):
-    return generate_demo_data(symbol, interval, limit)
+async def market_ohlc(symbol: str = "AAPL", interval: str = "1m", limit: int = Query(200, ge=1, le=MAX_PAGE_BARS),
+                      start: Optional[int] = None, end: Optional[int] = None, before: Optional[int] = None):
+    try:
+        # Pages beyond the ring are read from history or generated: keep them off the event loop
+        return await run_blocking(generate_demo_data, symbol, interval, limit, start, end, before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def candle_batch(symbol: str, interval: str, columns: dict, fmt: str, **extra):
+    """Candle batch in the given wire format: a JSON-ready dict, or bytes for binary (see candle_codec)."""
+    generated_at = datetime.utcnow().isoformat()
+    if fmt == "binary":
+        return encode_binary(columns, dict(extra, symbol=symbol, interval=interval, generated_at=generated_at))
+    payload = {
+        "success": True,
+        "symbol": symbol,
+        "interval": interval,
+        "candles": encode_json(columns, fmt),
+        "total": len(columns["time"]),
+        "generated_at": generated_at
+    }
+    if fmt == "columns":
+        payload["columns"] = list(COLUMNS)
+    payload.update(extra)
+    return payload
+
+def candle_page(series, symbol: str, interval: str, limit: int, fmt: str, start: Optional[int] = None,
+                end: Optional[int] = None, before: Optional[int] = None):
+    """One encoded page of candles (blocking: may read history or generate bars)."""
+    columns, cursors = query_candles(series, limit, start, end, before)
+    return candle_batch(symbol, interval, columns, fmt, **cursors)
+
+async def candle_response(request: Request, symbol: str, interval: str, limit: int, fmt: Optional[str],
+                          start: Optional[int] = None, end: Optional[int] = None, before: Optional[int] = None):
+    try:
+        fmt = negotiate_format(fmt, request.headers.get("accept"))
+        # A new symbol's first lookup may read its history tail
+        series = await run_blocking(candle_store.series, symbol, interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Served from the shared base series, aggregated for higher timeframes; pages are
+    # binary searches over the stored timestamps, but ones older than the ring are read
+    # from history or generated, so build and encode them off the event loop
+    batch = await run_blocking(candle_page, series, symbol, interval, limit, fmt, start, end, before)
+    if fmt == "binary":
+        return Response(content=batch, media_type=BINARY_MEDIA_TYPE)
+    # Plain lists/dicts of JSON scalars: skip jsonable_encoder
+    return JSONResponse(content=batch)
 
 @app.get("/candles")
-async def get_candles(symbol: str = "EURUSD", interval: str = "1H", limit: int = 200):
+async def get_candles(
+    request: Request,
+    symbol: str = "EURUSD",
+    interval: str = "1H",
+    limit: int = Query(200, ge=1, le=MAX_PAGE_BARS),
+    fmt: Optional[str] = Query(None, alias="format", description="objects | columns | binary"),
+    start: Optional[int] = Query(None, description="unix seconds; bars opening at or after"),
+    end: Optional[int] = Query(None, description="unix seconds; bars opening at or before"),
+    before: Optional[int] = Query(None, description="unix seconds; page cursor, bars opening before"),
+):
     """
     Enhanced candles endpoint for GANN chart loading
     Returns OHLCV data compatible with LightweightCharts
+    Scroll back with before=<next_before>; start/end select an explicit time range
     """
-    print(f"[DEBUG] /candles called with symbol={symbol}, interval={interval}, limit={limit}")
-    candles = []
-    now = int(time.time())
-    
-    # Set realistic base price based on symbol
-    if "EURUSD" in symbol.upper():
-        base = 1.0875
-        volatility = 0.002
-    elif "GBPUSD" in symbol.upper():
-        base = 1.2640
-        volatility = 0.003
-    elif "XAUUSD" in symbol.upper() or "GOLD" in symbol.upper():
-        base = 2000.0
-        volatility = 10.0
-    elif "BTC" in symbol.upper():
-        base = 65000.0
-        volatility = 500.0
-    else:
-        base = 100.0
-        volatility = 1.0
-    
-    # Generate realistic OHLC data with proper time intervals
-    interval_seconds = 3600  # 1 hour default
-    if interval == "5m":
-        interval_seconds = 300
-    elif interval == "15m":
-        interval_seconds = 900
-    elif interval == "1H":
-        interval_seconds = 3600
-    elif interval == "4H":
-        interval_seconds = 14400
-    elif interval == "1D":
-        interval_seconds = 86400
-    
-    for i in range(limit):
-        t = now - (limit - i) * interval_seconds
-        
-        # Add some trend and realistic price movement
-        trend_factor = random.uniform(-0.0001, 0.0001)
-        o = base + random.uniform(-volatility, volatility)
-        
-        # Ensure realistic OHLC relationships
-        high_range = random.uniform(0, volatility * 0.8)
-        low_range = random.uniform(0, volatility * 0.8)
-        
-        h = o + high_range
-        l = o - low_range
-        c = l + (h - l) * random.uniform(0.2, 0.8)  # Close within HL range
-        
-        # Add volume (for completeness)
-        volume = random.randint(1000, 10000)
-        
-        candles.append({
-            "time": t,
-            "open": round(o, 5),
-            "high": round(h, 5),
-            "low": round(l, 5),
-            "close": round(c, 5),
-            "volume": volume
-        })
-        
-        base = c + trend_factor  # Slight trend continuation
-    
-    print(f"[DEBUG] /candles generated {len(candles)} candles")
-    return {
-        "success": True,
-        "symbol": symbol,
-        "interval": interval,
-        "candles": candles,
-        "total": len(candles),
-        "generated_at": datetime.utcnow().isoformat()
-    }
+    log_sampled(logger, logging.DEBUG, "/candles", "candles request", symbol=symbol, interval=interval, limit=limit)
+    return await candle_response(request, symbol, interval, limit, fmt, start, end, before)
 
 # --------------------
 # ICT WebSocket endpoint for live candle updates (now correctly placed)
 # --------------------
+# Cadence of forming-bar updates on /ict/ws
+ICT_WS_TICK_SECONDS = float(os.getenv("ICT_WS_TICK_SECONDS", "0.5"))
+
+async def bar_feed(symbol: str, interval: str):
+    """Push the forming bar at sub-second cadence; bars opened since the last tick go first"""
+    series = await run_blocking(candle_store.series, symbol, interval)
+    last_time = None
+    while True:
+        # A tick that closes a bar appends it to the on-disk history (flush + fsync of its
+        # metadata), so it runs in the executor rather than stalling every other socket
+        for bar in await run_blocking(series.tick, since=last_time):
+            yield {"bar": bar}
+            last_time = bar["time"]
+        await asyncio.sleep(ICT_WS_TICK_SECONDS)
+
 @app.websocket("/ict/ws")
-async def ict_ws(websocket: WebSocket, symbol: str = "EURUSD", interval: str = "1H", limit: int = 200):
+async def ict_ws(
+    websocket: WebSocket,
+    symbol: str = "EURUSD",
+    interval: str = "1H",
+    limit: int = Query(200, ge=1, le=MAX_PAGE_BARS),
+    fmt: Optional[str] = Query(None, alias="format"),
+    since: Optional[int] = None,
+    epoch: Optional[str] = None,
+):
     """
     WebSocket endpoint that streams live candle updates for the given symbol/interval.
-    Sends the same format as /ict/candles, one candle at a time (simulated live).
+    Sends the same format as /ict/candles, then {"seq", "bar"} updates of the forming bar.
+    The initial batch honours `format` (binary arrives as one bytes frame); live bars are JSON.
+    Reconnecting with since=<last seq>&epoch=<epoch> replays only the missed updates after a
+    {"resumed": true} frame; if they are no longer buffered a fresh batch is sent instead.
     """
+    try:
+        fmt = negotiate_format(fmt)
+        # Canonical names, so every spelling of a bar length shares one sequenced topic
+        symbol, interval = normalize_symbol(symbol), canonical_interval(interval)
+        series = await run_blocking(candle_store.series, symbol, interval)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
     await websocket.accept()
     try:
-        now = int(time.time())
-        # Candle generation logic (same as /ict/candles)
-        if "EURUSD" in symbol.upper():
-            base = 1.0875
-            volatility = 0.002
-        elif "GBPUSD" in symbol.upper():
-            base = 1.2640
-            volatility = 0.003
-        elif "XAUUSD" in symbol.upper() or "GOLD" in symbol.upper():
-            base = 2000.0
-            volatility = 10.0
-        elif "BTC" in symbol.upper():
-            base = 65000.0
-            volatility = 500.0
-        else:
-            base = 100.0
-            volatility = 1.0
-        interval_seconds = 3600
-        if interval == "5m":
-            interval_seconds = 300
-        elif interval == "15m":
-            interval_seconds = 900
-        elif interval == "1H":
-            interval_seconds = 3600
-        elif interval == "4H":
-            interval_seconds = 14400
-        elif interval == "1D":
-            interval_seconds = 86400
-        # Generate initial candles
-        candles = []
-        for i in range(limit):
-            t = now - (limit - i) * interval_seconds
-            trend_factor = random.uniform(-0.0001, 0.0001)
-            o = base + random.uniform(-volatility, volatility)
-            high_range = random.uniform(0, volatility * 0.8)
-            low_range = random.uniform(0, volatility * 0.8)
-            h = o + high_range
-            l = o - low_range
-            c = l + (h - l) * random.uniform(0.2, 0.8)
-            volume = random.randint(1000, 10000)
-            candles.append({
-                "time": t,
-                "open": round(o, 5),
-                "high": round(h, 5),
-                "low": round(l, 5),
-                "close": round(c, 5),
-                "volume": volume
-            })
-            base = c + trend_factor
-        # Send initial candles as a batch
-        await websocket.send_json({
-            "success": True,
-            "symbol": symbol,
-            "interval": interval,
-            "candles": candles,
-            "total": len(candles),
-            "generated_at": datetime.utcnow().isoformat()
-        })
-        # Simulate live updates every interval
-        while True:
-            await asyncio.sleep(interval_seconds)
-            t = int(time.time())
-            trend_factor = random.uniform(-0.0001, 0.0001)
-            o = base + random.uniform(-volatility, volatility)
-            high_range = random.uniform(0, volatility * 0.8)
-            low_range = random.uniform(0, volatility * 0.8)
-            h = o + high_range
-            l = o - low_range
-            c = l + (h - l) * random.uniform(0.2, 0.8)
-            volume = random.randint(1000, 10000)
-            bar = {
-                "time": t,
-                "open": round(o, 5),
-                "high": round(h, 5),
-                "low": round(l, 5),
-                "close": round(c, 5),
-                "volume": volume
-            }
-            await websocket.send_json({"bar": bar})
-            base = c + trend_factor
+        async def send_snapshot(seq, topic_epoch):
+            # Initial candles as a batch, current as of `seq`
+            columns = await run_blocking(series.tail, limit)
+            with SERIALIZE_SECONDS.labels("ict_ws_snapshot").time():
+                batch = candle_batch(symbol, interval, columns, fmt, seq=seq, epoch=topic_epoch)
+            with SEND_SECONDS.labels("ict_ws_snapshot").time():
+                if fmt == "binary":
+                    await websocket.send_bytes(batch)
+                else:
+                    await websocket.send_json(batch)
+
+        # Live bars come from one shared, sequenced feed per symbol/interval
+        key = broadcast_hub.topic_key("ict_ws", symbol, interval)
+        await broadcast_hub.serve_sequenced(
+            key, websocket, lambda: bar_feed(symbol, interval), send_snapshot, since=since, epoch=epoch
+        )
+        logger.info("ict_ws client disconnected", extra=fields(symbol=symbol, interval=interval))
     except WebSocketDisconnect:
-        print(f"[INFO] WebSocket client disconnected: {symbol} {interval}")
-    except Exception as e:
-        print(f"[ERROR] WebSocket error: {e}")
+        logger.info("ict_ws client disconnected", extra=fields(symbol=symbol, interval=interval))
+    except Exception:
+        logger.exception("ict_ws error", extra=fields(symbol=symbol, interval=interval))
 
 # --------------------
 # ICT candles endpoint (LightweightCharts compatible)
 # --------------------
 @app.get("/ict/candles")
-async def ict_candles(symbol: str = "EURUSD", interval: str = "1H", limit: int = 200):
+async def ict_candles(
+    request: Request,
+    symbol: str = "EURUSD",
+    interval: str = "1H",
+    limit: int = Query(200, ge=1, le=MAX_PAGE_BARS),
+    fmt: Optional[str] = Query(None, alias="format", description="objects | columns | binary"),
+    start: Optional[int] = Query(None, description="unix seconds; bars opening at or after"),
+    end: Optional[int] = Query(None, description="unix seconds; bars opening at or before"),
+    before: Optional[int] = Query(None, description="unix seconds; page cursor, bars opening before"),
+):
     """
     Returns OHLCV data compatible with LightweightCharts for ICT chart panel
+    Scroll back with before=<next_before>; start/end select an explicit time range
     """
-    print(f"[DEBUG] /ict/candles called with symbol={symbol}, interval={interval}, limit={limit}")
-    candles = []
-    now = int(time.time())
-    # Set realistic base price based on symbol
-    if "EURUSD" in symbol.upper():
-        base = 1.0875
-        volatility = 0.002
-    elif "GBPUSD" in symbol.upper():
-        base = 1.2640
-        volatility = 0.003
-    elif "XAUUSD" in symbol.upper() or "GOLD" in symbol.upper():
-        base = 2000.0
-        volatility = 10.0
-    elif "BTC" in symbol.upper():
-        base = 65000.0
-        volatility = 500.0
-    else:
-        base = 100.0
-        volatility = 1.0
-    # Generate realistic OHLC data with proper time intervals
-    interval_seconds = 3600  # 1 hour default
-    if interval == "5m":
-        interval_seconds = 300
-    elif interval == "15m":
-        interval_seconds = 900
-    elif interval == "1H":
-        interval_seconds = 3600
-    elif interval == "4H":
-        interval_seconds = 14400
-    elif interval == "1D":
-        interval_seconds = 86400
-    for i in range(limit):
-        t = now - (limit - i) * interval_seconds
-        trend_factor = random.uniform(-0.0001, 0.0001)
-        o = base + random.uniform(-volatility, volatility)
-        high_range = random.uniform(0, volatility * 0.8)
-        low_range = random.uniform(0, volatility * 0.8)
-        h = o + high_range
-        l = o - low_range
-        c = l + (h - l) * random.uniform(0.2, 0.8)
-        volume = random.randint(1000, 10000)
-        candles.append({
-            "time": t,
-            "open": round(o, 5),
-            "high": round(h, 5),
-            "low": round(l, 5),
-            "close": round(c, 5),
-            "volume": volume
-        })
-        base = c + trend_factor
-    print(f"[DEBUG] /ict/candles generated {len(candles)} candles")
-    return {
-        "success": True,
-        "symbol": symbol,
-        "interval": interval,
-        "candles": candles,
-        "total": len(candles),
-        "generated_at": datetime.utcnow().isoformat()
-    }
+    log_sampled(logger, logging.DEBUG, "/ict/candles", "candles request", symbol=symbol, interval=interval, limit=limit)
+    return await candle_response(request, symbol, interval, limit, fmt, start, end, before)
 
 
 if __name__ == "__main__":
@@ -1348,6 +998,6 @@ if __name__ == "__main__":
     try:
         import uvicorn
         uvicorn.run(app, host="0.0.0.0", port=8081, reload=False)
-    except Exception as e:
-        print(f"Failed to start server: {e}")
+    except Exception:
+        logger.exception("failed to start server")
         sys.exit(1)
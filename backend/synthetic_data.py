@@ -0,0 +1,171 @@
+"""
+synthetic_data.py
+- Deterministic synthetic OHLCV engine behind the candle store.
+- Bars are generated in fixed blocks ("epochs") of BLOCK_BARS bars; each block is seeded
+  from a stable hash of (symbol, bar seconds, block index), so any time range yields the
+  same bars in every process and run, independent of what was generated before.
+- Inside a block prices follow a random walk pinned (Brownian bridge) to seeded levels at
+  the block boundaries, so consecutive blocks join up without chaining through history.
+  Boundary levels sum seeded noise at several time scales, so longer horizons still trend.
+- Regimes set volatility, trend and gap behaviour; "mixed" draws one per block.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+# Realistic base price / volatility per hour per symbol family: (markers, base, volatility)
+SYMBOL_PROFILES = [
+    (("EURUSD",), 1.0875, 0.002),
+    (("GBPUSD",), 1.2640, 0.003),
+    (("XAUUSD", "GOLD"), 2000.0, 10.0),
+    (("BTC",), 65000.0, 500.0),
+]
+DEFAULT_PROFILE = (100.0, 1.0)
+# Bar length the profile volatilities refer to; other lengths scale by sqrt(time)
+PROFILE_SECONDS = 3600
+
+# Regime parameters:
+#   vol_scale  multiplier on the symbol volatility
+#   trend      per-bar drift in units of bar volatility (sign drawn per block)
+#   gap_prob   chance that a bar opens away from the previous close
+#   gap_scale  size of such a gap in units of bar volatility
+REGIMES = {
+    "calm": {"vol_scale": 0.5, "trend": 0.0, "gap_prob": 0.0, "gap_scale": 0.0},
+    "normal": {"vol_scale": 1.0, "trend": 0.0, "gap_prob": 0.002, "gap_scale": 3.0},
+    "trending": {"vol_scale": 1.0, "trend": 0.08, "gap_prob": 0.002, "gap_scale": 3.0},
+    "volatile": {"vol_scale": 2.5, "trend": 0.0, "gap_prob": 0.01, "gap_scale": 6.0},
+}
+MIXED_WEIGHTS = {"calm": 0.2, "normal": 0.5, "trending": 0.2, "volatile": 0.1}
+
+BLOCK_BARS = 4096
+DEFAULT_REGIME = os.getenv("SYNTHETIC_REGIME", "normal")
+# Bumping the seed version changes every generated series
+SEED_VERSION = 1
+
+# Spread of block-boundary levels around the base price, in units of block volatility,
+# summed over LEVEL_OCTAVES time scales (1, 2, 4, ... blocks)
+LEVEL_SPREAD = 0.5
+LEVEL_OCTAVES = 10
+PRICE_DECIMALS = 5
+
+
+def symbol_profile(symbol: str):
+    """Return (base_price, hourly volatility) for a symbol."""
+    s = symbol.upper()
+    for markers, base, volatility in SYMBOL_PROFILES:
+        if any(m in s for m in markers):
+            return base, volatility
+    return DEFAULT_PROFILE
+
+
+def stable_seed(*parts) -> int:
+    """64-bit seed from a hash of the parts (unlike hash(), stable across processes)."""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class SyntheticMarket:
+    """Seeded bar generator for one (symbol, bar length)."""
+
+    def __init__(self, symbol: str, step: int, base: float = None, volatility: float = None,
+                 regime: str = DEFAULT_REGIME, seed: int = SEED_VERSION):
+        if regime != "mixed" and regime not in REGIMES:
+            raise ValueError(f"unknown regime '{regime}'")
+        profile_base, profile_vol = symbol_profile(symbol)
+        self.symbol = symbol.upper()
+        self.step = int(step)
+        self.base = profile_base if base is None else float(base)
+        if volatility is None:
+            volatility = profile_vol * np.sqrt(self.step / PROFILE_SECONDS)
+        self.volatility = float(volatility)
+        self.regime = regime
+        self.seed = seed
+        # Volatility per bar as a log return
+        self.sigma = self.volatility / self.base
+        self._block_sigma = self.sigma * np.sqrt(BLOCK_BARS)
+        self._noise_cache = {}
+
+    def _rng(self, *parts):
+        return np.random.default_rng(stable_seed(self.seed, self.symbol, self.step, *parts))
+
+    def _noise(self, octave: int, cell: int) -> float:
+        key = (octave, cell)
+        value = self._noise_cache.get(key)
+        if value is None:
+            if len(self._noise_cache) > 4096:
+                self._noise_cache.clear()
+            value = self._noise_cache[key] = float(self._rng("level", octave, cell).standard_normal())
+        return value
+
+    def _level(self, block: int) -> float:
+        """Log-price offset from base at the start of `block`.
+
+        Sum of value noise at spans of 1, 2, 4, ... blocks, each interpolated linearly and
+        weighted by sqrt(span) like a random walk, so the level wanders but stays bounded.
+        """
+        total = 0.0
+        for octave in range(LEVEL_OCTAVES):
+            span = 1 << octave
+            cell, offset = divmod(block, span)
+            a, b = self._noise(octave, cell), self._noise(octave, cell + 1)
+            total += (a + (b - a) * offset / span) * np.sqrt(span)
+        return total * self._block_sigma * LEVEL_SPREAD / np.sqrt(2 ** LEVEL_OCTAVES)
+
+    def _regime(self, rng) -> dict:
+        if self.regime != "mixed":
+            return REGIMES[self.regime]
+        names = list(MIXED_WEIGHTS)
+        return REGIMES[names[rng.choice(len(names), p=list(MIXED_WEIGHTS.values()))]]
+
+    def _block(self, block: int) -> dict:
+        """All BLOCK_BARS bars of one block as log-price and volume arrays."""
+        rng = self._rng("block", block)
+        regime = self._regime(rng)
+        sigma = self.sigma * regime["vol_scale"]
+        n = BLOCK_BARS
+
+        drift = regime["trend"] * sigma * (1.0 if rng.random() < 0.5 else -1.0)
+        gaps = np.where(rng.random(n) < regime["gap_prob"], rng.normal(0.0, regime["gap_scale"] * sigma, n), 0.0)
+        moves = rng.normal(drift, sigma, n)
+
+        # Random walk of closes, bridged so the block ends on the next block's start level
+        start, end = self._level(block), self._level(block + 1)
+        walk = np.cumsum(gaps + moves)
+        walk -= np.arange(1, n + 1) / n * (walk[-1] - (end - start))
+        close = start + walk
+        prev_close = np.concatenate([[start], close[:-1]])
+        open_ = prev_close + gaps
+
+        wick = np.abs(rng.normal(0.0, 0.5 * sigma, (2, n)))
+        high = np.maximum(open_, close) + wick[0]
+        low = np.minimum(open_, close) - wick[1]
+        volume = 1000.0 * np.exp(rng.normal(1.0, 0.4, n)) * (1.0 + np.abs(moves) / sigma)
+        return {"open": open_, "high": high, "low": low, "close": close, "volume": volume}
+
+    def bars(self, start_time: int, count: int) -> dict:
+        """`count` consecutive bars opening at `start_time` (aligned to the bar length)."""
+        count = max(0, int(count))
+        first = int(start_time) // self.step
+        index = first + np.arange(count, dtype=np.int64)
+        out = {
+            "time": index * self.step,
+            "open": np.empty(count),
+            "high": np.empty(count),
+            "low": np.empty(count),
+            "close": np.empty(count),
+            "volume": np.empty(count),
+        }
+        pos = 0
+        while pos < count:
+            block, offset = divmod(int(index[pos]), BLOCK_BARS)
+            take = min(BLOCK_BARS - offset, count - pos)
+            generated = self._block(block)
+            for name, values in generated.items():
+                out[name][pos:pos + take] = values[offset:offset + take]
+            pos += take
+
+        for name in ("open", "high", "low", "close"):
+            out[name] = np.round(self.base * np.exp(out[name]), PRICE_DECIMALS)
+        out["volume"] = out["volume"].astype(np.int64)
+        return out
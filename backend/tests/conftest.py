@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Backend modules import each other by bare name, as server.py arranges at startup
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
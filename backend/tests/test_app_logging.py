@@ -0,0 +1,63 @@
+import json
+import logging
+
+import app_logging
+from app_logging import JsonFormatter, TextFormatter, _QueueHandler, fields, log_sampled
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def logger(level=logging.INFO):
+    log = logging.Logger("astroquant.test", level)
+    handler = Records()
+    log.addHandler(handler)
+    return log, handler.records
+
+
+def record(msg, *args, exc_info=None, **values):
+    rec = logging.LogRecord("astroquant.test", logging.WARNING, __file__, 1, msg, args, exc_info)
+    rec.fields = values
+    return rec
+
+
+def test_log_sampled_logs_every_nth_occurrence_per_key(monkeypatch):
+    monkeypatch.setattr(app_logging, "_sample_counts", {})
+    log, records = logger()
+    for _ in range(7):
+        log_sampled(log, logging.INFO, "ticks", "tick", every=3, symbol="EURUSD")
+    log_sampled(log, logging.INFO, "other", "other", every=3)
+    assert [r.fields for r in records if r.msg == "tick"] == [
+        {"sample_every": 3, "occurrences": n, "symbol": "EURUSD"} for n in (1, 4, 7)]
+    assert [r.fields["occurrences"] for r in records if r.msg == "other"] == [1]
+
+
+def test_log_sampled_skips_disabled_levels(monkeypatch):
+    monkeypatch.setattr(app_logging, "_sample_counts", {})
+    log, records = logger(logging.WARNING)
+    log_sampled(log, logging.DEBUG, "ticks", "tick", every=1)
+    assert records == [] and app_logging._sample_counts == {}
+
+
+def test_json_formatter_merges_fields():
+    entry = json.loads(JsonFormatter().format(record("bars for %s", "EURUSD", **fields(count=3)["fields"])))
+    assert entry["msg"] == "bars for EURUSD" and entry["level"] == "WARNING" and entry["logger"] == "astroquant.test"
+    assert entry["count"] == 3 and entry["ts"].endswith("+00:00")
+
+
+def test_queued_records_carry_the_rendered_message_and_traceback():
+    try:
+        raise ValueError("boom")
+    except ValueError as exc:
+        queued = _QueueHandler(None).prepare(record("failed %d", 2, exc_info=(type(exc), exc, exc.__traceback__),
+                                                    symbol="EURUSD"))
+    assert queued.msg == "failed 2" and queued.args is None and queued.exc_info is None
+    entry = json.loads(JsonFormatter().format(queued))
+    assert entry["symbol"] == "EURUSD" and "ValueError: boom" in entry["exc"]
+    assert TextFormatter().format(queued).splitlines()[0].endswith("failed 2 symbol=EURUSD")
@@ -0,0 +1,223 @@
+import asyncio
+import json
+
+import pytest
+
+from broadcast_hub import BroadcastHub
+
+
+class FakeWebSocket:
+    """Records sent frames; receive() blocks until disconnect() is called."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+        self._incoming = asyncio.Queue()
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def receive(self):
+        return await self._incoming.get()
+
+    async def close(self, code=1000):
+        self.closed = code
+
+    def disconnect(self):
+        self._incoming.put_nowait({"type": "websocket.disconnect"})
+
+
+def counting_feed(starts, interval=0.01):
+    """Producer factory; `starts` counts how many producers were started."""
+
+    def producer():
+        starts.append(1)
+
+        async def gen():
+            n = 0
+            while True:
+                n += 1
+                yield {"n": n}
+                await asyncio.sleep(interval)
+
+        return gen()
+
+    return producer
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_topic_key_is_canonical():
+    key = BroadcastHub.topic_key
+    assert key("ict_ws", "eurusd", "1h") == key("ict_ws", "EURUSD", "60m") == ("ict_ws", "EURUSD", "1H")
+    with pytest.raises(ValueError):
+        key("ict_ws", "../x", "1m")
+    with pytest.raises(ValueError):
+        key("ict_ws", "EURUSD", "1x")
+
+
+def test_subscribers_share_one_producer_and_identical_frames():
+    async def scenario():
+        hub, starts = BroadcastHub(), []
+        key = hub.topic_key("confluence", "EURUSD", "5m")
+        a, b = FakeWebSocket(), FakeWebSocket()
+        tasks = [asyncio.create_task(hub.serve(key, ws, counting_feed(starts))) for ws in (a, b)]
+        await asyncio.sleep(0.05)
+        assert hub.subscriber_count(key) == 2
+        a.disconnect()
+        b.disconnect()
+        await asyncio.gather(*tasks)
+        return hub, key, starts, a, b
+
+    hub, key, starts, a, b = run(scenario())
+    assert len(starts) == 1
+    # Both see one gapless stream of the same frames (b may join one frame late)
+    seen_a, seen_b = [f["n"] for f in a.sent], [f["n"] for f in b.sent]
+    assert seen_b and seen_b == list(range(seen_b[0], seen_b[-1] + 1))
+    assert set(seen_b) <= set(seen_a)
+    assert hub.subscriber_count(key) == 0 and key not in hub._topics
+
+
+def test_producer_restarts_after_last_subscriber_leaves():
+    async def scenario():
+        hub, starts = BroadcastHub(), []
+        key = hub.topic_key("signals", "XAUUSD", "5m")
+        for _ in range(2):
+            ws = FakeWebSocket()
+            task = asyncio.create_task(hub.serve(key, ws, counting_feed(starts)))
+            await asyncio.sleep(0.02)
+            ws.disconnect()
+            await task
+        return starts
+
+    assert len(run(scenario())) == 2
+
+
+def test_slow_subscriber_is_dropped_without_stalling_the_topic():
+    class StuckWebSocket(FakeWebSocket):
+        async def send_text(self, text):
+            await asyncio.sleep(10)
+
+    async def scenario():
+        hub, starts = BroadcastHub(send_timeout=0.05), []
+        key = hub.topic_key("confluence", "EURUSD", "5m")
+        fast, stuck = FakeWebSocket(), StuckWebSocket()
+        tasks = [asyncio.create_task(hub.serve(key, ws, counting_feed(starts))) for ws in (fast, stuck)]
+        await asyncio.sleep(0.2)
+        assert stuck not in hub._topics[key].subscribers
+        fast.disconnect()
+        stuck.disconnect()
+        await asyncio.gather(*tasks)
+        return fast, stuck
+
+    fast, stuck = run(scenario())
+    assert len(fast.sent) > 5 and stuck.closed == 1011
+
+
+class SequencedClient:
+    """One /ict/ws-style connection: records its snapshot call and frames."""
+
+    def __init__(self, hub, key, starts, since=None, epoch=None, replay=64):
+        self.ws = FakeWebSocket()
+        self.snapshots = []
+
+        async def send_snapshot(seq, epoch):
+            self.snapshots.append((seq, epoch))
+            await self.ws.send_text(json.dumps({"snapshot": True, "seq": seq, "epoch": epoch}))
+
+        self.task = asyncio.create_task(
+            hub.serve_sequenced(key, self.ws, counting_feed(starts), send_snapshot, since=since, epoch=epoch,
+                                replay=replay)
+        )
+
+    async def leave(self):
+        self.ws.disconnect()
+        await self.task
+
+    @property
+    def seqs(self):
+        return [f["seq"] for f in self.ws.sent if "n" in f]
+
+
+def test_sequenced_snapshot_then_gapless_seqs():
+    async def scenario():
+        hub, starts = BroadcastHub(resume_grace=0), []
+        client = SequencedClient(hub, hub.topic_key("ict_ws", "EURUSD", "1m"), starts)
+        await asyncio.sleep(0.1)
+        await client.leave()
+        return client
+
+    client = run(scenario())
+    assert client.ws.sent[0]["snapshot"] is True
+    seqs = client.seqs
+    # Every frame after the snapshot's seq, in order, none missing
+    assert seqs and seqs == list(range(client.snapshots[0][0] + 1, seqs[-1] + 1))
+
+
+def test_resume_within_grace_replays_only_missed_frames():
+    async def scenario():
+        hub, starts = BroadcastHub(resume_grace=1.0), []
+        key = hub.topic_key("ict_ws", "EURUSD", "1m")
+        first = SequencedClient(hub, key, starts)
+        await asyncio.sleep(0.05)
+        await first.leave()
+        last_seq, epoch = first.seqs[-1], first.snapshots[0][1]
+        await asyncio.sleep(0.05)  # frames keep being produced during the grace period
+        second = SequencedClient(hub, key, starts, since=last_seq, epoch=epoch)
+        await asyncio.sleep(0.05)
+        await second.leave()
+        return starts, last_seq, second
+
+    starts, last_seq, second = run(scenario())
+    assert len(starts) == 1
+    assert second.snapshots == []
+    assert second.ws.sent[0] == {"resumed": True, "seq": last_seq, "epoch": second.ws.sent[0]["epoch"]}
+    assert second.seqs[0] == last_seq + 1
+    assert second.seqs == list(range(last_seq + 1, second.seqs[-1] + 1))
+
+
+def test_resume_with_wrong_epoch_or_dropped_topic_gets_a_snapshot():
+    async def scenario():
+        hub, starts = BroadcastHub(resume_grace=0.05), []
+        key = hub.topic_key("ict_ws", "EURUSD", "1m")
+        first = SequencedClient(hub, key, starts)
+        await asyncio.sleep(0.05)
+        last_seq, epoch = first.seqs[-1], first.snapshots[0][1]
+
+        wrong = SequencedClient(hub, key, starts, since=last_seq, epoch="not-the-epoch")
+        await asyncio.sleep(0.03)
+        await wrong.leave()
+        await first.leave()
+
+        await asyncio.sleep(0.15)  # past the grace period: the topic and its buffer are gone
+        dropped = key not in hub._topics
+        late = SequencedClient(hub, key, starts, since=last_seq, epoch=epoch)
+        await asyncio.sleep(0.03)
+        await late.leave()
+        return dropped, wrong, late, epoch, starts
+
+    dropped, wrong, late, epoch, starts = run(scenario())
+    assert dropped
+    assert len(wrong.snapshots) == 1 and "resumed" not in wrong.ws.sent[0]
+    assert len(late.snapshots) == 1 and late.snapshots[0][1] != epoch
+    assert len(starts) == 2
+
+
+def test_resume_older_than_the_replay_buffer_gets_a_snapshot():
+    async def scenario():
+        hub, starts = BroadcastHub(resume_grace=1.0), []
+        key = hub.topic_key("ict_ws", "EURUSD", "1m")
+        first = SequencedClient(hub, key, starts, replay=4)
+        await asyncio.sleep(0.02)
+        since, epoch = first.seqs[0], first.snapshots[0][1]
+        await asyncio.sleep(0.1)  # well over 4 frames later
+        stale = SequencedClient(hub, key, starts, since=since, epoch=epoch, replay=4)
+        await asyncio.sleep(0.02)
+        await stale.leave()
+        await first.leave()
+        return stale
+
+    stale = run(scenario())
+    assert len(stale.snapshots) == 1 and "resumed" not in stale.ws.sent[0]
@@ -0,0 +1,66 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from candle_codec import BINARY_MEDIA_TYPE, decode_binary, encode_binary, encode_json, negotiate_format
+from candle_store import COLUMNS, COLUMN_DTYPES
+
+
+def make_columns(count):
+    rng = np.random.default_rng(7)
+    close = 1.1 + rng.normal(0, 0.001, count).cumsum()
+    return {
+        "time": 1_700_000_000 + 60 * np.arange(count, dtype=np.int64),
+        "open": close + 0.0001,
+        "high": close + 0.0005,
+        "low": close - 0.0005,
+        "close": close,
+        "volume": rng.integers(1, 10_000, count, dtype=np.int64),
+    }
+
+
+@pytest.mark.parametrize("count", [0, 1, 3, 200])
+def test_binary_round_trip(count):
+    columns = make_columns(count)
+    data = encode_binary(columns, {"symbol": "EURUSD", "interval": "1m"})
+
+    header, decoded = decode_binary(data)
+
+    assert header["symbol"] == "EURUSD" and header["interval"] == "1m"
+    assert header["count"] == count
+    assert [name for name, _ in header["columns"]] == list(COLUMNS)
+    for name in COLUMNS:
+        assert decoded[name].dtype == np.dtype(COLUMN_DTYPES[name])
+        np.testing.assert_array_equal(decoded[name], columns[name])
+    assert len(data) == 4 + struct.unpack_from("<I", data)[0] + count * 8 * len(COLUMNS)
+
+
+@pytest.mark.parametrize("symbol", ["A", "AB", "ABC", "EURUSD", "XAUUSD_SPOT"])
+def test_binary_columns_are_8_byte_aligned_little_endian(symbol):
+    columns = make_columns(2)
+    data = encode_binary(columns, {"symbol": symbol, "interval": "1H"})
+    (length,) = struct.unpack_from("<I", data)
+
+    # Header padding makes every column start at a multiple of 8 (typed-array views)
+    assert (4 + length) % 8 == 0
+    assert json.loads(data[4:4 + length])["symbol"] == symbol
+    # First column is time, int64 little-endian
+    assert struct.unpack_from("<q", data, 4 + length)[0] == columns["time"][0]
+
+
+def test_encode_json_formats():
+    columns = make_columns(2)
+    assert encode_json(columns, "columns")[0] == columns["time"].tolist()
+    records = encode_json(columns, "objects")
+    assert records[1]["time"] == int(columns["time"][1]) and set(records[1]) == set(COLUMNS)
+
+
+def test_negotiate_format():
+    assert negotiate_format() == "objects"
+    assert negotiate_format("COLUMNS") == "columns"
+    assert negotiate_format(None, BINARY_MEDIA_TYPE) == "binary"
+    assert negotiate_format("objects", BINARY_MEDIA_TYPE) == "objects"
+    with pytest.raises(ValueError):
+        negotiate_format("xml")
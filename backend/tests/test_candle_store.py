@@ -0,0 +1,120 @@
+import time
+
+import numpy as np
+import pytest
+
+import candle_store
+from candle_store import COLUMNS, CandleStore, aggregate, canonical_interval, interval_seconds
+
+# A fixed "now" half way through a 4H bucket, so no bucket rolls over mid-test
+NOW = 1_760_000_000 - 1_760_000_000 % 14400 + 7200 + 17
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(time, "time", lambda: NOW)
+    return CandleStore(capacity=50, base_capacity=4096)
+
+
+def assert_columns_equal(got, want):
+    for name in COLUMNS:
+        np.testing.assert_array_equal(got[name], want[name], err_msg=name)
+
+
+def test_interval_labels():
+    assert interval_seconds("15min") == 900 and interval_seconds("4h") == 14400
+    assert [canonical_interval(x) for x in ("1m", "05m", "60m", "1h", "1440m", "7d")] == ["1m", "5m", "1H", "1H", "1D", "1W"]
+    for bad in ("", "0m", "1s", "1M", "abc"):
+        with pytest.raises(ValueError):
+            interval_seconds(bad)
+
+
+def test_base_series_is_contiguous_and_deterministic(store):
+    bars = store.series("EURUSD", "1m").query(limit=3000)
+    assert len(bars["time"]) == 3000
+    assert (np.diff(bars["time"]) == 60).all() and bars["time"][-1] == NOW - NOW % 60
+    # A fresh store (another process, a restart) regenerates the same closed bars
+    other = CandleStore(capacity=50, base_capacity=4096).series("EURUSD", "1m").query(limit=3000)
+    assert_columns_equal({k: v[:-1] for k, v in other.items()}, {k: v[:-1] for k, v in bars.items()})
+
+
+@pytest.mark.parametrize("interval", ["5m", "15m", "1H", "4H"])
+def test_higher_timeframe_equals_aggregated_base_bars(store, interval):
+    step = interval_seconds(interval)
+    series = store.series("EURUSD", interval)
+    current = NOW - NOW % step
+    # Closed bars served from the aggregated ring
+    closed = series.query(end=current, limit=40)
+    base = store.base("EURUSD").query(start=int(closed["time"][0]), end=current, limit=10 ** 6)
+    assert_columns_equal(closed, aggregate(base, step))
+    # The forming bar is rebuilt from the base bars of the current bucket
+    forming = series.query(limit=1)
+    base_now = store.base("EURUSD").query(start=current, limit=10 ** 6)
+    assert_columns_equal(forming, aggregate(base_now, step))
+
+
+def test_pages_older_than_the_ring_match_the_cached_aggregation(store):
+    series = store.series("EURUSD", "1H")
+    recent = series.query(end=NOW - NOW % 3600, limit=20)
+    # Beyond the 50-bar ring: aggregated on the fly from generated base bars
+    old = series.query(end=int(recent["time"][0]) - 200 * 3600, limit=20)
+    assert (np.diff(old["time"]) == 3600).all()
+    base = store.base("EURUSD").query(start=int(old["time"][0]), end=int(old["time"][-1]) + 3600, limit=10 ** 6)
+    assert_columns_equal(old, aggregate(base, 3600))
+    # The same range read through the ring path of a store whose ring reaches that far back
+    wide = CandleStore(capacity=400, base_capacity=4096).series("EURUSD", "1H")
+    assert_columns_equal(wide.query(start=int(old["time"][0]), end=int(old["time"][-1]) + 1, limit=20), old)
+
+
+def test_forming_bar_follows_base_ticks(store):
+    base, hourly = store.base("EURUSD"), store.series("EURUSD", "1H")
+    base.tick(now=NOW)
+    base.tick(now=NOW)
+    forming_base, forming_hour = base.query(limit=1), hourly.query(limit=1)
+    assert forming_hour["close"][0] == forming_base["close"][0]
+    assert forming_hour["high"][0] >= forming_base["high"][0]
+
+
+def test_paging_with_before_is_gapless(store):
+    series = store.series("EURUSD", "15m")
+    page = series.query(limit=30)
+    older = series.query(end=int(page["time"][0]), limit=30)
+    times = np.concatenate([older["time"], page["time"]])
+    assert (np.diff(times) == 900).all()
+
+
+def test_page_size_is_capped(store, monkeypatch):
+    monkeypatch.setattr(candle_store, "MAX_PAGE_BARS", 500)
+    assert len(store.series("EURUSD", "1m").query(limit=10 ** 7)["time"]) == 500
+    daily = store.series("EURUSD", "1D")
+    assert len(daily.query(limit=10 ** 7)["time"]) <= daily.max_page <= 500
+    # A start/end span is clamped the same way
+    assert len(store.series("EURUSD", "1m").query(start=0, end=NOW, limit=10 ** 7)["time"]) == 500
+
+
+def test_interval_spellings_share_one_series(store):
+    assert store.series("eurusd", "1h") is store.series("EURUSD", "60m")
+    assert store.series("EURUSD", "1m") is store.base("EURUSD")
+    with pytest.raises(ValueError):
+        store.series("EURUSD", "90s")
+    with pytest.raises(ValueError):
+        store.series("../x", "1m")
+
+
+def test_registry_evicts_idle_symbols_first(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    store = CandleStore(capacity=10, base_capacity=64, max_symbols=3, idle_seconds=60)
+    hourly = store.series("AAA", "1H")
+    store.base("BBB")
+    store.base("CCC")
+    clock[0] += 120
+    hourly.query(limit=1)  # reads and ticks mark a symbol used; BBB and CCC are idle
+    store.base("DDD")
+    assert store.symbols() == ["AAA", "CCC", "DDD"]
+    assert store.series("AAA", "1H") is hourly  # lookups refresh the LRU order
+    # Nothing idle any more: the least recently used goes anyway (hard bound)
+    store.base("CCC").query(limit=1)
+    store.base("EEE")
+    assert store.symbols() == ["AAA", "CCC", "EEE"]
+    assert store.stats() == {"symbols": 3, "max_symbols": 3, "series": 4, "evicted": 2}
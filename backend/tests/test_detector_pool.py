@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+import pytest
+
+from detector_pool import DeadlineExceeded, DetectorPool
+
+KEY = ("confluence", "EURUSD", "1H")
+
+
+@pytest.fixture
+def pool():
+    pool = DetectorPool(workers=2, timeout=5.0)
+    yield pool
+    pool.shutdown()
+
+
+class Gated:
+    """A detector that blocks until released and records the inputs it ran with."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.calls = []
+
+    def __call__(self, version):
+        self.calls.append(version)
+        self.gate.wait(5)
+        return {"version": version}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_same_version_callers_share_one_run(pool):
+    detector = Gated()
+
+    async def main():
+        callers = [asyncio.create_task(pool.run(KEY, detector, 7, version=7)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        detector.gate.set()
+        return await asyncio.gather(*callers)
+
+    assert run(main()) == [{"version": 7}] * 3
+    assert detector.calls == [7]
+    assert pool.stats() == dict(pool.counts, workers=2, inflight=0)
+    assert {k: pool.counts[k] for k in ("submitted", "coalesced", "superseded", "completed")} == {
+        "submitted": 1, "coalesced": 2, "superseded": 0, "completed": 1}
+
+
+def test_newer_version_supersedes_the_run_in_flight(pool):
+    old, new = Gated(), Gated()
+
+    async def main():
+        first = asyncio.create_task(pool.run(KEY, old, 1, version=1))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(pool.run(KEY, new, 2, version=2))
+        # A caller with the newer inputs joins the newer run, never the older one
+        third = asyncio.create_task(pool.run(KEY, new, 2, version=2))
+        await asyncio.sleep(0.05)
+        new.gate.set()
+        results = await asyncio.gather(second, third)
+        old.gate.set()
+        return results + [await first]
+
+    assert run(main()) == [{"version": 2}, {"version": 2}, {"version": 1}]
+    assert old.calls == [1] and new.calls == [2]
+    assert pool.counts["submitted"] == 2 and pool.counts["superseded"] == 1 and pool.counts["coalesced"] == 1
+    assert pool.counts["completed"] == 2 and pool.stats()["inflight"] == 0
+
+
+def test_other_keys_run_independently(pool):
+    detector = Gated()
+    detector.gate.set()
+
+    async def main():
+        return await asyncio.gather(pool.run(KEY, detector, 1, version=1),
+                                    pool.run(("confluence", "GBPUSD", "1H"), detector, 1, version=1))
+
+    assert run(main()) == [{"version": 1}] * 2
+    assert pool.counts["submitted"] == 2 and pool.counts["coalesced"] == 0
+
+
+def test_deadline_and_stale_results_from_a_timed_out_run(pool):
+    detector = Gated()
+
+    async def main():
+        with pytest.raises(DeadlineExceeded, match="confluence/EURUSD/1H"):
+            await pool.run(KEY, detector, 3, version=3, timeout=0.05)
+        # The run keeps going; a caller with the same inputs joins it instead of resubmitting
+        joiner = asyncio.create_task(pool.run(KEY, detector, 3, version=3))
+        await asyncio.sleep(0.05)
+        detector.gate.set()
+        stale = await joiner
+        # Once it finished, the next tick gets a fresh run
+        fresh = await pool.run(KEY, detector, 3, version=3)
+        return stale, fresh
+
+    stale, fresh = run(main())
+    assert stale == {"version": 3, "stale": True} and fresh == {"version": 3}
+    assert detector.calls == [3, 3]
+    assert pool.counts["deadline_exceeded"] == 1 and pool.counts["stale"] == 1
+    assert pool.counts["submitted"] == 2 and pool.counts["coalesced"] == 1
+
+
+def test_failures_are_counted_and_raised(pool):
+    def broken():
+        raise RuntimeError("detector crashed")
+
+    async def main():
+        with pytest.raises(RuntimeError, match="detector crashed"):
+            await pool.run(KEY, broken, version=1)
+        await asyncio.sleep(0)
+
+    run(main())
+    assert pool.counts["failed"] == 1 and pool.counts["completed"] == 0
+    assert pool.stats()["inflight"] == 0
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import astro_routes
+from astro_routes import EphemerisCache
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    """Horizons passed to the ephemeris engine, which returns `days` rows of fake arrays."""
+    calls = []
+
+    def get_ephemeris_arrays(days, lat, lon, time_utc=None):
+        calls.append(days)
+        return {"dates": [f"day-{i}" for i in range(days)], "lon": np.arange(days * 2.0).reshape(days, 2),
+                "period_days": days}
+
+    monkeypatch.setattr(astro_routes.astro_engine, "get_ephemeris_arrays", get_ephemeris_arrays)
+    return calls
+
+
+def test_short_requests_are_slices_of_one_cached_horizon(computed):
+    cache = EphemerisCache(min_horizon=90, max_horizon=365)
+    week = cache.get_arrays(7)
+    assert computed == [90] and week["period_days"] == 7 and week["dates"] == [f"day-{i}" for i in range(7)]
+    assert week["lon"].shape == (7, 2) and not week["lon"].flags.writeable
+    month = cache.get_arrays(30)
+    assert computed == [90] and len(month["dates"]) == 30 and (cache.hits, cache.misses) == (1, 1)
+    # A longer horizon replaces the entry; shorter ones are then served from it
+    assert len(cache.get_arrays(200)["dates"]) == 200 and computed == [90, 200]
+    cache.get_arrays(120)
+    assert computed == [90, 200] and cache.hits == 2
+
+
+def test_observers_are_cached_apart(computed):
+    cache = EphemerisCache()
+    cache.get_arrays(10, observer_lat=51.5)
+    cache.get_arrays(10, observer_lat=51.50001)  # rounds to the same observer
+    cache.get_arrays(10, observer_lat=40.7)
+    cache.get_arrays(10, center_mode="geocentric")
+    assert len(computed) == 3
+
+
+def test_horizons_beyond_the_cap_are_computed_uncached(computed):
+    cache = EphemerisCache(min_horizon=90, max_horizon=365)
+    assert len(cache.get_arrays(1000)["dates"]) == 1000
+    assert len(cache.get_arrays(1000)["dates"]) == 1000
+    assert computed == [1000, 1000]
+    # ...and do not evict or grow the cached entry
+    cache.get_arrays(30)
+    cache.get_arrays(365)
+    cache.get_arrays(300)
+    assert computed == [1000, 1000, 90, 365]
+
+
+def test_expired_entries_are_recomputed(computed, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(astro_routes.time, "time", lambda: clock[0])
+    cache = EphemerisCache(ttl_seconds=60)
+    cache.get_arrays(10)
+    clock[0] += 61
+    cache.get_arrays(10)
+    assert computed == [90, 90] and cache.misses == 2
@@ -0,0 +1,142 @@
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+
+import history_store
+from candle_store import COLUMNS, CandleStore, SyntheticMarket
+from history_store import META_FILE, HistoryStore, HistoryTable
+
+NOW = 1_760_000_000 - 1_760_000_000 % 3600 + 1800 + 17
+START = 1_750_000_000 - 1_750_000_000 % 60
+
+
+@pytest.fixture(autouse=True)
+def small_files(monkeypatch):
+    monkeypatch.setattr(history_store, "GROW_ROWS", 256)
+
+
+def bars(start, count):
+    return SyntheticMarket("EURUSD", 60).bars(start, count)
+
+
+def assert_columns_equal(got, want):
+    for name in COLUMNS:
+        np.testing.assert_array_equal(got[name], want[name], err_msg=name)
+
+
+def column_file(table, name):
+    return os.path.join(table.path, f"{name}.bin")
+
+
+def test_append_and_reload(tmp_path):
+    table = HistoryTable(str(tmp_path))
+    first = bars(START, 300)
+    assert table.append(first) == 300
+    # Overlapping rows are skipped, only the newer ones are written (and the files grow)
+    assert table.append(bars(START + 200 * 60, 200)) == 100
+    table.close()
+    reopened = HistoryTable(str(tmp_path))
+    assert len(reopened) == 400
+    assert reopened.first_time() == START and reopened.last_time() == START + 399 * 60
+    assert_columns_equal(reopened.tail(400), bars(START, 400))
+    assert_columns_equal(reopened.range(START + 10 * 60, START + 20 * 60), bars(START + 10 * 60, 10))
+    assert len(reopened.range(START - 600, START)["time"]) == 0
+    # Reads are read-only views of the maps
+    with pytest.raises(ValueError):
+        reopened.tail(1)["close"][0] = 0.0
+
+
+def test_rows_past_the_committed_count_are_ignored_and_overwritten(tmp_path):
+    table = HistoryTable(str(tmp_path))
+    table.append(bars(START, 100))
+    # A crash after the column files were written but before meta.json was replaced
+    meta = open(os.path.join(table.path, META_FILE)).read()
+    table.append(bars(START + 100 * 60, 50))
+    table.close()
+    with open(os.path.join(table.path, META_FILE), "w") as f:
+        f.write(meta)
+    reopened = HistoryTable(str(tmp_path))
+    assert len(reopened) == 100 and reopened.last_time() == START + 99 * 60
+    # The torn rows are overwritten by the next append rather than skipped over
+    other = SyntheticMarket("GBPUSD", 60).bars(START + 100 * 60, 10)
+    assert reopened.append(other) == 10
+    assert_columns_equal(reopened.tail(10), other)
+    assert len(HistoryTable(str(tmp_path))) == 110
+
+
+def test_a_truncated_column_caps_the_count(tmp_path):
+    table = HistoryTable(str(tmp_path))
+    table.append(bars(START, 100))
+    table.close()
+    del table
+    path = os.path.join(str(tmp_path), "close.bin")
+    os.truncate(path, 60 * np.dtype("<f8").itemsize + 3)
+    reopened = HistoryTable(str(tmp_path))
+    assert len(reopened) == 60
+    assert_columns_equal(reopened.tail(100), bars(START, 60))
+
+
+@pytest.mark.parametrize("meta", [None, "{not json", json.dumps({"version": 0, "count": 100})])
+def test_missing_or_unreadable_meta_is_an_empty_table(tmp_path, meta):
+    table = HistoryTable(str(tmp_path))
+    table.append(bars(START, 100))
+    table.close()
+    meta_path = os.path.join(str(tmp_path), META_FILE)
+    os.remove(meta_path)
+    if meta is not None:
+        with open(meta_path, "w") as f:
+            f.write(meta)
+    reopened = HistoryTable(str(tmp_path))
+    assert len(reopened) == 0 and reopened.last_time() is None
+    assert len(reopened.tail(10)["time"]) == 0
+
+
+def test_store_validates_names_and_the_allow_list(tmp_path):
+    store = HistoryStore(str(tmp_path), ["eurusd"])
+    assert store.persists("EURUSD") and not store.persists("GBPUSD")
+    assert store.table("eurusd", "1m") is store.table("EURUSD", "1m")
+    for symbol, interval in (("GBPUSD", "1m"), ("../etc", "1m"), ("EURUSD", "../1m"), ("EURUSD", "")):
+        with pytest.raises(ValueError):
+            store.table(symbol, interval)
+    assert not os.path.exists(os.path.join(str(tmp_path), "GBPUSD"))
+
+
+def test_stored_lists_tables_on_disk(tmp_path):
+    store = HistoryStore(str(tmp_path), ["EURUSD", "GBPUSD"])
+    assert store.stored() == []
+    store.table("GBPUSD", "1m").append(bars(START, 5))
+    store.table("EURUSD", "1m").append(bars(START, 5))
+    os.makedirs(os.path.join(str(tmp_path), "EURUSD", "5m"))  # no meta.json yet
+    os.makedirs(os.path.join(str(tmp_path), "USDJPY", "1m"))  # not allow-listed
+    assert store.stored() == [("EURUSD", "1m"), ("GBPUSD", "1m")]
+    assert HistoryStore(str(tmp_path), ["GBPUSD"]).stored() == [("GBPUSD", "1m")]
+
+
+def test_closed_base_bars_persist_across_restarts(tmp_path, monkeypatch):
+    clock = [NOW]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    store = CandleStore(capacity=20, base_capacity=120)
+    store.attach_history(HistoryStore(str(tmp_path), ["EURUSD"]))
+    series = store.base("EURUSD")
+    series.tick(now=NOW)
+    table = store.history.table("EURUSD", "1m")
+    # Every closed bar is on disk; the forming one is not
+    assert len(table) == 119 and table.last_time() == NOW - NOW % 60 - 60
+    closed = series.query(end=NOW - NOW % 60, limit=119)
+    assert_columns_equal(table.tail(119), closed)
+
+    # Down for longer than the ring: the gap is generated so the history stays contiguous
+    clock[0] = NOW + 500 * 60
+    restarted = CandleStore(capacity=20, base_capacity=120)
+    restarted.attach_history(HistoryStore(str(tmp_path), ["EURUSD"]))
+    assert restarted.symbols() == ["EURUSD"]
+    resumed = restarted.base("EURUSD")
+    resumed.tick(now=clock[0])
+    table = restarted.history.table("EURUSD", "1m")
+    times = table.tail(len(table))["time"]
+    assert (np.diff(times) == 60).all() and times[-1] == clock[0] - clock[0] % 60 - 60
+    # Reads older than the ring come from the file and match what was served before
+    assert_columns_equal(resumed.query(end=NOW - NOW % 60, limit=119), closed)
@@ -0,0 +1,125 @@
+import random
+
+import pytest
+
+from ict_pipeline import ConfluencePipeline, DetectorSpec
+
+WINDOW = 200
+STEP = 300
+
+
+def make_bars(count, seed=3):
+    rng = random.Random(seed)
+    bars, price = [], 1.1
+    for i in range(count):
+        open_ = price
+        price += rng.gauss(0, 0.001)
+        bars.append({
+            "time": 1_700_000_000 + i * STEP,
+            "open": round(open_, 5),
+            "high": round(max(open_, price) + abs(rng.gauss(0, 0.0005)), 5),
+            "low": round(min(open_, price) - abs(rng.gauss(0, 0.0005)), 5),
+            "close": round(price, 5),
+            "volume": rng.randint(1, 1000),
+        })
+    return bars
+
+
+def breakouts(bars):
+    """Tail-style: a close above the previous bar's high (depends on two bars)."""
+    return [{"time": b["time"], "level": a["high"]} for a, b in zip(bars, bars[1:]) if b["close"] > a["high"]]
+
+
+def sweeps(bars):
+    """Tail-style with a different time key: a low under the previous two lows, closed back above."""
+    return [{"sweep_time": c["time"], "level": min(a["low"], b["low"])}
+            for a, b, c in zip(bars, bars[1:], bars[2:])
+            if c["low"] < min(a["low"], b["low"]) and c["close"] > min(a["low"], b["low"])]
+
+
+def make_specs(calls=None):
+    def counted(name, func):
+        def call(*args):
+            if calls is not None:
+                calls[name] = calls.get(name, 0) + 1
+            return func(*args)
+        return call
+
+    return [
+        DetectorSpec("breakouts", counted("breakouts", breakouts), mode="tail", lookback=5),
+        DetectorSpec("sweeps", counted("sweeps", sweeps), mode="tail", lookback=5, time_key="sweep_time"),
+        DetectorSpec("range", counted("range", lambda bars: {"high": max(b["high"] for b in bars),
+                                                             "low": min(b["low"] for b in bars)})),
+        DetectorSpec("clock", counted("clock", lambda bars: {"active_zones": []}), mode="clock"),
+        DetectorSpec("htf", counted("htf", lambda htf, ltf: {"score": len(htf), "last": htf[-1]["time"]}), mode="htf"),
+    ]
+
+
+def ticks(bars, start, stop, seed=5):
+    """Windows as a live chart sees them: the forming bar moves a few times, then a new bar opens."""
+    rng = random.Random(seed)
+    for end in range(start, stop):
+        window = [dict(bar) for bar in bars[max(0, end - WINDOW):end]]
+        for _ in range(3):
+            last = window[-1]
+            last["close"] = round(last["close"] + rng.gauss(0, 0.001), 5)
+            last["high"] = max(last["high"], last["close"])
+            last["low"] = min(last["low"], last["close"])
+            yield [dict(bar) for bar in window]
+
+
+def test_incremental_matches_full_run_over_the_same_bars():
+    bars = make_bars(600)
+    htf = make_bars(30, seed=9)
+    incremental = ConfluencePipeline(specs=make_specs())
+    checked = 0
+    for window in ticks(bars, 150, 420):
+        got = incremental.detect("EURUSD", "5m", window, htf)
+        want = ConfluencePipeline(specs=make_specs()).detect("EURUSD", "5m", window, htf)
+        assert got == want
+        checked += 1
+    assert checked > 800
+
+
+def test_unchanged_window_reuses_cached_results():
+    calls = {}
+    pipeline = ConfluencePipeline(specs=make_specs(calls))
+    window, htf = make_bars(WINDOW), make_bars(10, seed=9)
+    first = pipeline.detect("EURUSD", "5m", window, htf)
+    second = pipeline.detect("EURUSD", "5m", [dict(bar) for bar in window], htf)
+    assert first == second
+    # Only the wall-clock detector runs again
+    assert calls == {"breakouts": 1, "sweeps": 1, "range": 1, "clock": 2, "htf": 1}
+
+
+def test_rewritten_history_falls_back_to_a_full_run():
+    pipeline = ConfluencePipeline(specs=make_specs())
+    pipeline.detect("EURUSD", "5m", make_bars(WINDOW, seed=1))
+    other = make_bars(WINDOW, seed=2)
+    assert pipeline.detect("EURUSD", "5m", other) == ConfluencePipeline(specs=make_specs()).detect("EURUSD", "5m", other)
+
+
+def test_interval_spellings_share_one_state():
+    pipeline = ConfluencePipeline(specs=[])
+    assert pipeline._state("eurusd", "1h") is pipeline._state("EURUSD", "60m")
+
+
+def test_states_are_bounded_lru():
+    pipeline = ConfluencePipeline(specs=[], max_states=2)
+    a = pipeline._state("AAA", "5m")
+    pipeline._state("BBB", "5m")
+    pipeline._state("AAA", "5m")
+    pipeline._state("CCC", "5m")
+    assert list(pipeline._states) == [("AAA", 300), ("CCC", 300)]
+    assert pipeline._state("AAA", "5m") is a
+
+
+def test_failed_detector_resets_state():
+    def boom(bars):
+        raise RuntimeError("detector failed")
+
+    pipeline = ConfluencePipeline(specs=make_specs() + [DetectorSpec("boom", boom)])
+    with pytest.raises(RuntimeError):
+        pipeline.detect("EURUSD", "5m", make_bars(WINDOW))
+    state = pipeline._state("EURUSD", "5m")
+    assert state.bars is None and state.results == {}
@@ -0,0 +1,19 @@
+// Ephemeris access shared by the astro views (astro-full.js, astro-planet.js).
+(() => {
+  function apiBase() {
+    return (typeof window.API_BASE === 'string' && window.API_BASE) ? window.API_BASE.replace(/\/$/, '') : 'http://localhost:8081';
+  }
+
+  // The views only render the first day, so ask for exactly one (buffered, cacheable via
+  // ETag) instead of a longer range. Resolves to the /astro/ephemeris body
+  // ({status, ephemeris: [day], ai_mentor, settings, ...}) or null.
+  async function fetchFirstDay(date) {
+    const d = date ? `&date=${encodeURIComponent(date)}` : '';
+    const resp = await fetch(`${apiBase()}/astro/ephemeris?days=1${d}`);
+    if (!resp.ok) return null;
+    const json = await resp.json();
+    return json && json.status === 'success' ? json : null;
+  }
+
+  window.AstroEphemeris = { apiBase, fetchFirstDay };
+})();
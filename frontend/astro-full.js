@@ -92,10 +92,8 @@
       if (loadingOverlay) loadingOverlay.style.pointerEvents = 'auto';
       if (spinner) spinner.style.display = 'block';
       if (aiMentorSummary) { aiMentorSummary.style.display = 'none'; aiMentorText.textContent = 'Loading...'; }
-  const apiBase = (typeof window.API_BASE === 'string' && window.API_BASE) ? window.API_BASE.replace(/\/$/, '') : 'http://localhost:8081';
-  const resp = await fetch(`${apiBase}/astro/ephemeris?date=${encodeURIComponent(dateValue)}`);
-      if (!resp.ok) throw new Error('No ephemeris');
-      const json = await resp.json();
+      const json = await window.AstroEphemeris.fetchFirstDay(dateValue);
+      if (!json) throw new Error('No ephemeris');
 
       // Clear previous orbits
       while (orbitGroup.children.length) orbitGroup.remove(orbitGroup.children[0]);
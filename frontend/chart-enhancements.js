@@ -112,15 +112,17 @@ function addSymbolChart(symbol) {
         // Load data for new symbol from backend
         try {
             const apiBase = (typeof getApiBase === 'function' ? getApiBase() : (window.API_BASE || 'http://localhost:8081'));
-            fetch(`${apiBase.replace(/\/$/, '')}/ict/candles?symbol=${encodeURIComponent(symbol)}&interval=${encodeURIComponent(getCurrentInterval ? getCurrentInterval() : '5m')}&limit=500`)
+            fetch(`${apiBase.replace(/\/$/, '')}/ict/candles?symbol=${encodeURIComponent(symbol)}&interval=${encodeURIComponent(getCurrentInterval ? getCurrentInterval() : '5m')}&limit=500&format=columns`)
                 .then(response => response.json())
                 .then(data => {
-                    const candleData = data.map(candle => ({
-                        time: candle[0] / 1000,
-                        open: parseFloat(candle[1]),
-                        high: parseFloat(candle[2]),
-                        low: parseFloat(candle[3]),
-                        close: parseFloat(candle[4])
+                    // Columnar payload: candles = [time[], open[], high[], low[], close[], volume[]]
+                    const [time, open, high, low, close] = data.candles;
+                    const candleData = time.map((t, i) => ({
+                        time: t,
+                        open: open[i],
+                        high: high[i],
+                        low: low[i],
+                        close: close[i]
                     }));
 
                     series.setData(candleData);
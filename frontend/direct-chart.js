@@ -7,6 +7,15 @@ let directCandlestickSeries = null;
 let simLiveInterval = null;
 let lastCandle = null;
 let simLiveActive = false;
+// Live /ict/ws stream: last applied update seq + topic epoch, used to resume after a reconnect
+let liveWs = null;
+let liveKey = null;
+let liveSeq = null;
+let liveEpoch = null;
+// Scroll-back: older pages are fetched with before=<oldest loaded bar> as the chart is panned left
+const MAX_CHART_BARS = 5000;
+let olderLoading = false;
+let olderExhausted = false;
 
 function getCurrentSymbol() {
     const el = document.getElementById('enhancedSymbolSelect');
@@ -83,35 +92,106 @@ function createDirectChart() {
     directCandlestickSeries = directChart.addCandlestickSeries({
         upColor: '#26a69a', downColor: '#ef5350', borderVisible: false, wickUpColor: '#26a69a', wickDownColor: '#ef5350',
     });
+    directChart.timeScale().subscribeVisibleLogicalRangeChange((range) => {
+        if (range && range.from < 10) loadOlderCandles();
+    });
     loadDirectChartData();
     return true;
 }
 
 function loadDirectChartData() {
     if (!directCandlestickSeries) return;
+    connectDirectLive();
+}
+
+function applyLiveBar(bar) {
+    const candles = window.__chartData__ || [];
+    const last = candles[candles.length - 1];
+    if (last && last.time === bar.time) {
+        candles[candles.length - 1] = bar;
+    } else if (!last || bar.time > last.time) {
+        candles.push(bar);
+        if (candles.length > MAX_CHART_BARS) candles.shift();
+    }
+    window.__chartData__ = candles;
+    directCandlestickSeries.update(bar);
+    lastCandle = bar;
+    updateOHLCDisplay(bar);
+}
+
+// Backend first: /ict/ws sends the history batch, then forming-bar updates with seq numbers.
+// Reconnects resume from the last seq, so only missed updates are re-sent.
+function connectDirectLive() {
     const symbol = getCurrentSymbol();
     const interval = getCurrentInterval();
-    // Try backend first
-    const apiBase = (typeof getApiBase === 'function' ? getApiBase() : (window.API_BASE || 'http://localhost:8081'));
-    fetch(`${apiBase.replace(/\/$/, '')}/ict/candles?symbol=${encodeURIComponent(symbol)}&interval=${encodeURIComponent(interval)}&limit=120`).then(r => {
-        if (!r.ok) throw new Error('backend fail');
-        return r.json();
-    }).then(data => {
-        const candles = data.map(c => ({
-            time: c[0], open: c[1], high: c[2], low: c[3], close: c[4]
-        }));
-        directCandlestickSeries.setData(candles);
-        directChart.timeScale().fitContent();
-        lastCandle = candles[candles.length - 1];
-        window.__chartData__ = candles;
-    }).catch(() => {
+    const key = `${symbol}|${interval}`;
+    if (liveKey !== key) { liveSeq = null; liveEpoch = null; }
+    liveKey = key;
+    if (liveWs) { liveWs.onclose = null; liveWs.close(); }
+
+    const wsBase = (typeof getApiWsBase === 'function' ? getApiWsBase() : (window.API_WS_BASE || 'ws://localhost:8081'));
+    let url = `${wsBase.replace(/\/$/, '')}/ict/ws?symbol=${encodeURIComponent(symbol)}&interval=${encodeURIComponent(interval)}&limit=120&format=columns`;
+    if (liveSeq !== null && liveEpoch) url += `&since=${liveSeq}&epoch=${encodeURIComponent(liveEpoch)}`;
+
+    const ws = new WebSocket(url);
+    let received = false;
+    ws.onmessage = (ev) => {
+        const msg = JSON.parse(ev.data);
+        received = true;
+        if (msg.epoch) liveEpoch = msg.epoch;
+        if (msg.candles) {
+            const [time, open, high, low, close, volume] = msg.candles;
+            const candles = time.map((t, i) => ({
+                time: t, open: open[i], high: high[i], low: low[i], close: close[i], volume: volume[i]
+            }));
+            directCandlestickSeries.setData(candles);
+            directChart.timeScale().fitContent();
+            lastCandle = candles[candles.length - 1];
+            window.__chartData__ = candles;
+            olderExhausted = false;
+        } else if (msg.bar) {
+            applyLiveBar(msg.bar);
+        }
+        if (typeof msg.seq === 'number') liveSeq = msg.seq;
+    };
+    ws.onerror = () => {
+        if (received || liveWs !== ws) return;
         // fallback to demo
         const candles = generateDemoData(interval, symbol);
         directCandlestickSeries.setData(candles);
         directChart.timeScale().fitContent();
         lastCandle = candles[candles.length - 1];
         window.__chartData__ = candles;
-    });
+    };
+    ws.onclose = () => {
+        if (liveWs === ws && received) setTimeout(() => { if (liveWs === ws) connectDirectLive(); }, 2000);
+    };
+    liveWs = ws;
+}
+
+// Prepend the page of bars before the oldest loaded one (only the missing page is fetched)
+function loadOlderCandles() {
+    const candles = window.__chartData__ || [];
+    if (olderLoading || olderExhausted || !candles.length || candles.length >= MAX_CHART_BARS) return;
+    const key = liveKey;
+    const apiBase = (typeof getApiBase === 'function' ? getApiBase() : (window.API_BASE || 'http://localhost:8081'));
+    const [symbol, interval] = key.split('|');
+    olderLoading = true;
+    fetch(`${apiBase.replace(/\/$/, '')}/ict/candles?symbol=${encodeURIComponent(symbol)}&interval=${encodeURIComponent(interval)}&limit=300&before=${candles[0].time}&format=columns`)
+        .then(response => response.json())
+        .then(data => {
+            if (key !== liveKey || !data.candles) return;
+            const [time, open, high, low, close, volume] = data.candles;
+            if (!time.length) { olderExhausted = true; return; }
+            const older = time.map((t, i) => ({
+                time: t, open: open[i], high: high[i], low: low[i], close: close[i], volume: volume[i]
+            }));
+            const merged = older.concat(window.__chartData__ || []);
+            window.__chartData__ = merged;
+            directCandlestickSeries.setData(merged);
+        })
+        .catch(error => console.warn('Older candles fetch failed', error))
+        .finally(() => { olderLoading = false; });
 }
 
 function startSimLive() {
@@ -224,28 +304,8 @@ function addCrosshairTooltip(chart) {
             // Show current candle data when no crosshair
             if (ohlcDisplayEnabled && directCandlestickSeries) {
                 // Get last candle data
-                setTimeout(() => {
-                    // Fetch latest single candle from backend for OHLC display
-                    try {
-                        const apiBase = (typeof getApiBase === 'function' ? getApiBase() : (window.API_BASE || 'http://localhost:8081'));
-                        fetch(`${apiBase.replace(/\/$/, '')}/ict/candles?symbol=${encodeURIComponent(getCurrentSymbol())}&interval=${encodeURIComponent(getCurrentInterval())}&limit=1`)
-                            .then(response => response.json())
-                            .then(data => {
-                                if (data && data.length > 0) {
-                                    const candle = data[0];
-                                    const currentData = {
-                                        open: parseFloat(candle[1]),
-                                        high: parseFloat(candle[2]),
-                                        low: parseFloat(candle[3]),
-                                        close: parseFloat(candle[4]),
-                                        volume: parseFloat(candle[5])
-                                    };
-                                    updateOHLCDisplay(currentData);
-                                }
-                            })
-                            .catch(error => console.error('Failed to fetch current OHLC:', error));
-                    } catch (e) { console.warn('OHLC fetch failed', e); }
-                }, 100);
+                // Latest bar is kept current by the /ict/ws stream
+                updateOHLCDisplay(lastCandle);
             }
         }
     });
@@ -266,13 +326,11 @@ function addSMAOverlay(chart, period = 14) {
     // Fetch candles from backend and compute SMA
     try {
         const apiBase = (typeof getApiBase === 'function' ? getApiBase() : (window.API_BASE || 'http://localhost:8081'));
-        fetch(`${apiBase.replace(/\/$/, '')}/ict/candles?symbol=${encodeURIComponent(getCurrentSymbol())}&interval=${encodeURIComponent(getCurrentInterval())}&limit=500`)
+        fetch(`${apiBase.replace(/\/$/, '')}/ict/candles?symbol=${encodeURIComponent(getCurrentSymbol())}&interval=${encodeURIComponent(getCurrentInterval())}&limit=500&format=columns`)
             .then(response => response.json())
             .then(data => {
-                const candleData = data.map(candle => ({
-                    time: (candle[0] && candle[0] > 9999999999 ? Math.floor(candle[0] / 1000) : candle[0]) ,
-                    close: parseFloat(candle[4])
-                }));
+                const [time, , , , close] = data.candles;
+                const candleData = time.map((t, i) => ({ time: t, close: close[i] }));
 
                 const smaData = [];
                 for (let i = period - 1; i < candleData.length; i++) {
@@ -372,26 +430,8 @@ function toggleOHLCDisplay() {
             ohlcBtn.textContent = '📊 OHLC ON';
         }
         
-        // Load initial OHLC data from backend
-        try {
-            const apiBase = (typeof getApiBase === 'function' ? getApiBase() : (window.API_BASE || 'http://localhost:8081'));
-            fetch(`${apiBase.replace(/\/$/, '')}/ict/candles?symbol=${encodeURIComponent(getCurrentSymbol())}&interval=${encodeURIComponent(getCurrentInterval())}&limit=1`)
-                .then(response => response.json())
-                .then(data => {
-                    if (data && data.length > 0) {
-                        const candle = data[0];
-                        const currentData = {
-                            open: parseFloat(candle[1]),
-                            high: parseFloat(candle[2]),
-                            low: parseFloat(candle[3]),
-                            close: parseFloat(candle[4]),
-                            volume: parseFloat(candle[5])
-                        };
-                        updateOHLCDisplay(currentData);
-                    }
-                })
-                .catch(error => console.error('Failed to load initial OHLC:', error));
-        } catch (e) { console.warn('Initial OHLC fetch failed', e); }
+        // Latest bar is kept current by the /ict/ws stream
+        updateOHLCDisplay(lastCandle);
         
         console.log('✅ OHLC display enabled');
     }